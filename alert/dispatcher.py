@@ -0,0 +1,89 @@
+import asyncio
+import random
+
+import aiohttp
+
+TELEGRAM_API = 'https://api.telegram.org'
+
+
+class TokenBucket:
+    # Allows rate requests per second on average and bursts of up to capacity, callers wait for a token in turn.
+    # The default capacity of one spaces requests evenly
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = self.capacity
+        self.updated = None
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AlertDispatcher:
+    # Sends one message to every subscriber over a single pooled session. At most concurrency requests are in flight,
+    # a token bucket keeps under Telegram's broadcast limit of about 30 messages per second, and failed sends are
+    # retried with exponential backoff and jitter, waiting as long as Telegram asks on a 429. A 4xx other than 429
+    # (e.g. a chat that blocked the bot) is not retried. api_url can point at a local server for testing
+    def __init__(self, bot_id, api_url=TELEGRAM_API, concurrency=16, rate=25, retries=4, backoff=0.5, timeout=10):
+        self.url = f"{api_url.rstrip('/')}/bot{bot_id}/sendMessage"
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _delay(self, attempt):
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    async def send(self, session, limiter, semaphore, chat_id, text):
+        # Delivery result of one chat: chat_id, ok, status (None without a response), attempts and error
+        status = None
+        error = None
+        for attempt in range(self.retries + 1):
+            delay = self._delay(attempt)
+            async with semaphore:
+                await limiter.acquire()
+                try:
+                    async with session.post(self.url, json={'chat_id': chat_id, 'text': text}) as response:
+                        status = response.status
+                        if status == 200:
+                            return {'chat_id': chat_id, 'ok': True, 'status': status, 'attempts': attempt + 1, 'error': None}
+                        try:
+                            body = await response.json(content_type=None)
+                        except ValueError: # e.g. an HTML error page from a proxy
+                            body = None
+                        body = body if isinstance(body, dict) else {}
+                        error = body.get('description')
+                        if status == 429:
+                            delay = max(delay, (body.get('parameters') or {}).get('retry_after', 0))
+                        elif status < 500:
+                            break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as exception:
+                    status = None
+                    error = repr(exception)
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+        return {'chat_id': chat_id, 'ok': False, 'status': status, 'attempts': attempt + 1, 'error': error}
+
+    async def dispatch(self, chat_ids, text):
+        # Results in the order of chat_ids
+        limiter = TokenBucket(self.rate)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(*(self.send(session, limiter, semaphore, chat_id, text) for chat_id in chat_ids))
+
+    def run(self, chat_ids, text):
+        return asyncio.run(self.dispatch(chat_ids, text))
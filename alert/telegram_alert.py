@@ -1,19 +1,26 @@
-import requests 
 import pandas as pd
 from dotenv import load_dotenv
 import os
+import sys
 
-load_dotenv('../.env')
+from dispatcher import AlertDispatcher
+
+# Paths are relative to the repository, so the script runs from any directory
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from backtester.cnnfetch import CNNFetcher
+from backtester.regimes import rating
+
+load_dotenv(os.path.join(ROOT, '.env'))
 
 BOT_ID = os.getenv('BOT_ID')
-CHAT_ID = os.getenv('CHAT_ID')
+# One or more comma separated chat or channel IDs, and optionally a file with one ID per line
+CHAT_ID = os.getenv('CHAT_ID', '')
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE')
+# Responses younger than the TTL are reused, older ones are revalidated with a conditional request
+CNN_CACHE = os.getenv('CNN_CACHE', os.path.join(ROOT, 'datasets', 'cnn_cache'))
 
-url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata/"
-headers = {
-    'User-Agent': "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
-}
-response = requests.get(url, headers=headers)
-data = response.json()['fear_and_greed']
+data = CNNFetcher(CNN_CACHE).current()
 
 timestamp = pd.to_datetime(data['timestamp']).date()
 today_score = round(data['score'], 2)
@@ -22,25 +29,22 @@ previous_week_score = round(data['previous_1_week'], 2)
 previous_month_score = round(data['previous_1_month'], 2)
 previous_year_score = round(data['previous_1_year'], 2)
 
-def get_rating(score):
-    if score < 25:
-        return "Extreme Fear"
-    elif score < 50:
-        return "Fear"
-    elif score < 55:
-        return "Neutral"
-    elif score < 75:
-        return "Greed"
-    else:
-        return "Extreme Greed"
-    
-today_rating = get_rating(today_score)
-previous_day_rating = get_rating(previous_day_score)
-previous_week_rating = get_rating(previous_week_score)
-previous_month_rating = get_rating(previous_month_score)
-previous_year_rating = get_rating(previous_year_score)
+today_rating = rating(today_score)
+previous_day_rating = rating(previous_day_score)
+previous_week_rating = rating(previous_week_score)
+previous_month_rating = rating(previous_month_score)
+previous_year_rating = rating(previous_year_score)
 
 message = f"Fear and Greed Index:\n Date: {timestamp}\n Today's Score: {today_score} ({today_rating}) \n Previous Day's Score: {previous_day_score} ({previous_day_rating}) \n Previous Week's Score: {previous_week_score} ({previous_week_rating}) \n Previous Month's Score: {previous_month_score} ({previous_month_rating}) \n Previous Year's Score: {previous_year_score} ({previous_year_rating})"
 
-url = f"https://api.telegram.org/bot{BOT_ID}/sendMessage?chat_id={CHAT_ID}&text={message}"
-requests.get(url)
\ No newline at end of file
+chat_ids = [chat_id.strip() for chat_id in CHAT_ID.split(',') if chat_id.strip()]
+if SUBSCRIBERS_FILE:
+    with open(SUBSCRIBERS_FILE) as file:
+        chat_ids += [line.strip() for line in file if line.strip() and not line.startswith('#')]
+chat_ids = list(dict.fromkeys(chat_ids))
+
+results = AlertDispatcher(BOT_ID).run(chat_ids, message)
+failed = [result for result in results if not result['ok']]
+print(f"Sent to {len(results) - len(failed)} of {len(results)} chats")
+for result in failed:
+    print(f"Failed to send to {result['chat_id']}: {result['status']} {result['error']}")
\ No newline at end of file
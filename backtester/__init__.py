@@ -1,2 +1,42 @@
-from .backtest_strategy1 import Trade as Trade1, Backtest as Backtest1
-from .backtest_strategy2 import Trade as Trade2, Backtest as Backtest2
\ No newline at end of file
+from importlib import import_module
+
+# Names are imported from their module on first use, so e.g. a worker process importing Backtest2 does not also load
+# the dataset, CNN and sweep modules
+_EXPORTS = {
+    'Trade1': ('.backtest_strategy1', 'Trade'),
+    'Backtest1': ('.backtest_strategy1', 'Backtest'),
+    'Trade2': ('.backtest_strategy2', 'Trade'),
+    'Backtest2': ('.backtest_strategy2', 'Backtest'),
+    'read_payload': ('.cnn', 'read_payload'),
+    'CNNFetcher': ('.cnnfetch', 'CNNFetcher'),
+    'DatasetStore': ('.dataset', 'DatasetStore'),
+    'cached_dataset': ('.dataset', 'cached_dataset'),
+    'MarketArrays': ('.grid', 'MarketArrays'),
+    'strategy1_grid': ('.grid', 'strategy1_grid'),
+    'strategy2_grid': ('.grid', 'strategy2_grid'),
+    'SuccessiveHalving': ('.optimize', 'SuccessiveHalving'),
+    'WalkForward': ('.walkforward', 'WalkForward'),
+    'MonteCarlo': ('.robustness', 'MonteCarlo'),
+    'SentimentRegimes': ('.regimes', 'SentimentRegimes'),
+    'Portfolio': ('.portfolio', 'Portfolio'),
+    'ChunkedBacktest': ('.chunked', 'ChunkedBacktest'),
+    'Profiler': ('.profiling', 'Profiler'),
+    'Sweep': ('.sweep', 'Sweep'),
+    'ResultStore': ('.results', 'ResultStore'),
+    'BracketStream': ('.stream', 'BracketStream'),
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attribute = _EXPORTS[name]
+    value = getattr(import_module(module, __name__), attribute)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
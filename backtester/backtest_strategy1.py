@@ -1,8 +1,17 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from .engine import resolve_engine, simulate_threshold_reversals
+from .framecache import BUY_AND_HOLD_COLUMNS, cached
+from .ledger import STRATEGY1_FIELDS, TradeLedger
+from .profiling import timed
+from .rangequery import CrossingIndex
+from .report import strategy1_report
+from .signals import SIGNAL_NAMES
 
 
 class Trade:
+    __slots__ = ('open_date', 'open_price', 'position', 'shares', 'returns', 'pct_returns',
+                 'close_date', 'close_price', 'duration')
+
     def __init__(self, open_date, open_price, position, shares):
         self.open_date = open_date
         self.open_price = open_price
@@ -37,129 +46,85 @@ class Trade:
                 f"Duration: {self.duration} days")
     
 class Backtest:
-    def __init__(self, data, initial_balance, buy_threshold, sell_threshold):
+    def __init__(self, data, initial_balance, buy_threshold, sell_threshold, engine='numpy', profiler=None):
         self.data = data
+        self.engine = resolve_engine(engine) # 'numba' runs the compiled kernels when Numba is installed
+        self.profiler = profiler # a profiling.Profiler collecting the time of each phase, None skips it
         self.initial_balance = initial_balance
         self.balance = initial_balance
-        self.trades = []
-        self.signals = self.generate_signal(buy_threshold, sell_threshold)
+        self.ledger = TradeLedger(STRATEGY1_FIELDS)
+        self.crossings = cached(data, 'Crossing Index', lambda: CrossingIndex(data['Fear and Greed Index'].to_numpy()),
+                                ['Fear and Greed Index'])
+        self.signals = timed(profiler, 'Signals', self.generate_signal, buy_threshold, sell_threshold, bars=len(data))
         self.report = {}
 
     def buy_and_hold_return(self):
+        # Shared by every backtest over the same frame and initial balance
+        return cached(self.data, ('Strategy 1 Buy and Hold', self.initial_balance), self._buy_and_hold_return,
+                      BUY_AND_HOLD_COLUMNS)
+
+    def _buy_and_hold_return(self):
         shares = self.initial_balance // self.data.iloc[0]['SPY Opening Price']
         trade = Trade(self.data.index[0], self.data.iloc[0]['SPY Opening Price'], 'Buy', shares)
         returns = trade.close_trade(self.data.index[-1], self.data.iloc[-1]['SPY Closing Price']).returns
         return returns
     
     def generate_signal(self, buy_threshold, sell_threshold):
-        previous_signal = None
-        current_signal = None
-        signals = []
-
-        for index in range(0, len(self.data)):
-            if previous_signal != 'Buy' and self.data.iloc[index]['Fear and Greed Index'] <= buy_threshold:
-                current_signal = 'Buy'
-                previous_signal = current_signal
-            elif previous_signal != 'Sell' and self.data.iloc[index]['Fear and Greed Index'] >= sell_threshold:
-                current_signal = 'Sell'
-                previous_signal = current_signal
-            else:
-                current_signal = 'Hold'
-            signals.append(current_signal)
+        # Signal days come from the crossing index shared by every backtest over the same data
+        days, sides = self.crossings.events(buy_threshold, sell_threshold)
+        signals = np.zeros(len(self.data), dtype=np.int8)
+        signals[days] = sides
         return signals
 
-    def backtest(self):
-        for index in range(0, len(self.data)):
-            signal = self.signals[index]
-            price = self.data.iloc[index]['SPY Opening Price']
-            date = self.data.iloc[index].name
+    def _fill_ledger(self):
+        # Runs the trades into the ledger and returns the final balance
+        if self.engine == 'numba':
+            from . import compiled # imports Numba, so only backtests on the numba engine load it
+            columns, balance = compiled.simulate_threshold_reversals(self.data.index, self.data['SPY Opening Price'].to_numpy(),
+                                                                     self.signals, self.initial_balance)
+            self.ledger = TradeLedger.from_columns(STRATEGY1_FIELDS, columns)
+        else:
+            records, balance = simulate_threshold_reversals(self.data.index, self.data['SPY Opening Price'].to_numpy(),
+                                                            self.signals, self.initial_balance)
+            self.ledger.clear()
+            self.ledger.extend(records)
+        return balance
 
-            if index == len(self.data) - 1:
-                if self.trades:
-                    self.trades[-1].close_trade(date, price)
-                    self.balance += self.trades[-1].returns
-                break
-            
-            if signal == 'Buy':
-                if self.trades: # Close existing trade if there is one and open new trade
-                    self.trades[-1].close_trade(date, price)
-                    self.balance += self.trades[-1].returns
-                    risk = 1 * self.balance # Risk entire balance
-                    shares = risk // price
-                    self.trades.append(Trade(date, price, 'Buy', shares))
-                else: # If there is no existing trade, just need to open new trade
-                    risk = 1 * self.balance
-                    shares = risk // price
-                    self.trades.append(Trade(date, price, 'Buy', shares))
-            elif signal == 'Sell': # Same logic as Buy, just reverse the position
-                if self.trades:
-                    self.trades[-1].close_trade(date, price)
-                    self.balance += self.trades[-1].returns
-                    risk = 1 * self.balance  # Risk entire balance
-                    shares = risk // price
-                    self.trades.append(Trade(date, price, 'Sell', shares))
-                else: 
-                    risk = 0.1 * self.balance
-                    shares = risk // price
-                    self.trades.append(Trade(date, price, 'Sell', shares))
-            else:
-                continue
-        self.report = self.generate_report()
+    def backtest(self):
+        self.balance = timed(self.profiler, 'Simulation', self._fill_ledger, bars=len(self.data))
+        if self.profiler is not None:
+            self.profiler.count_trades('Simulation', self.ledger)
+        self.report = {} # a new run invalidates the previous report
+        timed(self.profiler, 'Report', self.generate_report)
         return self
+
+    @property
+    def trades(self):
+        # Trade objects are built on demand from the ledger, which is what the backtest itself keeps
+        return [self.trade_at(row) for row in range(len(self.ledger))]
+
+    def trade_at(self, row):
+        ledger = self.ledger
+        trade = Trade(self.data.index[ledger['open_index'][row]], ledger['open_price'][row],
+                      SIGNAL_NAMES[int(ledger['position'][row])], ledger['shares'][row])
+        if ledger['close_index'][row] >= 0:
+            trade.close_date = self.data.index[ledger['close_index'][row]]
+            trade.close_price = ledger['close_price'][row]
+            trade.returns = ledger['returns'][row]
+            trade.pct_returns = ledger['pct_returns'][row]
+            trade.duration = int(ledger['duration'][row])
+        return trade
     
     def plot(self):
-        plt.figure(figsize=(12, 6))
-
-        plt.plot(self.data.index, self.data['SPY Opening Price'], label='SPY Opening Price', color='blue')
-        buy_signals = [trade for trade in self.trades if trade.position == 'Buy']
-        sell_signals = [trade for trade in self.trades if trade.position == 'Sell']
-        plt.scatter([trade.open_date for trade in buy_signals], [trade.open_price for trade in buy_signals], 
-                    label='Buy', color='green', marker='^', s=70, zorder=5)
-        plt.scatter([trade.open_date for trade in sell_signals], [trade.open_price for trade in sell_signals], 
-                    label='Sell', color='red', marker='v', s=70, zorder=5)
-        
-        plt.xlabel('Date')
-        plt.ylabel('SPY Opening Price')
-        plt.title('Backtest of Trading Strategy', size=12, weight='bold', y=1)
-        plt.legend(loc='upper left')
-        
-        plt.show()
+        from .plotting import plot_strategy1 # matplotlib is only imported once something is plotted
+        plot_strategy1(self)
     
     def generate_report(self):
-        total_trades = len(self.trades)
-        durations = [trade.duration for trade in self.trades if trade.duration is not None]
-        avg_duration = np.mean(durations) if durations else 0
-        winners = [trade for trade in self.trades if trade.returns > 0]
-        losers = [trade for trade in self.trades if trade.returns < 0]
-        buy_and_hold_returns = self.buy_and_hold_return()
-        total_returns = self.balance - self.initial_balance
-
-        report = {
-            'Initial Balance': self.initial_balance,
-            'Final Balance': round(self.balance, 2),
-            'Total Returns': round(total_returns, 2),
-            'Total Returns (%)': round((total_returns / self.initial_balance) * 100, 2),
-            'Annualised Returns (%)': round(((1 + total_returns / self.initial_balance) ** (365 / (self.data.index.max() - self.data.index.min()).days) - 1) * 100, 2),
-            'Average Returns': round(total_returns / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Average Returns (%)': round((total_returns / self.initial_balance) * 100 / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Average Returns Per Trade': round(total_returns / total_trades, 2),
-            'Average Returns Per Trade (%)': round((total_returns / self.initial_balance) * 100 / total_trades, 2),
-            'Average Trade Duration': int(avg_duration),
-            'Number of Winners': len(winners),
-            'Average Winner Returns': round(np.mean([trade.returns for trade in winners]), 2) if winners else 0,
-            'Average Winner Returns (%)': round(np.mean([trade.pct_returns for trade in winners]), 2) if winners else 0,
-            'Number of Losers': len(losers),
-            'Average Loser Returns': round(np.mean([trade.returns for trade in losers]), 2) if losers else 0,
-            'Average Loser Returns (%)': round(np.mean([trade.pct_returns for trade in losers]), 2) if losers else 0,
-            'Win Rate (%)': round((len(winners) / total_trades) * 100, 2),
-            'Buy and Hold Returns': round(buy_and_hold_returns, 2),
-            'Buy and Hold Returns (%)': round((buy_and_hold_returns / self.initial_balance) * 100, 2),
-            'Annualised Buy and Hold Returns (%)': round(((1 + buy_and_hold_returns / self.initial_balance) ** (365 / (self.data.index.max() - self.data.index.min()).days) - 1) * 100, 2),
-            'Average Buy and Hold Returns (%)': round((buy_and_hold_returns / self.initial_balance) * 100 / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Performance vs Buy and Hold (%)': round(((self.balance - (buy_and_hold_returns + self.initial_balance)) / (buy_and_hold_returns + self.initial_balance)) * 100, 2),
-            'Total Trades': len(self.trades)
-        }
-        return report
+        # Computed once per backtest run, backtest() clears it so reports are never stale
+        if not self.report:
+            self.report = strategy1_report(self.data.index.min(), self.data.index.max(), self.initial_balance, self.balance,
+                                           self.buy_and_hold_return(), self.ledger)
+        return self.report
     
     def backtest_report(self):
         report = self.generate_report()
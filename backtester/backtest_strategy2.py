@@ -1,15 +1,28 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from .engine import bracket_equity, resolve_engine, simulate_bracket_orders
+from .framecache import BUY_AND_HOLD_COLUMNS, PRICE_RANGE_COLUMNS, cached
+from .ledger import STRATEGY2_FIELDS, TradeLedger
+from .profiling import timed
+from .rangequery import PriceExtrema
+from .report import strategy2_report
+from .signals import BUY, SIGNAL_NAMES, bracket_signals
+from .stream import BracketStream
 
 class Trade:
-    def __init__(self, open_date, open_price, position, shares, take_profit, stop_loss, data, equity_balance):
+    __slots__ = ('open_index', 'open_date', 'open_price', 'position', 'shares', 'returns', 'pct_returns', 'close_index',
+                 'close_date', 'close_price', 'duration', 'take_profit', 'stop_loss', 'max_drawdown', 'pct_max_drawdown',
+                 'equity_balance', 'open')
+
+    def __init__(self, open_date, open_price, position, shares, take_profit, stop_loss, equity_balance, open_index):
+        self.open_index = open_index
         self.open_date = open_date
         self.open_price = round(open_price, 2)
         self.position = position
         self.shares = shares
         self.returns = 0
         self.pct_returns = 0
+        self.close_index = None
         self.close_date = None
         self.close_price = None
         self.duration = None
@@ -17,21 +30,22 @@ class Trade:
         self.stop_loss = stop_loss
         self.max_drawdown = 0
         self.pct_max_drawdown = 0
-        self.data = data
         self.equity_balance = equity_balance
         self.open = True
 
-    def close_trade(self, close_date, close_price):
+    def close_trade(self, close_date, close_price, close_index, extrema):
+        # extrema is the PriceExtrema of the backtested data, trades only keep row positions
+        self.close_index = close_index
         self.close_date = close_date
         self.close_price = round(close_price, 2)
         if self.position == 'Buy':
             self.returns = round((self.close_price - self.open_price) * self.shares, 2)
-            self.max_drawdown = round((self.data.loc[self.open_date:self.close_date]['SPY Low Price'].min() - self.open_price) * self.shares, 2)
+            self.max_drawdown = round((extrema.lowest(self.open_index, close_index) - self.open_price) * self.shares, 2)
             if self.returns < 0 and self.max_drawdown < self.returns:
                 self.max_drawdown = self.returns
         else:
             self.returns = round((self.open_price - self.close_price) * self.shares, 2)
-            self.max_drawdown = round((self.open_price - self.data.loc[self.open_date:self.close_date]['SPY High Price'].max()) * self.shares, 2)
+            self.max_drawdown = round((self.open_price - extrema.highest(self.open_index, close_index)) * self.shares, 2)
             if self.returns < 0 and self.max_drawdown < self.returns:
                 self.max_drawdown = self.returns
         self.pct_max_drawdown = round((self.max_drawdown / self.equity_balance) * 100, 2)
@@ -54,356 +68,154 @@ class Trade:
                 f"Max Drawdown (%): {self.pct_max_drawdown}% \n")
     
 class Backtest:
-    def __init__(self, data, initial_balance, buy_threshold, sell_threshold, risk_reward_ratio=3, loss_buffer=3, risk_per_trade=1):
+    def __init__(self, data, initial_balance, buy_threshold, sell_threshold, risk_reward_ratio=3, loss_buffer=3, risk_per_trade=1,
+                 engine='numpy', profiler=None):
         self.data = data
+        self.engine = resolve_engine(engine) # 'numba' runs the compiled kernels when Numba is installed
+        self.profiler = profiler # a profiling.Profiler collecting the time of each phase, None skips it
         self.initial_balance = initial_balance
         self.balance = initial_balance
-        self.trades = []
+        self.ledger = TradeLedger(STRATEGY2_FIELDS)
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
         self.risk_reward_ratio = risk_reward_ratio 
         self.loss_buffer = loss_buffer # percentage buffer we give for the stop loss from open price
         self.risk_per_trade = risk_per_trade 
-        self.signals = self.generate_signal(buy_threshold, sell_threshold)
+        self.extrema = cached(data, 'Price Extrema', lambda: PriceExtrema.from_frame(data), PRICE_RANGE_COLUMNS)
+        self.signals = timed(profiler, 'Signals', self.generate_signal, buy_threshold, sell_threshold, bars=len(data))
+        self.equity = None # daily equity of the last run
         self.report = {}
 
     def buy_and_hold_return(self):
+        # Shared by every backtest over the same frame and initial balance
+        return cached(self.data, ('Strategy 2 Buy and Hold', self.initial_balance), self._buy_and_hold_return,
+                      BUY_AND_HOLD_COLUMNS)
+
+    def _buy_and_hold_return(self):
         shares = self.initial_balance // self.data.iloc[0]['SPY Opening Price']
-        trade = Trade(self.data.index[0], self.data.iloc[0]['SPY Opening Price'], 'Buy', shares, None, None, self.data, self.initial_balance)
-        returns = trade.close_trade(self.data.index[-1], self.data.iloc[-1]['SPY Closing Price']).returns
+        trade = Trade(self.data.index[0], self.data.iloc[0]['SPY Opening Price'], 'Buy', shares, None, None, self.initial_balance, 0)
+        returns = trade.close_trade(self.data.index[-1], self.data.iloc[-1]['SPY Closing Price'], len(self.data) - 1, self.extrema).returns
         return returns
     
     def generate_signal(self, buy_threshold, sell_threshold):
-        open_buy = False
-        buy_tp = None
-        buy_sl = None
-        open_sell = False
-        sell_tp = None
-        sell_sl = None
-        signals = []
-
-        for index in range(0, len(self.data)):
-            # Check if any open buy positions hit take profit or stop loss, allow buy signal if so 
-            if open_buy and (self.data.iloc[index]['SPY High Price'] >= buy_tp or self.data.iloc[index]['SPY Low Price'] <= buy_sl):
-                open_buy = False
-                buy_tp = None
-                buy_sl = None
-            # Check if any open sell positions hit take profit or stop loss, allow sell signal if so
-            if open_sell and (self.data.iloc[index]['SPY Low Price'] <= sell_tp or self.data.iloc[index]['SPY High Price'] >= sell_sl):
-                open_sell = False
-                sell_tp = None
-                sell_sl = None
-            # Buy criteria hit, no existing buy position, set buy signal
-            if self.data.iloc[index]['Fear and Greed Index'] <= buy_threshold and not open_buy:
-                open_buy = True
-                buy_sl = self.data.iloc[index]['SPY Opening Price'] * (1 - (self.loss_buffer * 0.01))
-                buy_tp = self.data.iloc[index]['SPY Opening Price'] * (1 + (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                signals.append('Buy')
-            # Sell criteria hit, no existing sell position, set sell signal
-            elif self.data.iloc[index]['Fear and Greed Index'] >= sell_threshold and not open_sell:
-                open_sell = True
-                sell_sl = self.data.iloc[index]['SPY Opening Price'] * (1 + (self.loss_buffer * 0.01))
-                sell_tp = self.data.iloc[index]['SPY Opening Price'] * (1 - (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                signals.append('Sell')
-            # No new criteria hit or there is existing positions, set hold signal
-            else:
-                signals.append('Hold')
-            # Check if newly open buy position hit take profit or stop loss and on the same day, allow buy signal if so
-            if open_buy and (self.data.iloc[index]['SPY High Price'] >= buy_tp or self.data.iloc[index]['SPY Low Price'] <= buy_sl):
-                open_buy = False
-                buy_tp = None
-                buy_sl = None
-            # Check if newly open sell position hit take profit or stop loss and on the same day, allow sell signal if so
-            if open_sell and (self.data.iloc[index]['SPY Low Price'] <= sell_tp or self.data.iloc[index]['SPY High Price'] >= sell_sl):
-                open_sell = False
-                sell_tp = None
-                sell_sl = None
-        return signals
-    
-    def calculate_daily_equity(self):
-        daily_equity = pd.Series(index=self.data.index, dtype=float)
-        daily_equity.iloc[0] = self.initial_balance
-        current_balance = self.initial_balance
-        open_trades = []
-
-        for index in range(0, len(self.data)):
-            signal = self.signals[index]
-            open_price = self.data.iloc[index]['SPY Opening Price']
-            close_price = self.data.iloc[index]['SPY Closing Price']
-            high_price = self.data.iloc[index]['SPY High Price']
-            low_price = self.data.iloc[index]['SPY Low Price']
-            date = self.data.iloc[index].name
+        signals = bracket_signals
+        if self.engine == 'numba':
+            from . import compiled # imports Numba, so only backtests on the numba engine load it
+            signals = compiled.bracket_signals
+        return signals(self.data['SPY Opening Price'].to_numpy(), self.data['SPY High Price'].to_numpy(),
+                       self.data['SPY Low Price'].to_numpy(), self.data['Fear and Greed Index'].to_numpy(),
+                       buy_threshold, sell_threshold, self.risk_reward_ratio, self.loss_buffer)
 
-            # Handle last day of data, close all open positions
-            if index == len(self.data) - 1:
-                for trade in open_trades:
-                    trade.close_trade(date, close_price)
-                    current_balance += trade.returns
-                daily_equity[date] = current_balance
-                break
-            
-            # Handle rest of the days,
-            # Check closing positions first
-            for trade in open_trades:
-                if trade.position == 'Buy':
-                    if high_price >= trade.take_profit:
-                        trade.close_trade(date, trade.take_profit)
-                        current_balance += trade.returns
-                        open_trades.remove(trade)
-                    elif low_price <= trade.stop_loss:
-                        trade.close_trade(date, trade.stop_loss)
-                        current_balance += trade.returns
-                        open_trades.remove(trade)
-                else: # for sell position
-                    if low_price <= trade.take_profit:
-                        trade.close_trade(date, trade.take_profit)
-                        current_balance += trade.returns
-                        open_trades.remove(trade)
-                    elif high_price >= trade.stop_loss:
-                        trade.close_trade(date, trade.stop_loss)
-                        current_balance += trade.returns
-                        open_trades.remove(trade)
+    def simulate(self):
+        # Trade records and balance. The numba engine returns the trades as ledger columns
+        if self.engine == 'numba':
+            from . import compiled
+            return compiled.simulate_bracket_orders(self.data.index, self.data['SPY Opening Price'].to_numpy(),
+                                                    self.data['SPY High Price'].to_numpy(), self.data['SPY Low Price'].to_numpy(),
+                                                    self.data['SPY Closing Price'].to_numpy(), self.signals, self.initial_balance,
+                                                    self.risk_reward_ratio, self.loss_buffer, self.risk_per_trade)
+        return simulate_bracket_orders(self.data.index, self.data['SPY Opening Price'].to_numpy(),
+                                       self.data['SPY High Price'].to_numpy(), self.data['SPY Low Price'].to_numpy(),
+                                       self.data['SPY Closing Price'].to_numpy(), self.signals, self.initial_balance,
+                                       self.risk_reward_ratio, self.loss_buffer, self.risk_per_trade, self.extrema)
 
-            # Check any positions to open and close on the same day if necessary
-            if signal == 'Buy':
-                risk_amount = self.risk_per_trade * 0.01 * current_balance 
-                buy_tp = open_price * (1 + (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                buy_sl = open_price * (1 - (self.loss_buffer * 0.01))
-                shares = risk_amount // (open_price - buy_sl) 
-                new_trade = Trade(date, open_price, 'Buy', shares, buy_tp, buy_sl, self.data, current_balance)
-                # Check if we can close on the same day
-                if high_price >= buy_tp:
-                    new_trade.close_trade(date, buy_tp)
-                    current_balance += new_trade.returns
-                elif low_price <= buy_sl:
-                    new_trade.close_trade(date, buy_sl)
-                    current_balance += new_trade.returns
-                else:
-                    open_trades.append(new_trade)
-            elif signal == 'Sell':
-                risk_amount = self.risk_per_trade * 0.01 * current_balance 
-                sell_tp = open_price * (1 - (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                sell_sl = open_price * (1 + (self.loss_buffer * 0.01))
-                shares = risk_amount // (sell_sl - open_price)
-                new_trade = Trade(date, open_price, 'Sell', shares, sell_tp, sell_sl, self.data, current_balance)
-                # Check if we can close on the same day
-                if low_price <= sell_tp:
-                    new_trade.close_trade(date, sell_tp)
-                    current_balance += new_trade.returns
-                elif high_price >= sell_sl:
-                    new_trade.close_trade(date, sell_sl)
-                    current_balance += new_trade.returns
-                else:
-                    open_trades.append(new_trade)
+    def calculate_daily_equity(self):
+        # Kept from the last run. Before the first one no trade has moved the balance, so the curve is flat
+        if self.equity is None:
+            return pd.Series(float(self.initial_balance), index=self.data.index)
+        return pd.Series(self.equity, index=self.data.index)
 
-            # Calculate unrealized P/L and update daily equity
-            unrealized_pl = sum(
-                trade.shares * (close_price - trade.open_price) if trade.position == 'Buy'
-                else trade.shares * (trade.open_price - close_price)
-                for trade in open_trades
-            )
-            daily_equity[date] = current_balance + unrealized_pl
+    def _fill_ledger(self):
+        trades, balance = self.simulate()
+        if self.engine == 'numba':
+            self.ledger = TradeLedger.from_columns(STRATEGY2_FIELDS, trades)
+        else:
+            self.ledger.clear()
+            self.ledger.extend(trades)
+        return np.float64(balance) if len(self.ledger) else self.initial_balance
 
-        return daily_equity
+    def _equity(self):
+        return bracket_equity(self.data['SPY Closing Price'].to_numpy(), self.initial_balance, self.ledger)
 
     def backtest(self):
-        for index in range(0, len(self.data)):
-            signal = self.signals[index]
-            open_price = self.data.iloc[index]['SPY Opening Price']
-            close_price = self.data.iloc[index]['SPY Closing Price']
-            high_price = self.data.iloc[index]['SPY High Price']
-            low_price = self.data.iloc[index]['SPY Low Price']
-            date = self.data.iloc[index].name
-
-            # Handle last day of data, close all open positions
-            if index == len(self.data) - 1:
-                if self.trades:
-                    for trade in self.trades:
-                        if trade.open:
-                            trade.close_trade(date, close_price)
-                            self.balance += trade.returns
-                break
-            
-            # Handle rest of the days,
-            # Check closing positions first
-            if self.signals:
-                for trade in self.trades:
-                    if trade.open:
-                        if trade.position == 'Buy':
-                            if high_price >= trade.take_profit:
-                                trade.close_trade(date, trade.take_profit)
-                                self.balance += trade.returns
-                            elif low_price <= trade.stop_loss:
-                                trade.close_trade(date, trade.stop_loss)
-                                self.balance += trade.returns
-                            else:
-                                continue
-                        else: # for sell position
-                            if low_price <= trade.take_profit:
-                                trade.close_trade(date, trade.take_profit)
-                                self.balance += trade.returns
-                            elif high_price >= trade.stop_loss:
-                                trade.close_trade(date, trade.stop_loss)
-                                self.balance += trade.returns
-                            else:
-                                continue
-             # Check any positions to open and close on the same day if necessary
-             # Check if we can open a buy position
-            if signal == 'Buy':
-                risk_amount = self.risk_per_trade * 0.01 * self.balance 
-                buy_tp = open_price * (1 + (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                buy_sl = open_price * (1 - (self.loss_buffer * 0.01))
-                shares = risk_amount // (open_price - buy_sl) # when I lose, I lose the entire risk amount
-                self.trades.append(Trade(date, open_price, 'Buy', shares, buy_tp, buy_sl, self.data, self.balance))
-                # Check if we can close on the same day
-                if high_price >= buy_tp:
-                    self.trades[-1].close_trade(date, buy_tp)
-                    self.balance += self.trades[-1].returns
-                elif low_price <= buy_sl:
-                    self.trades[-1].close_trade(date, buy_sl)
-                    self.balance += self.trades[-1].returns
-            # Check if we can open a sell position
-            elif signal == 'Sell':
-                risk_amount = self.risk_per_trade * 0.01 * self.balance 
-                sell_tp = open_price * (1 - (self.loss_buffer * 0.01 * self.risk_reward_ratio))
-                sell_sl = open_price * (1 + (self.loss_buffer * 0.01))
-                shares = risk_amount // (sell_sl - open_price)
-                self.trades.append(Trade(date, open_price, 'Sell', shares, sell_tp, sell_sl, self.data, self.balance))
-                # Check if we can close on the same day
-                if low_price <= sell_tp:
-                    self.trades[-1].close_trade(date, sell_tp)
-                    self.balance += self.trades[-1].returns
-                elif high_price >= sell_sl:
-                    self.trades[-1].close_trade(date, sell_sl)
-                    self.balance += self.trades[-1].returns
-            else:
-                continue
-        self.report = self.generate_report()
+        self.balance = timed(self.profiler, 'Simulation', self._fill_ledger, bars=len(self.data))
+        if self.profiler is not None:
+            self.profiler.count_trades('Simulation', self.ledger)
+        self.equity = timed(self.profiler, 'Equity', self._equity, bars=len(self.data))
+        self.report = {} # a new run invalidates the previous report
+        timed(self.profiler, 'Report', self.generate_report)
         return self
-    
-    def plot(self):
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True, height_ratios=[2, 1, 1])
-
-        ax1.plot(self.data.index, self.data['SPY Opening Price'], label='SPY Opening Price', color='blue')
-        buy_signals = [trade for trade in self.trades if trade.position == 'Buy']
-        sell_signals = [trade for trade in self.trades if trade.position == 'Sell']
-        ax1.scatter([trade.open_date for trade in buy_signals], [trade.open_price for trade in buy_signals], 
-                    label='Buy', color='green', marker='^', s=70, zorder=5)
-        ax1.scatter([trade.open_date for trade in sell_signals], [trade.open_price for trade in sell_signals], 
-                    label='Sell', color='red', marker='v', s=70, zorder=5)
-        ax1.set_ylabel('SPY Opening Price')
-        ax1.legend(loc='upper left')
 
-        ax2.plot(self.data.index, self.data['Fear and Greed Index'], label='Fear and Greed Index', color='orange')
-        ax2.set_ylabel('Fear and Greed Index')
-        ax2.legend(loc='upper left')
+    def stream(self):
+        # Streaming form of this backtest, replayed over the data and ready to be fed new days with update()
+        stream = BracketStream(self.initial_balance, self.buy_threshold, self.sell_threshold,
+                               self.risk_reward_ratio, self.loss_buffer, self.risk_per_trade)
+        return stream.replay(self.data)
 
-        initial_shares = self.initial_balance // self.data.iloc[0]['SPY Opening Price']
-        buy_hold_equity = self.data['SPY Closing Price'] * initial_shares
-        buy_hold_equity.iloc[0] = self.initial_balance
-        daily_equity = self.calculate_daily_equity()
-        
-        ax3.plot(daily_equity.index, daily_equity.values, label='Strategy', color='purple')
-        ax3.plot(self.data.index, buy_hold_equity, label='Buy & Hold', color='grey')
-        ax3.set_ylabel('Equity Balance')
-        ax3.set_xlabel('Date')
-        ax3.legend(loc='upper left')
+    @property
+    def trades(self):
+        # Trade objects are built on demand from the ledger, which is what the backtest itself keeps
+        return [self.trade_at(row) for row in range(len(self.ledger))]
 
-        fig.suptitle('Backtest of Trading Strategy', size=12, weight='bold', y=1)
-        plt.tight_layout()
-        plt.subplots_adjust(hspace=0.1)
-
-        plt.show()
+    def trade_at(self, row):
+        ledger = self.ledger
+        open_index = int(ledger['open_index'][row])
+        trade = Trade(self.data.index[open_index], ledger['open_price'][row], SIGNAL_NAMES[int(ledger['position'][row])],
+                      ledger['shares'][row], ledger['take_profit'][row], ledger['stop_loss'][row],
+                      ledger['equity_balance'][row], open_index)
+        close_index = int(ledger['close_index'][row])
+        if close_index >= 0:
+            trade.close_index = close_index
+            trade.close_date = self.data.index[close_index]
+            trade.close_price = ledger['close_price'][row]
+            trade.returns = ledger['returns'][row]
+            trade.pct_returns = ledger['pct_returns'][row]
+            trade.duration = int(ledger['duration'][row])
+            trade.max_drawdown = ledger['max_drawdown'][row]
+            trade.pct_max_drawdown = ledger['pct_max_drawdown'][row]
+            trade.open = False
+        return trade
+    
+    def plot(self):
+        from .plotting import plot_strategy2 # matplotlib is only imported once something is plotted
+        plot_strategy2(self)
 
     def transaction_records(self):
-        records = []
-        for trade in self.trades:
-            if trade.close_date:
-                records.append({
-                    'Open Date': trade.open_date,
-                    'Open Price': trade.open_price,
-                    'Position': trade.position,
-                    'Shares': trade.shares,
-                    'Close Date': trade.close_date,
-                    'Close Price': trade.close_price,
-                    'Returns': trade.returns,
-                    'Returns (%)': trade.pct_returns,
-                    'Duration': trade.duration,
-                    'Max Drawdown': trade.max_drawdown,
-                    'Max Drawdown (%)': trade.pct_max_drawdown,
-                    'Equity Balance': self.initial_balance + trade.returns if trade == self.trades[0] else records[-1]['Equity Balance'] + trade.returns
-                })
-            else:
-                records.append({
-                    'Open Date': trade.open_date,
-                    'Open Price': trade.open_price,
-                    'Position': trade.position,
-                    'Shares': trade.shares,
-                    'Close Date': None,
-                    'Close Price': None,
-                    'Returns': None,
-                    'Returns (%)': None,
-                    'Duration': None,
-                    'Max Drawdown': None,
-                    'Max Drawdown (%)': None,
-                    'Equity Balance': None
-                })
-        return pd.DataFrame(records)
-    
-    def generate_report(self):
-        total_trades = len(self.trades)
-        durations = [trade.duration for trade in self.trades if trade.duration is not None]
-        avg_duration = np.mean(durations) if durations else 0
-        winners = [trade for trade in self.trades if trade.returns > 0]
-        losers = [trade for trade in self.trades if trade.returns < 0]
-        buy_and_hold_returns = self.buy_and_hold_return()
-        average_drawdown = np.mean([trade.max_drawdown for trade in self.trades])
-        pct_average_drawdown = np.mean([trade.pct_max_drawdown for trade in self.trades])
-        max_loss_streak, current_loss_streak = 0, 0
-        for trade in self.trades:
-            if trade.returns < 0:
-                current_loss_streak += 1
-                max_loss_streak = max(max_loss_streak, current_loss_streak)
-            else:
-                current_loss_streak = 0
-        total_returns = self.balance - self.initial_balance
+        return timed(self.profiler, 'Transaction Records', self._transaction_records)
 
-        report = {
-            'Start Date': self.data.index.min(),
-            'End Date': self.data.index.max(),
-            'Backtest Duration': (self.data.index.max() - self.data.index.min()).days,
-            'Total Trades': len(self.trades),
-            'Total Buys': len([trade for trade in self.trades if trade.position == 'Buy']),
-            'Total Sells': len([trade for trade in self.trades if trade.position == 'Sell']),
-            'Initial Balance': self.initial_balance,
-            'Final Balance': round(self.balance, 2),
-            'Total Returns': round(total_returns, 2),
-            'Total Returns (%)': round((total_returns / self.initial_balance) * 100, 2),
-            'Annualised Returns (%)': round(((1 + total_returns / self.initial_balance) ** (365 / (self.data.index.max() - self.data.index.min()).days) - 1) * 100, 2),
-            'Average Returns': round(total_returns / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Average Returns (%)': round((total_returns / self.initial_balance) * 100 / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Average Returns Per Trade': round(total_returns / total_trades, 2),
-            'Average Returns Per Trade (%)': round((total_returns / self.initial_balance) * 100 / total_trades, 2),
-            'Average Trade Duration': int(avg_duration),
-            'Number of Winners': len(winners),
-            'Number of Long Winners': len([trade for trade in winners if trade.position == 'Buy']),
-            'Number of Short Winners': len([trade for trade in winners if trade.position == 'Sell']),
-            'Average Winner Returns': round(np.mean([trade.returns for trade in winners]), 2) if winners else 0,
-            'Average Winner Returns (%)': round(np.mean([trade.pct_returns for trade in winners]), 2) if winners else 0,
-            'Number of Losers': len(losers),
-            'Number of Long Losers': len([trade for trade in losers if trade.position == 'Buy']),
-            'Number of Short Losers': len([trade for trade in losers if trade.position == 'Sell']),
-            'Average Loser Returns': round(np.mean([trade.returns for trade in losers]), 2) if losers else 0,
-            'Average Loser Returns (%)': round(np.mean([trade.pct_returns for trade in losers]), 2) if losers else 0,
-            'Win Rate (%)': round((len(winners) / total_trades) * 100, 2),
-            'Average Drawdown': round(average_drawdown, 2),
-            'Average Drawdown (%)': round(pct_average_drawdown, 2),
-            'Max Loss Streak': max_loss_streak,
-            'Buy and Hold Returns': round(buy_and_hold_returns, 2),
-            'Buy and Hold Returns (%)': round((buy_and_hold_returns / self.initial_balance) * 100, 2),
-            'Annualised Buy and Hold Returns (%)': round(((1 + buy_and_hold_returns / self.initial_balance) ** (365 / (self.data.index.max() - self.data.index.min()).days) - 1) * 100, 2),
-            'Average Buy and Hold Returns (%)': round((buy_and_hold_returns / self.initial_balance) * 100 / (self.data.index.max().year - self.data.index.min().year), 2),
-            'Performance vs Buy and Hold (%)': round(((self.balance - (buy_and_hold_returns + self.initial_balance)) / (buy_and_hold_returns + self.initial_balance)) * 100, 2)
+    def _transaction_records(self):
+        # Ledger columns go into the DataFrame as they are, only dates, position names and equity are derived
+        trades = self.ledger
+        if not len(trades):
+            return pd.DataFrame()
+        closed = trades['close_index'] >= 0
+        records = {
+            'Open Date': self.data.index[trades['open_index']],
+            'Open Price': trades['open_price'],
+            'Position': np.where(trades['position'] == BUY, 'Buy', 'Sell').astype(object),
+            'Shares': trades['shares'],
+            'Close Date': self.data.index[trades['close_index']].where(closed),
+            'Close Price': trades['close_price'],
+            'Returns': trades['returns'],
+            'Returns (%)': trades['pct_returns'],
+            'Duration': trades['duration'],
+            'Max Drawdown': trades['max_drawdown'],
+            'Max Drawdown (%)': trades['pct_max_drawdown'],
+            'Equity Balance': np.cumsum(np.concatenate(([self.initial_balance], np.where(closed, trades['returns'], 0))))[1:]
         }
-        return report
+        if not closed.all():
+            # Open trades have no results yet
+            for column in ['Returns', 'Returns (%)', 'Duration', 'Max Drawdown', 'Max Drawdown (%)', 'Equity Balance']:
+                records[column] = np.where(closed, records[column], np.nan)
+        return pd.DataFrame(records, copy=False)
+    
+    def generate_report(self):
+        # Computed once per backtest run, backtest() clears it so reports are never stale
+        if not self.report:
+            self.report = strategy2_report(self.data.index.min(), self.data.index.max(), self.initial_balance, self.balance,
+                                           self.buy_and_hold_return(), self.ledger, self.data.index,
+                                           self.calculate_daily_equity().to_numpy())
+        return self.report
     
     def backtest_report(self):
         report = self.generate_report()
@@ -440,6 +252,13 @@ class Backtest:
             f"Average Drawdown: {report['Average Drawdown']} \n"
             f"Average Drawdown (%): {report['Average Drawdown (%)']}% \n"
             f"Max Loss Streak: {report['Max Loss Streak']} \n"
+            f"Max Equity Drawdown: {report['Max Equity Drawdown']} \n"
+            f"Max Equity Drawdown (%): {report['Max Equity Drawdown (%)']}% \n"
+            f"Max Drawdown Duration: {report['Max Drawdown Duration']} days \n"
+            f"Volatility (%): {report['Volatility (%)']}% \n"
+            f"Sharpe Ratio: {report['Sharpe Ratio']} \n"
+            f"Sortino Ratio: {report['Sortino Ratio']} \n"
+            f"Exposure (%): {report['Exposure (%)']}% \n"
             f"Buy and Hold Returns: {report['Buy and Hold Returns']} \n"
             f"Buy and Hold Returns (%): {report['Buy and Hold Returns (%)']}% \n"
             f"Annualised Buy and Hold Returns (%): {report['Annualised Buy and Hold Returns (%)']}% \n"
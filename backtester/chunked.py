@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from .dataset import DatasetStore
+from .engine import (NS_PER_DAY, bracket_buy_and_hold, bracket_equity, bracket_events, first_exit, size_bracket_schedule,
+                     to_nanoseconds)
+from .ledger import STRATEGY2_FIELDS, TradeLedger
+from .profiling import timed
+from .report import strategy2_report
+from .signals import BUY, SELL
+
+PRICE_COLUMNS = ['SPY Opening Price', 'SPY High Price', 'SPY Low Price', 'SPY Closing Price']
+INDEX_COLUMN = 'Fear and Greed Index'
+
+
+class ChunkedBacktest:
+    # Strategy 2 over the bars of a DatasetStore too long to load, e.g. tens of millions of minute bars, read
+    # chunk_size rows at a time from windows of the column files mapped one chunk at a time. The signal state of
+    # bracket_signals and the open positions carry over from one chunk to the next, and a chunk jumps from event to
+    # event: the next bar whose index allows a buy or a sell while that side is free, or the first bar hitting the
+    # bracket of an open position, found like bracket_schedule finds it. The trades are then sized by
+    # size_bracket_schedule. Only the close of the last bar of each day is kept for the equity curve and the report,
+    # so memory grows with the days and trades of the history, not its bars. Bars take the Fear and Greed Index of
+    # their date from scores (a Series by date), lag days earlier to only use scores published before the bar, or
+    # the store's own index column when scores is None. On daily bars without a lag the ledger, balance, equity and
+    # report are exactly those of Backtest2
+    def __init__(self, store, initial_balance, buy_threshold, sell_threshold, risk_reward_ratio=3, loss_buffer=3,
+                 risk_per_trade=1, scores=None, lag=0, chunk_size=2 ** 20, profiler=None):
+        self.store = store if isinstance(store, DatasetStore) else DatasetStore(store)
+        self.initial_balance = initial_balance
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.risk_reward_ratio = risk_reward_ratio
+        self.loss_buffer = loss_buffer
+        self.risk_per_trade = risk_per_trade
+        self.lag = lag
+        self.chunk_size = chunk_size
+        self.profiler = profiler
+        if scores is None:
+            self.score_days = self.score_values = None
+        else:
+            self.score_days = to_nanoseconds(scores.index) // NS_PER_DAY
+            self.score_values = scores.to_numpy(dtype=float)
+        self.balance = initial_balance
+        self.ledger = TradeLedger(STRATEGY2_FIELDS)
+        self.equity = None # at the close of the last bar of each day
+        self.equity_dates = None
+        self.first_open = self.last_close = None # time and price of the first open and last close of the history
+        self.report = {}
+
+    def _bar_scores(self, nanoseconds):
+        # The score of each bar's date, or of the last date before it with one
+        positions = np.searchsorted(self.score_days, nanoseconds // NS_PER_DAY, side='right') - 1 - self.lag
+        return np.where(positions >= 0, self.score_values[np.maximum(positions, 0)], np.nan)
+
+    def schedule(self):
+        # Trades of the history as bracket_schedule tuples in the order they were opened, with the bar positions,
+        # times and closing prices of the last bar of each day
+        meta = self.store.meta
+        length = meta['length']
+        last_index = length - 1
+        names = PRICE_COLUMNS + ([INDEX_COLUMN] if self.score_days is None else [])
+        stop_factor = self.loss_buffer * 0.01
+        target_factor = self.loss_buffer * 0.01 * self.risk_reward_ratio
+        # Open position of each side as [trade, take profit, stop loss, open time, extreme price, first bar not in it]
+        positions = {BUY: None, SELL: None}
+        trades = []
+        samples = []
+
+        def close(side, bar, start, price, times, low, high):
+            trade, _, _, open_time, extreme, scanned = positions[side]
+            positions[side] = None
+            if side == BUY:
+                extreme = np.fmin(extreme, np.fmin.reduce(low[max(scanned - start, 0):bar - start + 1]))
+            else:
+                extreme = np.fmax(extreme, np.fmax.reduce(high[max(scanned - start, 0):bar - start + 1]))
+            trade[5:] = [bar, price, extreme, int(times[bar - start] - open_time) // NS_PER_DAY]
+
+        def exits(side, high, low):
+            take_profit, stop_loss = positions[side][1], positions[side][2]
+            if side == BUY:
+                return take_profit if high >= take_profit else stop_loss if low <= stop_loss else None
+            return take_profit if low <= take_profit else stop_loss if high >= stop_loss else None
+
+        for start in range(0, length, self.chunk_size):
+            stop = min(start + self.chunk_size, length)
+            # One bar past the chunk tells whether its last bar ends a day
+            times, columns = self.store.window(start, stop + 1, names, meta)
+            times = to_nanoseconds(times)
+            open_price, high_price, low_price, close_price = (np.asarray(column[:stop - start], dtype=float)
+                                                              for column in columns[:4])
+            if len(columns) > 4:
+                index = np.asarray(columns[4][:stop - start], dtype=float)
+            else:
+                index = self._bar_scores(times[:stop - start])
+            if start == 0:
+                self.first_open = (times[0], open_price[0])
+            days = times // NS_PER_DAY
+            ends = np.flatnonzero(days[1:] != days[:-1])
+            if stop == length:
+                ends = np.append(ends, stop - start - 1)
+            samples.append((ends + start, times[ends], close_price[ends]))
+
+            buy_days = np.flatnonzero(index <= self.buy_threshold)
+            sell_days = np.flatnonzero(index >= self.sell_threshold)
+            # The last bar of the history only closes positions
+            chunk_end = min(stop, last_index) - start
+            bar = 0
+            while bar < chunk_end:
+                candidates = []
+                for side, side_days in ((BUY, buy_days), (SELL, sell_days)):
+                    if positions[side] is None:
+                        following = np.searchsorted(side_days, bar)
+                        candidates.append(side_days[following] if following < len(side_days) else chunk_end)
+                    else:
+                        candidates.append(first_exit(high_price, low_price, bar, chunk_end, side, positions[side][1],
+                                                     positions[side][2]))
+                bar = int(min(candidates))
+                if bar >= chunk_end:
+                    break
+
+                # The bar as bracket_signals sees it: exits, then a signal, then an exit of the new position
+                high, low = float(high_price[bar]), float(low_price[bar])
+                for side in (BUY, SELL):
+                    if positions[side] is not None:
+                        price = exits(side, high, low)
+                        if price is not None:
+                            close(side, start + bar, start, price, times, low_price, high_price)
+                side = None
+                if index[bar] <= self.buy_threshold and positions[BUY] is None:
+                    side = BUY
+                elif index[bar] >= self.sell_threshold and positions[SELL] is None:
+                    side = SELL
+                if side is not None:
+                    price = float(open_price[bar])
+                    if side == BUY:
+                        take_profit = price * (1 + target_factor)
+                        stop_loss = price * (1 - stop_factor)
+                    else:
+                        take_profit = price * (1 - target_factor)
+                        stop_loss = price * (1 + stop_factor)
+                    trade = [start + bar, side, price, take_profit, stop_loss, None, None, None, None]
+                    trades.append(trade)
+                    positions[side] = [trade, take_profit, stop_loss, times[bar], np.inf if side == BUY else -np.inf,
+                                       start + bar]
+                    price = exits(side, high, low)
+                    if price is not None:
+                        close(side, start + bar, start, price, times, low_price, high_price)
+                bar += 1
+
+            for side in (BUY, SELL):
+                position = positions[side]
+                if position is None:
+                    continue
+                if stop == length:
+                    close(side, last_index, start, float(close_price[last_index - start]), times, low_price, high_price)
+                else:
+                    # Extreme of the rest of the chunk, the next chunk carries on from its start
+                    window = slice(max(position[5] - start, 0), stop - start)
+                    if side == BUY:
+                        position[4] = np.fmin(position[4], np.fmin.reduce(low_price[window]))
+                    else:
+                        position[4] = np.fmax(position[4], np.fmax.reduce(high_price[window]))
+                    position[5] = stop
+            if stop == length:
+                self.last_close = (times[stop - start - 1], close_price[-1])
+
+        bars, times, close_price = (np.concatenate(parts) for parts in zip(*samples))
+        return [tuple(trade) for trade in trades], bars, times, close_price
+
+    def backtest(self):
+        length = self.store.meta['length']
+        trades, bars, times, close_price = timed(self.profiler, 'Schedule', self.schedule, bars=length)
+        records, balance = timed(self.profiler, 'Sizing', size_bracket_schedule, (trades, bracket_events(trades)),
+                                 self.initial_balance, self.risk_per_trade)
+        self.ledger = TradeLedger.from_records(STRATEGY2_FIELDS, records)
+        self.balance = np.float64(balance) if records else self.initial_balance
+        if self.profiler is not None:
+            self.profiler.count_trades('Schedule', self.ledger)
+        self.equity = timed(self.profiler, 'Equity', bracket_equity, close_price, self.initial_balance, self.ledger, bars)
+        self.equity_dates = pd.DatetimeIndex(times.astype('datetime64[ns]'), name=self.store.meta['index']['name'])
+        self.report = timed(self.profiler, 'Report', self._report, bars, self.equity_dates)
+        return self
+
+    def calculate_daily_equity(self):
+        return pd.Series(self.equity, index=self.equity_dates)
+
+    def _report(self, bars, dates):
+        # Trades are counted in days for the exposure of the equity curve, which has one value per day
+        trades = self.ledger.columns()
+        close_index = trades['close_index']
+        trades['open_index'] = np.searchsorted(bars, trades['open_index'])
+        trades['close_index'] = np.where(close_index >= 0, np.searchsorted(bars, close_index), -1)
+        start_date = pd.Timestamp(self.first_open[0])
+        end_date = pd.Timestamp(self.last_close[0])
+        buy_and_hold_returns = bracket_buy_and_hold(self.first_open[1], self.last_close[1], self.initial_balance)
+        return strategy2_report(start_date, end_date, self.initial_balance, self.balance, buy_and_hold_returns, trades,
+                                dates, self.equity)
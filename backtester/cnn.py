@@ -0,0 +1,192 @@
+import json
+import re
+from array import array
+
+import numpy as np
+import pandas as pd
+
+SCORE_SERIES = 'fear_and_greed_historical'
+CHUNK_SIZE = 1 << 16
+DELIMITERS = ',:]} \t\r\n'
+
+_decoder = json.JSONDecoder()
+# Points as CNN writes them, anything else goes through the JSON decoder
+_POINT = re.compile(r'\{"x":\s*([-+.\deE]+),\s*"y":\s*([-+.\deE]+|null),\s*"rating":\s*"([^"\\]*)"\}')
+
+
+class IndicatorSeries:
+    # One indicator of the CNN payload as typed columns: dates, values and ratings as int8 codes into rating_names,
+    # -1 for a point without a rating, which frame() shows as a missing rating.
+    # meta holds the other fields of the indicator, e.g. its latest score and rating
+    def __init__(self, name, dates, values, ratings, rating_names, meta):
+        self.name = name
+        self.dates = dates
+        self.values = values
+        self.ratings = ratings
+        self.rating_names = rating_names
+        self.meta = meta
+
+    def __len__(self):
+        return len(self.dates)
+
+    def frame(self):
+        return pd.DataFrame({'Value': self.values,
+                             'Rating': pd.Categorical.from_codes(self.ratings, categories=self.rating_names)},
+                            index=pd.DatetimeIndex(self.dates, name='Date'))
+
+
+class CNNPayload:
+    # Every indicator series with a data array, and the objects without one such as the current fear_and_greed reading
+    def __init__(self, series, current):
+        self.series = series
+        self.current = current
+
+    def __getitem__(self, name):
+        return self.series[name]
+
+
+class _Reader:
+    # Reads a JSON document in chunks so only the part being parsed is held in memory
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.position} of the JSON chunk")
+        self.position += 1
+
+    def skip(self, char):
+        # Consume char if it is next, used for the commas between members
+        if self.peek() == char:
+            self.position += 1
+            return True
+        return False
+
+    def value(self):
+        # Small values only. A value has to be followed by a delimiter, a number cut off by the end of the buffer
+        # (e.g. '38.' of '38.91') decodes without error but continues in the next chunk
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            if (end == len(self.buffer) or self.buffer[end] not in DELIMITERS) and self.fill():
+                continue
+            self.position = end
+            return value
+
+
+def _read_series(reader, name, value_dtype, keep=True):
+    # Data points go straight into C arrays instead of a list of dicts
+    dates = array('d')
+    values = array('d')
+    ratings = array('b')
+    rating_codes = {}
+    meta = {}
+    has_data = False
+    reader.expect('{')
+    while not reader.skip('}'):
+        key = reader.value()
+        reader.expect(':')
+        if key == 'data' and reader.peek() == '[':
+            has_data = True
+            reader.expect('[')
+            while not keep:
+                # Points hold no brackets, so a series that is not wanted is skipped up to the end of its data
+                end = reader.buffer.find(']', reader.position)
+                if end >= 0:
+                    reader.position = end + 1
+                    break
+                reader.position = len(reader.buffer)
+                if not reader.fill():
+                    raise ValueError(f"Unterminated data array in {name}")
+            while keep:
+                # Every complete point in the buffer is converted in one go when they all have the usual layout
+                buffer, start = reader.buffer, reader.position
+                end = buffer.find(']', start)
+                stop = end if end >= 0 else buffer.rfind('}', start) + 1
+                if stop > start:
+                    points = _POINT.findall(buffer, start, stop)
+                    if points and len(points) == buffer.count('{', start, stop):
+                        x, y, rating = zip(*points)
+                        if 'null' in y:
+                            y = ['nan' if value == 'null' else value for value in y]
+                        dates.frombytes(np.array(x, dtype=np.float64).tobytes())
+                        values.frombytes(np.array(y, dtype=np.float64).tobytes())
+                        ratings.frombytes(np.array([rating_codes.setdefault(value, len(rating_codes)) for value in rating],
+                                                   dtype=np.int8).tobytes())
+                        reader.position = stop
+                        continue
+                if reader.skip(']'):
+                    break
+                if reader.skip(','):
+                    continue
+                point = reader.value()
+                dates.append(point['x'])
+                values.append(np.nan if point['y'] is None else point['y'])
+                rating = point.get('rating')
+                ratings.append(-1 if rating is None else rating_codes.setdefault(rating, len(rating_codes)))
+                reader.skip(',')
+        else:
+            meta[key] = reader.value()
+        reader.skip(',')
+    if not has_data:
+        return None, meta
+    return IndicatorSeries(name,
+                           np.frombuffer(dates, dtype=np.float64).astype(np.int64).astype('datetime64[ms]'),
+                           np.frombuffer(values, dtype=np.float64).astype(value_dtype),
+                           np.frombuffer(ratings, dtype=np.int8).copy(),
+                           list(rating_codes), meta), meta
+
+
+def read_payload(source, score_dtype=np.float32, value_dtype=np.float64, names=None, chunk_size=CHUNK_SIZE):
+    # source is a path or an open text file of the graphdata response. The Fear and Greed scores are kept as
+    # score_dtype, the other indicators (index levels, ratios) as value_dtype as float32 would round them.
+    # names limits the series that are parsed, the data of the others is skipped
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        with open(source) as file:
+            return read_payload(file, score_dtype, value_dtype, names, chunk_size)
+
+    reader = _Reader(source, chunk_size)
+    series = {}
+    current = {}
+    reader.expect('{')
+    while not reader.skip('}'):
+        name = reader.value()
+        reader.expect(':')
+        if reader.peek() == '{':
+            keep = names is None or name in names
+            indicator, meta = _read_series(reader, name, score_dtype if name == SCORE_SERIES else value_dtype, keep)
+            if indicator is None:
+                current[name] = meta
+            elif keep:
+                series[name] = indicator
+        else:
+            current[name] = reader.value()
+        reader.skip(',')
+    return CNNPayload(series, current)
@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from .cnn import SCORE_SERIES, read_payload
+
+GRAPHDATA_URL = 'https://production.dataviz.cnn.io/index/fearandgreed/graphdata/'
+HEADERS = {
+    'User-Agent': "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+}
+LATEST = 'latest'
+
+
+def missing_ranges(dates, end):
+    # Runs of consecutive weekdays up to end that are not in dates, as (first, last) day pairs. Market holidays come
+    # out as short runs too, any cached response fetched after them answers them without a request
+    dates = pd.DatetimeIndex(dates).normalize()
+    weekdays = pd.bdate_range(dates.min(), pd.Timestamp(end).normalize())
+    missing = weekdays[~weekdays.isin(dates)]
+    if not len(missing):
+        return []
+    breaks = np.flatnonzero(np.diff(missing.to_numpy().astype('datetime64[D]').astype(np.int64)) > 3) + 1
+    return [(run[0], run[-1]) for run in np.split(missing, breaks)]
+
+
+def run_coroutine(coroutine):
+    # asyncio.run, in a worker thread with its own loop when this thread already runs one, e.g. in Jupyter
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class CNNFetcher:
+    # Graphdata responses cached on disk, one file per key: 'latest' for graphdata/ and the start date for
+    # graphdata/<date>, next to a .json.meta file with the response validators and the fetch time. A response is used
+    # without any request while it is younger than ttl or, for a dated one, once it was fetched after the last day it
+    # is needed for, as history does not change. Otherwise it is revalidated with If-None-Match / If-Modified-Since
+    # and a 304 keeps the cached body. graphdata/<date> answers every day from date up to now, so a backfill is at
+    # most one request, for the first missing day no cached response answers. fetch sends any number of requests with at most concurrency in
+    # flight over one session. The fetch_ coroutines can be awaited from a running event loop, their blocking forms
+    # work with or without one
+    def __init__(self, directory, base_url=GRAPHDATA_URL, ttl=6 * 3600, concurrency=4, timeout=30):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/') + '/'
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.requests = 0 # requests sent over the network, revalidations included
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read_meta(self, key):
+        try:
+            with open(self.path(key) + '.meta') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, body, meta):
+        # Body first, each replaced in one step, so a crash never leaves a meta file for a partial body. A 304 only
+        # rewrites the meta file
+        files = [(self.path(key) + '.meta', json.dumps(meta).encode())]
+        if body is not None:
+            files.insert(0, (self.path(key), body))
+        for path, content in files:
+            with open(path + '.tmp', 'wb') as file:
+                file.write(content)
+            os.replace(path + '.tmp', path)
+
+    async def _get(self, session, semaphore, key, complete_after=None):
+        meta = self._read_meta(key)
+        if meta is not None and os.path.exists(self.path(key)):
+            if time.time() - meta['fetched_at'] < self.ttl or (complete_after is not None and meta['fetched_at'] >= complete_after):
+                return self.path(key)
+        headers = dict(HEADERS)
+        if meta is not None and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta is not None and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        async with semaphore:
+            async with session.get(self.base_url + ('' if key == LATEST else key), headers=headers) as response:
+                self.requests += 1
+                if response.status == 304 and meta is not None:
+                    meta['fetched_at'] = time.time()
+                    self._write(key, None, meta)
+                    return self.path(key)
+                response.raise_for_status()
+                body = await response.read()
+                meta = {'fetched_at': time.time(), 'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')}
+        self._write(key, body, meta)
+        return self.path(key)
+
+    async def fetch(self, requests):
+        # requests are (key, complete_after) pairs, paths come back in the same order
+        import aiohttp # only needed when something has to be fetched
+
+        os.makedirs(self.directory, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            return await asyncio.gather(*(self._get(session, semaphore, key, complete_after)
+                                          for key, complete_after in requests))
+
+    async def fetch_latest(self):
+        # Path of the graphdata/ response, fetched at most once per ttl
+        return (await self.fetch([(LATEST, None)]))[0]
+
+    def latest(self):
+        return run_coroutine(self.fetch_latest())
+
+    def current(self):
+        # The fear_and_greed object of the latest response: score, rating, timestamp and previous closes
+        return read_payload(self.latest(), names=[]).current['fear_and_greed']
+
+    def _dated_responses(self):
+        # (first day, key, fetch time) of the graphdata/<date> responses on disk, by first day
+        responses = []
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                key = name[:-len('.json')]
+                if name.endswith('.json') and key != LATEST:
+                    meta = self._read_meta(key)
+                    if meta is not None:
+                        responses.append((pd.Timestamp(key), key, meta['fetched_at']))
+        return responses
+
+    async def fetch_backfill(self, ranges):
+        # Fear and Greed Index scores of the days in the (first, last) ranges. A range is read from the shortest cached
+        # response starting before it and fetched after its last day, the others from one request starting at the
+        # first of them
+        responses = self._dated_responses()
+        sources = {}
+        missing = []
+        for first, last in ranges:
+            first, last = pd.Timestamp(first), pd.Timestamp(last)
+            complete_after = (last + pd.Timedelta(days=1)).timestamp()
+            key = next((key for day, key, fetched_at in reversed(responses)
+                        if day <= first and fetched_at >= complete_after), None)
+            if key is None:
+                missing.append((first, last))
+            else:
+                sources.setdefault(key, []).append((first, last))
+        if missing:
+            key = missing[0][0].strftime('%Y-%m-%d')
+            await self.fetch([(key, (missing[-1][1] + pd.Timedelta(days=1)).timestamp())])
+            sources.setdefault(key, []).extend(missing)
+
+        frames = [pd.DataFrame({'Date': np.array([], dtype='datetime64[ns]'), 'Score': np.array([], dtype=np.float64)})]
+        for key, key_ranges in sources.items():
+            series = read_payload(self.path(key), score_dtype=np.float64, names=[SCORE_SERIES])[SCORE_SERIES]
+            days = series.dates.astype('datetime64[D]').astype('datetime64[ns]')
+            firsts = np.array([first.to_datetime64() for first, _ in key_ranges], dtype='datetime64[ns]')
+            lasts = np.array([last.to_datetime64() for _, last in key_ranges], dtype='datetime64[ns]')
+            order = np.argsort(firsts)
+            firsts, lasts = firsts[order], lasts[order]
+            position = np.searchsorted(firsts, days, side='right') - 1
+            keep = (position >= 0) & (days <= lasts[np.maximum(position, 0)])
+            frames.append(pd.DataFrame({'Date': days[keep], 'Score': series.values[keep]}))
+        scores = pd.concat(frames, ignore_index=True)
+        return scores.drop_duplicates('Date', keep='last').sort_values('Date', ignore_index=True)
+
+    def backfill(self, ranges):
+        return run_coroutine(self.fetch_backfill(ranges))
+
+    async def fetch_update(self, dates, values, end=None):
+        # Scores of dates merged with the ones missing up to end (today by default), sorted by date
+        end = pd.Timestamp.now().normalize() if end is None else pd.Timestamp(end)
+        fetched = await self.fetch_backfill(missing_ranges(dates, end))
+        merged = pd.concat([pd.DataFrame({'Date': pd.DatetimeIndex(dates), 'Score': np.asarray(values, dtype=np.float64)}),
+                            fetched], ignore_index=True)
+        return merged.drop_duplicates('Date', keep='first').sort_values('Date', ignore_index=True)
+
+    def update(self, dates, values, end=None):
+        return run_coroutine(self.fetch_update(dates, values, end))
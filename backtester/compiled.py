@@ -0,0 +1,278 @@
+import numpy as np
+from .engine import NS_PER_DAY, to_nanoseconds
+from .ledger import STRATEGY1_FIELDS, STRATEGY2_FIELDS
+from .signals import BUY, HOLD, SELL
+
+try:
+    from numba import njit
+except ImportError: # the kernels stay plain Python functions and backtests run on the NumPy engine
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        return lambda function: function
+else:
+    NUMBA_AVAILABLE = True
+
+# Compiled kernels write trades into an int64 block (rows OPEN_INDEX, CLOSE_INDEX, DURATION), an int8 position array
+# and a float64 block holding the float fields of the ledger in field order, one column per trade, so every field
+# comes out as a contiguous row. Kernels use numpy's error model so a zero division gives inf or NaN like it
+# does on np.float64 values instead of raising
+OPEN_INDEX, CLOSE_INDEX, DURATION = range(3)
+S1_OPEN_PRICE, S1_SHARES, S1_CLOSE_PRICE, S1_RETURNS, S1_PCT_RETURNS = range(5)
+(S2_OPEN_PRICE, S2_SHARES, S2_TAKE_PROFIT, S2_STOP_LOSS, S2_EQUITY_BALANCE, S2_CLOSE_PRICE, S2_RETURNS,
+ S2_PCT_RETURNS, S2_MAX_DRAWDOWN, S2_PCT_MAX_DRAWDOWN) = range(10)
+
+
+def _ledger_columns(fields, indices, position, values, count):
+    # Ledger columns in field order out of the kernel's blocks
+    int_rows = iter(indices)
+    float_rows = iter(values)
+    columns = {}
+    for name, dtype in fields.items():
+        if name == 'position':
+            columns[name] = position[:count]
+        elif np.dtype(dtype).kind == 'i':
+            columns[name] = next(int_rows)[:count]
+        else:
+            columns[name] = next(float_rows)[:count]
+    return columns
+
+
+@njit(cache=True, error_model='numpy')
+def _round2(value):
+    # round2 of the engine, rint rounds half to even like Python's round
+    return np.rint(value * 100) / 100
+
+
+@njit(cache=True, error_model='numpy')
+def threshold_kernel(nanoseconds, open_price, signals, initial_balance, capacity):
+    # simulate_threshold_events over every day: each signal before the last day closes the current trade at the
+    # open and flips into the new side, the last trade is closed at the open of the last day
+    last_index = len(open_price) - 1
+    indices = np.full((3, capacity), -1, dtype=np.int64)
+    position = np.zeros(capacity, dtype=np.int8)
+    values = np.full((5, capacity), np.nan)
+    balance = initial_balance
+    count = 0
+    for index in range(last_index + 1):
+        signal = signals[index] if index < last_index else HOLD
+        if index < last_index and signal == HOLD:
+            continue
+        if index == last_index and count == 0:
+            break
+        price = open_price[index]
+        if count:
+            row = count - 1
+            entry_price = values[S1_OPEN_PRICE, row]
+            shares = values[S1_SHARES, row]
+            if position[row] == BUY:
+                returns = (price - entry_price) * shares
+            else:
+                returns = (entry_price - price) * shares
+            indices[CLOSE_INDEX, row] = index
+            indices[DURATION, row] = (nanoseconds[index] - nanoseconds[indices[OPEN_INDEX, row]]) // NS_PER_DAY
+            values[S1_CLOSE_PRICE, row] = price
+            values[S1_RETURNS, row] = returns
+            values[S1_PCT_RETURNS, row] = (returns / (entry_price * shares)) * 100
+            balance += returns
+            risk = balance
+        elif signal == BUY: # First trade risks the entire balance on a buy but only 10% on a sell
+            risk = balance
+        else:
+            risk = 0.1 * balance
+        if index == last_index:
+            break
+        indices[OPEN_INDEX, count] = index
+        position[count] = signal
+        values[S1_OPEN_PRICE, count] = price
+        values[S1_SHARES, count] = risk // price
+        count += 1
+    return indices, position, values, count, balance
+
+
+@njit(cache=True, error_model='numpy')
+def bracket_signal_kernel(open_price, high_price, low_price, index, buy_threshold, sell_threshold, stop_factor,
+                          target_factor):
+    # bracket_signals of the signals module
+    signals = np.zeros(len(index), dtype=np.int8)
+    open_buy = False
+    open_sell = False
+    buy_tp = buy_sl = sell_tp = sell_sl = 0.0
+    for i in range(len(index)):
+        high = high_price[i]
+        low = low_price[i]
+        if open_buy and (high >= buy_tp or low <= buy_sl):
+            open_buy = False
+        if open_sell and (low <= sell_tp or high >= sell_sl):
+            open_sell = False
+        if index[i] <= buy_threshold and not open_buy:
+            open_buy = True
+            buy_sl = open_price[i] * (1 - stop_factor)
+            buy_tp = open_price[i] * (1 + target_factor)
+            signals[i] = BUY
+        elif index[i] >= sell_threshold and not open_sell:
+            open_sell = True
+            sell_sl = open_price[i] * (1 + stop_factor)
+            sell_tp = open_price[i] * (1 - target_factor)
+            signals[i] = SELL
+        if open_buy and (high >= buy_tp or low <= buy_sl):
+            open_buy = False
+        if open_sell and (low <= sell_tp or high >= sell_sl):
+            open_sell = False
+    return signals
+
+
+@njit(cache=True, error_model='numpy')
+def _close_bracket(nanoseconds, indices, position, values, row, index, price, extreme_price):
+    # close_bracket_trade of the engine on a kernel row
+    entry_price = values[S2_OPEN_PRICE, row]
+    shares = values[S2_SHARES, row]
+    equity_balance = values[S2_EQUITY_BALANCE, row]
+    price = _round2(price)
+    if position[row] == BUY:
+        returns = _round2((price - entry_price) * shares)
+        max_drawdown = _round2((extreme_price - entry_price) * shares)
+    else:
+        returns = _round2((entry_price - price) * shares)
+        max_drawdown = _round2((entry_price - extreme_price) * shares)
+    if returns < 0 and max_drawdown < returns:
+        max_drawdown = returns
+    indices[CLOSE_INDEX, row] = index
+    indices[DURATION, row] = (nanoseconds[index] - nanoseconds[indices[OPEN_INDEX, row]]) // NS_PER_DAY
+    values[S2_CLOSE_PRICE, row] = price
+    values[S2_RETURNS, row] = returns
+    values[S2_PCT_RETURNS, row] = _round2((returns / equity_balance) * 100)
+    values[S2_MAX_DRAWDOWN, row] = max_drawdown
+    values[S2_PCT_MAX_DRAWDOWN, row] = _round2((max_drawdown / equity_balance) * 100)
+    return returns
+
+
+@njit(cache=True, error_model='numpy')
+def _bracket_exit(position, values, row, high, low):
+    # Exit price of an open bracket order on a day with this high and low, NaN while it stays open
+    take_profit = values[S2_TAKE_PROFIT, row]
+    stop_loss = values[S2_STOP_LOSS, row]
+    if position[row] == BUY:
+        if high >= take_profit:
+            return take_profit
+        if low <= stop_loss:
+            return stop_loss
+    else:
+        if low <= take_profit:
+            return take_profit
+        if high >= stop_loss:
+            return stop_loss
+    return np.nan
+
+
+@njit(cache=True, error_model='numpy')
+def bracket_kernel(nanoseconds, open_price, high_price, low_price, close_price, signals, initial_balance,
+                   stop_factor, target_factor, risk_factor, capacity):
+    # simulate_bracket_orders with the extreme price against each open position kept as a running minimum or
+    # maximum (NaN skipping like PriceExtrema) instead of a range query at the close
+    last_index = len(open_price) - 1
+    indices = np.full((3, capacity), -1, dtype=np.int64)
+    position = np.zeros(capacity, dtype=np.int8)
+    values = np.full((10, capacity), np.nan)
+    extreme_prices = np.empty(capacity)
+    open_rows = np.empty(capacity, dtype=np.int64)
+    open_count = 0
+    balance = initial_balance
+    count = 0
+
+    for index in range(last_index + 1):
+        high = high_price[index]
+        low = low_price[index]
+        for k in range(open_count):
+            row = open_rows[k]
+            if position[row] == BUY:
+                extreme_prices[row] = np.fmin(extreme_prices[row], low)
+            else:
+                extreme_prices[row] = np.fmax(extreme_prices[row], high)
+
+        # Handle last day of data, close all open positions
+        if index == last_index:
+            for k in range(open_count):
+                row = open_rows[k]
+                balance += _close_bracket(nanoseconds, indices, position, values, row, index, close_price[index],
+                                          extreme_prices[row])
+            open_count = 0
+            break
+
+        # Check closing positions first, keeping the order of the ones still open
+        still_open = 0
+        for k in range(open_count):
+            row = open_rows[k]
+            price = _bracket_exit(position, values, row, high, low)
+            if np.isnan(price):
+                open_rows[still_open] = row
+                still_open += 1
+            else:
+                balance += _close_bracket(nanoseconds, indices, position, values, row, index, price, extreme_prices[row])
+        open_count = still_open
+
+        # Open any new position and close it on the same day if necessary
+        signal = signals[index]
+        if signal == BUY or signal == SELL:
+            price = open_price[index]
+            risk_amount = risk_factor * balance
+            if signal == BUY:
+                take_profit = price * (1 + target_factor)
+                stop_loss = price * (1 - stop_factor)
+                shares = risk_amount // (price - stop_loss)
+                extreme_prices[count] = low
+            else:
+                take_profit = price * (1 - target_factor)
+                stop_loss = price * (1 + stop_factor)
+                shares = risk_amount // (stop_loss - price)
+                extreme_prices[count] = high
+            row = count
+            count += 1
+            indices[OPEN_INDEX, row] = index
+            position[row] = signal
+            values[S2_OPEN_PRICE, row] = _round2(price)
+            values[S2_SHARES, row] = shares
+            values[S2_TAKE_PROFIT, row] = take_profit
+            values[S2_STOP_LOSS, row] = stop_loss
+            values[S2_EQUITY_BALANCE, row] = balance
+            exit_price = _bracket_exit(position, values, row, high, low)
+            if np.isnan(exit_price):
+                open_rows[open_count] = row
+                open_count += 1
+            else:
+                balance += _close_bracket(nanoseconds, indices, position, values, row, index, exit_price, extreme_prices[row])
+
+    return indices, position, values, count, balance
+
+
+def _prices(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def simulate_threshold_reversals(dates, open_price, signals, initial_balance):
+    # Same trades and balance as the engine's simulate_threshold_reversals, as ledger columns
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+    capacity = int(np.count_nonzero(signals[:len(signals) - 1]))
+    indices, position, values, count, balance = threshold_kernel(to_nanoseconds(dates), _prices(open_price), signals,
+                                                                 float(initial_balance), capacity)
+    columns = _ledger_columns(STRATEGY1_FIELDS, indices, position, values, count)
+    return columns, np.float64(balance) if count else initial_balance
+
+
+def bracket_signals(open_price, high_price, low_price, index, buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer):
+    return bracket_signal_kernel(_prices(open_price), _prices(high_price), _prices(low_price), _prices(index),
+                                 float(buy_threshold), float(sell_threshold), loss_buffer * 0.01,
+                                 loss_buffer * 0.01 * risk_reward_ratio)
+
+
+def simulate_bracket_orders(dates, open_price, high_price, low_price, close_price, signals,
+                            initial_balance, risk_reward_ratio, loss_buffer, risk_per_trade):
+    # Same trades and balance as the engine's simulate_bracket_orders, trades as ledger columns
+    signals = np.ascontiguousarray(signals, dtype=np.int8)
+    capacity = int(np.count_nonzero(signals[:len(signals) - 1]))
+    indices, position, values, count, balance = bracket_kernel(
+        to_nanoseconds(dates), _prices(open_price), _prices(high_price), _prices(low_price), _prices(close_price),
+        signals, float(initial_balance), loss_buffer * 0.01, loss_buffer * 0.01 * risk_reward_ratio,
+        risk_per_trade * 0.01, capacity)
+    columns = _ledger_columns(STRATEGY2_FIELDS, indices, position, values, count)
+    return columns, np.float64(balance) if count else initial_balance
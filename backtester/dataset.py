@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from .cnn import SCORE_SERIES, read_payload
+from .regimes import sentiment
+
+# Historical CSV covers the days before the CNN data, which starts on this date
+UPDATED_START = '2020-08-03'
+# Dtypes of the codes of text columns, the narrowest one holding every code is used
+CODE_DTYPES = ['<i1', '<i2', '<i4']
+
+
+def load_historical(path):
+    data = pd.read_csv(path)
+    data = data.drop(columns=['Open', 'High', 'Low'])
+    data = data.rename(columns={'Fear Greed': 'Fear and Greed Index'})
+    data['Date'] = pd.to_datetime(data['Date'])
+    return data[data['Date'] < UPDATED_START]
+
+
+def load_updated(path, fetcher=None):
+    # Scores are read as float64 here so rounding to whole numbers matches the notebook exactly. A CNNFetcher fills
+    # the days missing from the file up to today from its cache
+    series = read_payload(path, score_dtype=np.float64, names=[SCORE_SERIES])[SCORE_SERIES]
+    dates = series.dates.astype('datetime64[D]').astype('datetime64[ns]')
+    values = series.values
+    if fetcher is not None:
+        scores = fetcher.update(dates, values)
+        dates, values = scores['Date'].to_numpy(), scores['Score'].to_numpy()
+    data = pd.DataFrame({'Date': dates, 'Fear and Greed Index': np.rint(values).astype(np.int64)})
+    return data[data['Date'] >= UPDATED_START]
+
+
+def fetch_spy(start='2011-01-03'):
+    import yfinance as yf # only needed when the cache has to be rebuilt
+
+    spy = yf.Ticker('SPY').history(start=start).iloc[:, 0:4]
+    spy = spy.reset_index(drop=False)
+    spy = spy.rename(columns={'Open': 'SPY Opening Price', 'Close': 'SPY Closing Price', 'High': 'SPY High Price', 'Low': 'SPY Low Price'})
+    spy['Date'] = pd.to_datetime(spy['Date']).dt.tz_localize(None)
+    return spy.drop_duplicates()
+
+
+def merge_datasets(historical, updated, spy, end=None):
+    # df_final of the notebook: Fear and Greed Index with its sentiment, joined with SPY prices on the days both exist
+    data = pd.concat([historical, updated]).drop_duplicates()
+    data['Date'] = pd.to_datetime(data['Date'])
+    data = data.reset_index(drop=True)
+    data['Sentiment'] = sentiment(data['Fear and Greed Index'].to_numpy())
+    if end is not None:
+        data = data[data['Date'] <= end]
+        spy = spy[spy['Date'] <= end]
+    data = pd.merge(data, spy, on='Date', how='outer').dropna()
+    return data.set_index('Date')
+
+
+def source_hash(*paths, extra=''):
+    digest = hashlib.sha256(extra.encode())
+    for path in paths:
+        with open(path, 'rb') as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def _code_dtype(count):
+    # Codes run from 0 to count - 1, with -1 for missing values
+    return next(dtype for dtype in CODE_DTYPES if np.iinfo(dtype).max >= count - 1)
+
+
+def _file_name(name, generation):
+    return re.sub(r'[^0-9a-z]+', '_', name.lower()).strip('_') + '.' + generation + '.bin'
+
+
+class DatasetStore:
+    # A merged frame kept on disk as one raw little-endian file per column plus meta.json holding dtypes, row count
+    # and hashes. Columns are memory mapped copy-on-write, so processes reading the same store share its pages.
+    # Text columns are stored as codes into a category list, int8 up to 128 categories and wider beyond. Rows are
+    # only ever appended, the meta file is replaced after the column files are written so readers never see a
+    # partial day. An append adding more categories than the codes of a column hold rewrites the store
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, 'meta.json')
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    @property
+    def meta(self):
+        with open(self.meta_path) as file:
+            return json.load(file)
+
+    @property
+    def version(self):
+        # Hash of everything written so far, chained over appends
+        return self.meta['content_hash']
+
+    def is_stale(self, digest):
+        return not self.exists() or self.meta['source_hash'] != digest
+
+    def _path(self, file_name):
+        return os.path.join(self.directory, file_name)
+
+    def _write_meta(self, meta):
+        temporary = self.meta_path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(meta, file, indent=1)
+        os.replace(temporary, self.meta_path)
+
+    def _encode(self, data, meta):
+        # Raw column values in the order of meta, text columns become codes and extend their category list
+        digest = hashlib.sha256(meta['content_hash'].encode())
+        chunks = [(meta['index'], data.index.to_numpy().astype(meta['index']['dtype']))]
+        for column in meta['columns']:
+            values = data[column['name']]
+            if column['name'] in meta['categories']:
+                categories = meta['categories'][column['name']]
+                known = set(categories)
+                categories.extend(value for value in pd.unique(values) if value not in known)
+                values = pd.Categorical(values, categories=categories).codes.astype(column['dtype'])
+            else:
+                values = values.to_numpy().astype(column['dtype'])
+            chunks.append((column, np.ascontiguousarray(values)))
+        for _, values in chunks:
+            digest.update(values.tobytes())
+        meta['content_hash'] = digest.hexdigest()
+        return chunks
+
+    def write(self, data, digest=''):
+        # A rewrite goes to new files named after its content hash, readers still mapping the old files keep them
+        os.makedirs(self.directory, exist_ok=True)
+        previous = self.meta if self.exists() else None
+        meta = {'length': len(data), 'source_hash': digest, 'content_hash': '', 'categories': {},
+                'index': {'name': data.index.name, 'dtype': data.index.to_numpy().dtype.newbyteorder('<').str},
+                'columns': []}
+        for name, dtype in data.dtypes.items():
+            if dtype.kind in 'biuf':
+                dtype = np.dtype(dtype).newbyteorder('<').str
+            else:
+                meta['categories'][name] = []
+                dtype = _code_dtype(len(pd.unique(data[name])))
+            meta['columns'].append({'name': name, 'dtype': dtype})
+        chunks = self._encode(data, meta)
+        for entry, values in chunks:
+            entry['file'] = _file_name(entry['name'] or 'index', meta['content_hash'][:12])
+            values.tofile(self._path(entry['file']))
+        self._write_meta(meta)
+        if previous is not None:
+            written = {entry['file'] for entry, _ in chunks}
+            for old in [previous['index']] + previous['columns']:
+                if os.path.exists(self._path(old['file'])) and old['file'] not in written:
+                    os.remove(self._path(old['file']))
+        return self
+
+    def append(self, data):
+        # Only the days after the last stored day are added
+        meta = self.meta
+        if meta['length']:
+            last_date = self._map(meta['index'], meta['length'])[-1]
+            data = data[data.index.to_numpy() > last_date]
+        if not len(data):
+            return 0
+        for column in meta['columns']:
+            if column['name'] in meta['categories']:
+                categories = set(meta['categories'][column['name']])
+                count = len(categories) + sum(value not in categories for value in pd.unique(data[column['name']]))
+                if _code_dtype(count) != column['dtype']:
+                    self.write(pd.concat([self.load(), data]), meta['source_hash'])
+                    return len(data)
+        for entry, values in self._encode(data, meta):
+            with open(self._path(entry['file']), 'r+b') as file:
+                # Drop anything an interrupted append left past the recorded length
+                file.truncate(meta['length'] * values.itemsize)
+                file.seek(0, os.SEEK_END)
+                file.write(values.tobytes())
+        meta['length'] += len(data)
+        self._write_meta(meta)
+        return len(data)
+
+    def _map(self, entry, length):
+        if not length:
+            return np.empty(0, dtype=entry['dtype'])
+        return np.memmap(self._path(entry['file']), dtype=entry['dtype'], mode='c', shape=(length,)).view(np.ndarray)
+
+    def window(self, start, stop, names, meta=None):
+        # Raw index and named columns of rows start to stop, each mapped read only on its own so a scan over a store
+        # larger than memory keeps one window of each column mapped at a time. meta saves reading meta.json per window
+        meta = self.meta if meta is None else meta
+        stop = min(stop, meta['length'])
+        entries = {column['name']: column for column in meta['columns']}
+        arrays = []
+        for entry in [meta['index']] + [entries[name] for name in names]:
+            itemsize = np.dtype(entry['dtype']).itemsize
+            arrays.append(np.memmap(self._path(entry['file']), dtype=entry['dtype'], mode='r', offset=start * itemsize,
+                                    shape=(stop - start,)) if stop > start else np.empty(0, dtype=entry['dtype']))
+        return arrays[0], arrays[1:]
+
+    def load(self):
+        meta = self.meta
+        length = meta['length']
+        index = pd.DatetimeIndex(self._map(meta['index'], length), name=meta['index']['name'], copy=False)
+        columns = {}
+        for column in meta['columns']:
+            values = self._map(column, length)
+            if column['name'] in meta['categories']:
+                values = pd.Categorical.from_codes(values, categories=meta['categories'][column['name']])
+            columns[column['name']] = values
+        return pd.DataFrame(columns, index=index, copy=False)
+
+
+def cached_dataset(directory, historical_path, updated_path, spy=None, end=None, fetcher=None):
+    # Merged frame from the store, rebuilt only when the source files, the end date or the days added by the
+    # CNNFetcher change. SPY prices are fetched only on a rebuild unless they are passed in
+    store = DatasetStore(directory)
+    updated = None if fetcher is None else load_updated(updated_path, fetcher)
+    extra = str(end) if updated is None else f"{end} {updated['Date'].max()} {len(updated)}"
+    digest = source_hash(historical_path, updated_path, extra=extra)
+    if store.is_stale(digest):
+        spy = fetch_spy() if spy is None else spy
+        updated = load_updated(updated_path) if updated is None else updated
+        store.write(merge_datasets(load_historical(historical_path), updated, spy, end), digest)
+    return store.load()
@@ -0,0 +1,337 @@
+import warnings
+from importlib.util import find_spec
+
+import numpy as np
+from .rangequery import PriceExtrema
+from .signals import BUY, SELL
+
+NS_PER_DAY = 86_400_000_000_000
+ENGINES = ('numpy', 'numba')
+
+# Trade records are lists with the fields of ledger.STRATEGY1_FIELDS (simulate_threshold_reversals/events)
+# or ledger.STRATEGY2_FIELDS (simulate_bracket_orders and size_bracket_schedule) in order
+
+
+def round2(value):
+    # Same result as numpy's round(value, 2), which the backtester has always used on np.float64 prices. rint rounds
+    # half to even like it, keeps NaN and works on arrays
+    return np.rint(value * 100) / 100
+
+
+def resolve_engine(engine):
+    # 'numba' runs the kernels of the compiled module, which is only imported by backtests using it
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+    if engine == 'numba' and find_spec('numba') is None:
+        warnings.warn("Numba is not installed, falling back to the NumPy engine", RuntimeWarning, stacklevel=3)
+        return 'numpy'
+    return engine
+
+
+def to_nanoseconds(dates):
+    return np.asarray(dates, dtype='datetime64[ns]').astype(np.int64)
+
+
+def simulate_threshold_reversals(dates, open_price, signals, initial_balance):
+    # The signal on the last day is ignored as every position is closed then
+    signals = np.asarray(signals)
+    days = np.flatnonzero(signals[:len(signals) - 1])
+    return simulate_threshold_events(to_nanoseconds(dates), open_price, days, signals[days], initial_balance)
+
+
+def simulate_threshold_events(nanoseconds, open_price, days, sides, initial_balance):
+    # Trades only change on signal days, so only those days (all before the last day) are visited.
+    # nanoseconds are the dates as int64 nanoseconds
+    open_price = np.asarray(open_price, dtype=float)
+    last_index = len(open_price) - 1
+    balance = initial_balance
+    trades = []
+
+    def close_trade(trade, index):
+        close_price = open_price[index]
+        if trade[1] == BUY:
+            returns = (close_price - trade[2]) * trade[3]
+        else:
+            returns = (trade[2] - close_price) * trade[3]
+        trade[4:] = [index, close_price, returns, (returns / (trade[2] * trade[3])) * 100,
+                     (int(nanoseconds[index]) - int(nanoseconds[trade[0]])) // NS_PER_DAY]
+        return returns
+
+    for index, signal in zip(np.asarray(days).tolist(), np.asarray(sides).tolist()):
+        price = open_price[index]
+        if trades: # Close existing trade and flip into the new position with the entire balance
+            balance += close_trade(trades[-1], index)
+            risk = 1 * balance
+        else: # First trade risks the entire balance on a buy but only 10% on a sell
+            risk = 1 * balance if signal == BUY else 0.1 * balance
+        trades.append([index, signal, price, risk // price, None, None, 0, 0, None])
+    if trades:
+        balance += close_trade(trades[-1], last_index)
+    return trades, balance
+
+
+def close_bracket_trade(trade, close_index, close_price, extreme_price, duration):
+    entry_price, shares, equity_balance = trade[2], trade[3], trade[6]
+    close_price = round2(close_price)
+    if trade[1] == BUY:
+        returns = round2((close_price - entry_price) * shares)
+        max_drawdown = round2((extreme_price - entry_price) * shares)
+    else:
+        returns = round2((entry_price - close_price) * shares)
+        max_drawdown = round2((entry_price - extreme_price) * shares)
+    if returns < 0 and max_drawdown < returns:
+        max_drawdown = returns
+    trade[7:] = [close_index, close_price, returns, round2((returns / equity_balance) * 100), duration,
+                 max_drawdown, round2((max_drawdown / equity_balance) * 100)]
+    return returns
+
+
+def bracket_buy_and_hold(first_open, last_close, initial_balance):
+    shares = initial_balance // first_open
+    return np.float64(round2((round2(last_close) - round2(first_open)) * shares))
+
+
+def simulate_bracket_orders(dates, open_price, high_price, low_price, close_price, signals,
+                            initial_balance, risk_reward_ratio, loss_buffer, risk_per_trade, extrema=None):
+    dates = to_nanoseconds(dates).tolist()
+    if extrema is None:
+        extrema = PriceExtrema(low_price, high_price)
+    open_price = np.asarray(open_price, dtype=float).tolist()
+    high_price = np.asarray(high_price, dtype=float).tolist()
+    low_price = np.asarray(low_price, dtype=float).tolist()
+    close_price = np.asarray(close_price, dtype=float).tolist()
+    signals = np.asarray(signals).tolist()
+    last_index = len(open_price) - 1
+    stop_factor = loss_buffer * 0.01
+    target_factor = loss_buffer * 0.01 * risk_reward_ratio
+    risk_factor = risk_per_trade * 0.01
+
+    balance = initial_balance
+    trades = []
+    open_trades = []
+
+    def close_trade(trade, index, price):
+        open_index = trade[0]
+        if trade[1] == BUY:
+            extreme_price = extrema.lowest(open_index, index)
+        else:
+            extreme_price = extrema.highest(open_index, index)
+        return close_bracket_trade(trade, index, price, extreme_price, (dates[index] - dates[open_index]) // NS_PER_DAY)
+
+    for index in range(last_index + 1):
+        close = close_price[index]
+
+        # Handle last day of data, close all open positions
+        if index == last_index:
+            for trade in open_trades:
+                balance += close_trade(trade, index, close)
+            open_trades = []
+            break
+
+        high = high_price[index]
+        low = low_price[index]
+        # Check closing positions first, only the currently open positions need to be visited
+        if open_trades:
+            still_open = []
+            for trade in open_trades:
+                if trade[1] == BUY:
+                    if high >= trade[4]:
+                        balance += close_trade(trade, index, trade[4])
+                    elif low <= trade[5]:
+                        balance += close_trade(trade, index, trade[5])
+                    else:
+                        still_open.append(trade)
+                else:
+                    if low <= trade[4]:
+                        balance += close_trade(trade, index, trade[4])
+                    elif high >= trade[5]:
+                        balance += close_trade(trade, index, trade[5])
+                    else:
+                        still_open.append(trade)
+            open_trades = still_open
+
+        # Open any new position and close it on the same day if necessary
+        signal = signals[index]
+        if signal == BUY or signal == SELL:
+            price = open_price[index]
+            risk_amount = risk_factor * balance
+            if signal == BUY:
+                take_profit = price * (1 + target_factor)
+                stop_loss = price * (1 - stop_factor)
+                shares = risk_amount // (price - stop_loss)
+            else:
+                take_profit = price * (1 - target_factor)
+                stop_loss = price * (1 + stop_factor)
+                shares = risk_amount // (stop_loss - price)
+            trade = [index, signal, round2(price), shares, take_profit, stop_loss, balance,
+                     None, None, 0, 0, None, 0, 0]
+            trades.append(trade)
+            if signal == BUY:
+                if high >= take_profit:
+                    balance += close_trade(trade, index, take_profit)
+                elif low <= stop_loss:
+                    balance += close_trade(trade, index, stop_loss)
+                else:
+                    open_trades.append(trade)
+            else:
+                if low <= take_profit:
+                    balance += close_trade(trade, index, take_profit)
+                elif high >= stop_loss:
+                    balance += close_trade(trade, index, stop_loss)
+                else:
+                    open_trades.append(trade)
+
+    return trades, balance
+
+
+def bracket_equity(close_price, initial_balance, trades, bars=None):
+    # Daily equity of a bracket order backtest from its trades: the balance after the trades closed up to each day,
+    # added up in the order the simulation closed them, plus the unrealised P/L at the close of the positions still
+    # open, added in the order they were opened. Gives exactly the equity of a day by day simulation. close_price is
+    # days x instruments for the trades of a portfolio, which carry an instrument column. bars are the increasing bar
+    # positions close_price was taken at when it is a sample of the bars, e.g. the last bar of each day of minute bars
+    close_price = np.asarray(close_price, dtype=float)
+    days = len(close_price)
+    bars = np.arange(days) if bars is None else np.asarray(bars)
+    open_index = trades['open_index']
+    close_index = trades['close_index']
+    closed = np.flatnonzero(close_index >= 0)
+    order = closed[np.lexsort((open_index[closed], close_index[closed]))]
+    balances = np.cumsum(np.concatenate(([initial_balance], trades['returns'][order])), dtype=float)
+    equity = balances[np.searchsorted(close_index[order], bars, side='right')]
+
+    # Positions count from their open day up to the day before they close, trades still open up to the last day
+    first = np.searchsorted(bars, open_index)
+    end = np.searchsorted(bars, np.where(close_index >= 0, close_index, bars[-1] + 1 if days else 0))
+    lengths = np.maximum(end - first, 0)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    held = np.repeat(first - (np.cumsum(lengths) - lengths), lengths) + np.arange(len(rows))
+    entry_price = trades['open_price'][rows]
+    held_close = close_price[held] if close_price.ndim == 1 else close_price[held, trades['instrument'][rows]]
+    unrealized = trades['shares'][rows] * np.where(trades['position'][rows] == BUY, held_close - entry_price,
+                                                   entry_price - held_close)
+    unrealized_pl = np.zeros(days)
+    np.add.at(unrealized_pl, held, unrealized)
+    return equity + unrealized_pl
+
+
+def first_exit(high_array, low_array, start, stop, position, take_profit, stop_loss):
+    # First bar from start up to stop whose high or low hits the bracket of a position, stop when none does. Scans
+    # growing windows so short trades don't pay for a scan of the rest of the history
+    window = 16
+    while start < stop:
+        end = min(start + window, stop)
+        high = high_array[start:end]
+        low = low_array[start:end]
+        if position == BUY:
+            hits = np.flatnonzero((high >= take_profit) | (low <= stop_loss))
+        else:
+            hits = np.flatnonzero((low <= take_profit) | (high >= stop_loss))
+        if len(hits):
+            return start + int(hits[0])
+        start = end
+        window *= 4
+    return stop
+
+
+def bracket_schedule(dates, open_price, high_price, low_price, close_price, signals, risk_reward_ratio, loss_buffer,
+                     extrema=None):
+    # Entry and exit days and prices of a bracket order strategy do not depend on position sizing,
+    # so they are worked out once and replayed by size_bracket_schedule for any risk per trade
+    dates = to_nanoseconds(dates)
+    if extrema is None:
+        extrema = PriceExtrema(low_price, high_price)
+    open_array = np.asarray(open_price, dtype=float)
+    high_array = np.asarray(high_price, dtype=float)
+    low_array = np.asarray(low_price, dtype=float)
+    close_array = np.asarray(close_price, dtype=float)
+    signals = np.asarray(signals)
+    last_index = len(open_array) - 1
+    stop_factor = loss_buffer * 0.01
+    target_factor = loss_buffer * 0.01 * risk_reward_ratio
+
+    trades = []
+    for index in np.flatnonzero(signals[:last_index]).tolist():
+        position = int(signals[index])
+        price = float(open_array[index])
+        if position == BUY:
+            take_profit = price * (1 + target_factor)
+            stop_loss = price * (1 - stop_factor)
+        else:
+            take_profit = price * (1 - target_factor)
+            stop_loss = price * (1 + stop_factor)
+        close_index = first_exit(high_array, low_array, index, last_index, position, take_profit, stop_loss)
+        if close_index == last_index:
+            exit_price = float(close_array[last_index])
+        elif position == BUY:
+            exit_price = take_profit if high_array[close_index] >= take_profit else stop_loss
+        else:
+            exit_price = take_profit if low_array[close_index] <= take_profit else stop_loss
+        if position == BUY:
+            extreme_price = extrema.lowest(index, close_index)
+        else:
+            extreme_price = extrema.highest(index, close_index)
+        duration = int(dates[close_index] - dates[index]) // NS_PER_DAY
+        trades.append((index, position, price, take_profit, stop_loss, close_index, exit_price, extreme_price, duration))
+
+    return trades, bracket_events(trades)
+
+
+def bracket_events(trades):
+    # (closes, trade position in trades) pairs of the bracket_schedule tuples in trades, in the order
+    # size_bracket_schedule replays them: each day existing positions are checked for exits first, then the new
+    # position is opened and possibly closed again on the same day
+    if not trades:
+        return []
+    open_index = np.array([trade[0] for trade in trades])
+    close_index = np.array([trade[5] for trade in trades])
+    trade_ids = np.arange(len(trades))
+    days = np.concatenate([open_index, close_index])
+    phases = np.concatenate([np.ones(len(trades), dtype=int), np.where(close_index == open_index, 2, 0)])
+    ids = np.concatenate([trade_ids, trade_ids])
+    order = np.lexsort((ids, phases, days))
+    return list(zip((phases[order] != 1).tolist(), ids[order].tolist()))
+
+
+def truncate_bracket_schedule(schedule, dates, close_price, extrema, length):
+    # Schedule of the first length days out of the schedule of a longer history. Bracket signals only look back, so
+    # these are the trades opened before the last of those days, with the ones still open on it closed at its close
+    trades, _ = schedule
+    dates = to_nanoseconds(dates)
+    last_index = length - 1
+    truncated = []
+    for trade in trades:
+        index, position, price, take_profit, stop_loss, close_index, exit_price, extreme_price, duration = trade
+        if index >= last_index:
+            break
+        if close_index >= last_index:
+            if position == BUY:
+                extreme_price = extrema.lowest(index, last_index)
+            else:
+                extreme_price = extrema.highest(index, last_index)
+            duration = int(dates[last_index] - dates[index]) // NS_PER_DAY
+            trade = (index, position, price, take_profit, stop_loss, last_index, float(close_price[last_index]),
+                     extreme_price, duration)
+        truncated.append(trade)
+    return truncated, bracket_events(truncated)
+
+
+def size_bracket_schedule(schedule, initial_balance, risk_per_trade):
+    trades, events = schedule
+    risk_factor = risk_per_trade * 0.01
+    balance = initial_balance
+    records = [None] * len(trades)
+
+    for is_close, trade_id in events:
+        open_index, position, price, take_profit, stop_loss, close_index, exit_price, extreme_price, duration = trades[trade_id]
+        if is_close:
+            balance += close_bracket_trade(records[trade_id], close_index, exit_price, extreme_price, duration)
+        else:
+            risk_amount = risk_factor * balance
+            if position == BUY:
+                shares = risk_amount // (price - stop_loss)
+            else:
+                shares = risk_amount // (stop_loss - price)
+            records[trade_id] = [open_index, position, round2(price), shares, take_profit, stop_loss, balance,
+                                 None, None, 0, 0, None, 0, 0]
+    return records, balance
@@ -0,0 +1,143 @@
+from itertools import groupby, product
+
+import numpy as np
+import pandas as pd
+from .engine import (bracket_buy_and_hold, bracket_equity, bracket_schedule, simulate_threshold_events, size_bracket_schedule,
+                     to_nanoseconds, truncate_bracket_schedule)
+from .ledger import STRATEGY1_FIELDS, STRATEGY2_FIELDS, TradeLedger
+from .profiling import timed
+from .rangequery import CrossingIndex, PriceExtrema, ShiftedExtrema
+from .report import strategy1_report, strategy2_report
+from .signals import bracket_signals
+
+STRATEGY1_COLUMNS = ['Buy Threshold', 'Sell Threshold', 'Total Returns', 'Average Returns', 'Win Rate (%)',
+                     'Total Trades', 'Performance vs Buy and Hold (%)']
+STRATEGY2_PARAMETERS = ['Buy Threshold', 'Sell Threshold', 'Risk Reward Ratio', 'Loss Buffer', 'Risk Per Trade']
+
+
+class MarketArrays:
+    # Price and index columns pulled out of the DataFrame once and shared by every combination of a sweep
+    def __init__(self, dates, open_price, high_price, low_price, close_price, index, extrema=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.nanoseconds = to_nanoseconds(self.dates)
+        self.start_date = self.dates.min()
+        self.end_date = self.dates.max()
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.close_price = close_price
+        self.index = index
+        self.extrema = PriceExtrema(low_price, high_price) if extrema is None else extrema
+        self.crossings = CrossingIndex(index)
+
+    @classmethod
+    def from_frame(cls, data):
+        return cls(data.index,
+                   data['SPY Opening Price'].to_numpy(dtype=float),
+                   data['SPY High Price'].to_numpy(dtype=float),
+                   data['SPY Low Price'].to_numpy(dtype=float),
+                   data['SPY Closing Price'].to_numpy(dtype=float),
+                   data['Fear and Greed Index'].to_numpy(dtype=float))
+
+    def window(self, start, stop):
+        # Days start to stop as views into these arrays, range queries reuse the extrema of the whole history
+        return MarketArrays(self.dates[start:stop], self.open_price[start:stop], self.high_price[start:stop],
+                            self.low_price[start:stop], self.close_price[start:stop], self.index[start:stop],
+                            ShiftedExtrema(self.extrema, start))
+
+    def head(self, length):
+        # The first length days, e.g. a prefix of the history to evaluate a parameter search on
+        return self.window(0, length)
+
+    def strategy1_buy_and_hold(self, initial_balance):
+        shares = initial_balance // self.open_price[0]
+        return (self.close_price[-1] - self.open_price[0]) * shares
+
+    def strategy2_buy_and_hold(self, initial_balance):
+        return bracket_buy_and_hold(self.open_price[0], self.close_price[-1], initial_balance)
+
+
+def strategy1_grid(data, initial_balance, buy_thresholds, sell_thresholds, profiler=None):
+    market = data if isinstance(data, MarketArrays) else MarketArrays.from_frame(data)
+    buy_and_hold_returns = market.strategy1_buy_and_hold(initial_balance)
+    last_index = len(market.open_price) - 1
+    results = []
+
+    # Each run visits only its signal days through the crossing index shared by the whole grid
+    for buy_threshold, sell_threshold in product(buy_thresholds, sell_thresholds):
+        days, sides = timed(profiler, 'Signals', market.crossings.events, buy_threshold, sell_threshold, last_index,
+                            bars=last_index + 1)
+        records, balance = timed(profiler, 'Simulation', simulate_threshold_events, market.nanoseconds, market.open_price,
+                                 days, sides, initial_balance, bars=last_index + 1)
+        ledger = TradeLedger.from_records(STRATEGY1_FIELDS, records)
+        if profiler is not None:
+            profiler.count_trades('Simulation', ledger)
+        report = timed(profiler, 'Report', strategy1_report, market.start_date, market.end_date, initial_balance, balance,
+                       buy_and_hold_returns, ledger)
+        results.append([buy_threshold, sell_threshold, report['Total Returns (%)'], report['Average Returns (%)'],
+                        report['Win Rate (%)'], report['Total Trades'], report['Performance vs Buy and Hold (%)']])
+    return pd.DataFrame(results, columns=STRATEGY1_COLUMNS)
+
+
+def strategy2_balances(market, initial_balance, candidates, lengths=None, profiler=None):
+    # Final balance of each (buy threshold, sell threshold, risk reward ratio, loss buffer, risk per trade) candidate,
+    # in candidate order. Candidates sharing the first four share signals and trade timing. Given prefix lengths, the
+    # balances are the ones of running on the first length days, one row per length, from a single schedule of the
+    # longest prefix per group
+    bars = len(market.open_price)
+    stop = bars if lengths is None else max(lengths)
+    balances = np.empty((1 if lengths is None else len(lengths), len(candidates)))
+    order = sorted(range(len(candidates)), key=lambda position: candidates[position][:4])
+    for params, positions in groupby(order, key=lambda position: candidates[position][:4]):
+        positions = list(positions)
+        signals = timed(profiler, 'Signals', bracket_signals, market.open_price[:stop], market.high_price[:stop],
+                        market.low_price[:stop], market.index[:stop], *params, bars=stop)
+        schedule = timed(profiler, 'Schedule', bracket_schedule, market.dates[:stop], market.open_price[:stop],
+                         market.high_price[:stop], market.low_price[:stop], market.close_price[:stop], signals, params[2],
+                         params[3], market.extrema, bars=stop)
+        for row, length in enumerate([stop] if lengths is None else lengths):
+            if length != stop:
+                schedule_part = timed(profiler, 'Schedule', truncate_bracket_schedule, schedule, market.dates,
+                                      market.close_price, market.extrema, length)
+            else:
+                schedule_part = schedule
+            for position in positions:
+                _, balance = timed(profiler, 'Sizing', size_bracket_schedule, schedule_part, initial_balance,
+                                   candidates[position][4])
+                balances[row, position] = balance
+    return balances[0] if lengths is None else balances
+
+
+def strategy2_rows(market, initial_balance, buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer, risk_per_trades,
+                   buy_and_hold_returns, profiler=None):
+    # Signals and trade timing are shared by every risk per trade, only position sizing is replayed
+    bars = len(market.open_price)
+    signals = timed(profiler, 'Signals', bracket_signals, market.open_price, market.high_price, market.low_price,
+                    market.index, buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer, bars=bars)
+    schedule = timed(profiler, 'Schedule', bracket_schedule, market.dates, market.open_price, market.high_price,
+                     market.low_price, market.close_price, signals, risk_reward_ratio, loss_buffer, market.extrema, bars=bars)
+    rows = []
+    for risk_per_trade in risk_per_trades:
+        records, balance = timed(profiler, 'Sizing', size_bracket_schedule, schedule, initial_balance, risk_per_trade)
+        ledger = TradeLedger.from_records(STRATEGY2_FIELDS, records)
+        if profiler is not None:
+            profiler.count_trades('Sizing', ledger)
+        equity = timed(profiler, 'Equity', bracket_equity, market.close_price, initial_balance, ledger, bars=bars)
+        report = timed(profiler, 'Report', strategy2_report, market.start_date, market.end_date, initial_balance,
+                       np.float64(balance) if records else balance, buy_and_hold_returns, ledger, market.nanoseconds, equity)
+        row = dict(zip(STRATEGY2_PARAMETERS, (buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer, risk_per_trade)))
+        row.update(report)
+        rows.append(row)
+    return rows
+
+
+def strategy2_grid(data, initial_balance, buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades,
+                   profiler=None):
+    market = data if isinstance(data, MarketArrays) else MarketArrays.from_frame(data)
+    buy_and_hold_returns = market.strategy2_buy_and_hold(initial_balance)
+    risk_per_trades = list(risk_per_trades)
+    results = []
+
+    for params in product(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers):
+        results.extend(strategy2_rows(market, initial_balance, *params, risk_per_trades, buy_and_hold_returns, profiler))
+    return pd.DataFrame(results)
@@ -0,0 +1,111 @@
+import numpy as np
+
+# Columns of the trade ledgers, the simulation cores produce records with fields in this order.
+# Open trades have a close_index and duration of -1 and NaN in the other close fields
+STRATEGY1_FIELDS = {
+    'open_index': np.int64,
+    'position': np.int8,
+    'open_price': np.float64,
+    'shares': np.float64,
+    'close_index': np.int64,
+    'close_price': np.float64,
+    'returns': np.float64,
+    'pct_returns': np.float64,
+    'duration': np.int64,
+}
+
+STRATEGY2_FIELDS = {
+    'open_index': np.int64,
+    'position': np.int8,
+    'open_price': np.float64,
+    'shares': np.float64,
+    'take_profit': np.float64,
+    'stop_loss': np.float64,
+    'equity_balance': np.float64,
+    'close_index': np.int64,
+    'close_price': np.float64,
+    'returns': np.float64,
+    'pct_returns': np.float64,
+    'duration': np.int64,
+    'max_drawdown': np.float64,
+    'pct_max_drawdown': np.float64,
+}
+
+
+class TradeLedger:
+    # Trades stored column by column in contiguous arrays that grow by doubling, so a trade costs one slot
+    # per field and reports and transaction records work on whole columns
+    def __init__(self, fields, capacity=64):
+        self.fields = fields
+        self.size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in fields.items()}
+        self._missing = [-1 if np.dtype(dtype).kind == 'i' else np.nan for dtype in fields.values()]
+
+    @classmethod
+    def from_records(cls, fields, records):
+        ledger = cls(fields, capacity=max(len(records), 1))
+        ledger.extend(records)
+        return ledger
+
+    @classmethod
+    def from_columns(cls, fields, columns):
+        # Takes over arrays of the field dtypes without copying them, e.g. the output of the compiled engine
+        ledger = cls(fields, capacity=0)
+        ledger._columns = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in fields.items()}
+        ledger.size = len(ledger._columns['open_index'])
+        return ledger
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        return self._columns[name][:self.size]
+
+    def columns(self):
+        return {name: column[:self.size] for name, column in self._columns.items()}
+
+    def _reserve(self, size):
+        capacity = len(next(iter(self._columns.values())))
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity)
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def append(self, record):
+        self._reserve(self.size + 1)
+        for column, value, missing in zip(self._columns.values(), record, self._missing):
+            column[self.size] = missing if value is None else value
+        self.size += 1
+        return self.size - 1
+
+    def extend(self, records):
+        if not records:
+            return
+        self._reserve(self.size + len(records))
+        end = self.size + len(records)
+        for column, values, missing in zip(self._columns.values(), zip(*records), self._missing):
+            if None in values:
+                values = [missing if value is None else value for value in values]
+            column[self.size:end] = values
+        self.size = end
+
+    def extend_columns(self, columns):
+        # Appends one array per field at once, e.g. a batch of bars
+        size = len(next(iter(columns.values())))
+        self._reserve(self.size + size)
+        for name, column in self._columns.items():
+            column[self.size:self.size + size] = columns[name]
+        self.size += size
+
+    def update(self, row, record):
+        for column, value, missing in zip(self._columns.values(), record, self._missing):
+            column[row] = missing if value is None else value
+
+    def clear(self):
+        self.size = 0
+
+    def nbytes(self):
+        return sum(column[:self.size].nbytes for column in self._columns.values())
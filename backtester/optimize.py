@@ -0,0 +1,93 @@
+import math
+from itertools import groupby, product
+
+import numpy as np
+import pandas as pd
+from .engine import bracket_buy_and_hold
+from .grid import MarketArrays, strategy2_balances, strategy2_rows
+
+RUNG_COLUMNS = ['Rung', 'End Date', 'Bars', 'Candidates', 'Kept', 'Best Performance vs Buy and Hold (%)']
+
+
+def grid_candidates(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades):
+    return list(product(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades))
+
+
+def sample_candidates(ranges, count, seed=0):
+    # One range per strategy 2 parameter, a (low, high) tuple is sampled uniformly and a list is sampled from its values
+    rng = np.random.default_rng(seed)
+    columns = []
+    for values in ranges:
+        if isinstance(values, tuple):
+            columns.append(rng.uniform(values[0], values[1], count).tolist())
+        else:
+            columns.append(rng.choice(np.asarray(values), count).tolist())
+    return list(zip(*columns))
+
+
+class SuccessiveHalving:
+    # Strategy 2 parameter search over growing prefixes of the history. Every candidate is run on the first rung's
+    # prefix, only the best 1/eta by final balance (the same order as performance vs buy and hold on that prefix) go
+    # on to a prefix eta times longer, and the survivors of the last rung get a full report on the whole history.
+    # Candidates sharing their thresholds, risk reward ratio and loss buffer share signals and trade timing, so they
+    # are kept or dropped as one group and only position sizing is replayed per risk per trade like in the grid.
+    # The defaults make two rungs, a third of the history then all of it, which reads about 67% of the grid's bars
+    # and found the grid's top 5 on every seed of bench_optimize.py. eta=3 with min_fraction=1/9 makes three rungs
+    # and reads about 33%, but ranks on 380 days first and found as few as 0 of the top 5, so it only pays off on
+    # histories long enough for the first rung to span several sentiment cycles
+    def __init__(self, data, initial_balance, eta=3, min_fraction=1 / 3, profiler=None):
+        self.market = data if isinstance(data, MarketArrays) else MarketArrays.from_frame(data)
+        self.initial_balance = initial_balance
+        self.eta = eta
+        self.profiler = profiler
+        bars = len(self.market.open_price)
+        rungs = max(1, math.ceil(math.log(1 / min_fraction, eta) - 1e-9) + 1)
+        self.windows = [max(2, min(bars, round(bars * min_fraction * eta ** rung))) for rung in range(rungs - 1)] + [bars]
+        self.evaluations = 0 # backtests run, one per candidate and rung, so more than the candidates of a grid
+        self.bars_evaluated = 0
+        self.rungs = []
+
+    def _rows(self, candidates):
+        # Full report rows of the survivors on the whole history, the same rows as strategy2_grid
+        buy_and_hold_returns = self.market.strategy2_buy_and_hold(self.initial_balance)
+        rows = []
+        for params, group in groupby(sorted(candidates, key=lambda candidate: candidate[:4]), key=lambda candidate: candidate[:4]):
+            rows.extend(strategy2_rows(self.market, self.initial_balance, *params, [candidate[4] for candidate in group],
+                                       buy_and_hold_returns, self.profiler))
+        return pd.DataFrame(rows)
+
+    def run(self, candidates, top=10):
+        # Returns the report rows of the final rung's candidates, best first. Candidates are kept or dropped together
+        # with every candidate sharing their signals, ranked by the best of them, and at least top groups reach the
+        # final rung
+        candidates = [tuple(candidate) for candidate in candidates]
+        self.evaluations = 0
+        self.bars_evaluated = 0
+        self.rungs = []
+        for rung, bars in enumerate(self.windows[:-1]):
+            market = self.market.head(bars)
+            base = bracket_buy_and_hold(market.open_price[0], market.close_price[-1], self.initial_balance) + self.initial_balance
+            performance = (strategy2_balances(market, self.initial_balance, candidates, profiler=self.profiler) - base) / base * 100
+            groups = {}
+            for candidate, value in zip(candidates, performance.tolist()):
+                groups[candidate[:4]] = max(groups.get(candidate[:4], -np.inf), value)
+            kept = min(len(groups), max(top, math.ceil(len(groups) / self.eta)))
+            kept_groups = set(sorted(groups, key=groups.get, reverse=True)[:kept])
+            survivors = [candidate for candidate in candidates if candidate[:4] in kept_groups]
+            self._record(rung, market, len(candidates), len(survivors), performance.max())
+            candidates = survivors
+
+        results = self._rows(candidates)
+        results = results.sort_values('Performance vs Buy and Hold (%)', ascending=False, kind='stable', ignore_index=True)
+        self._record(len(self.windows) - 1, self.market, len(candidates), len(candidates),
+                     results['Performance vs Buy and Hold (%)'].max())
+        return results
+
+    def _record(self, rung, market, candidates, kept, best):
+        bars = len(market.open_price)
+        self.evaluations += candidates
+        self.bars_evaluated += candidates * bars
+        self.rungs.append([rung, market.end_date, bars, candidates, kept, round(best, 2)])
+
+    def rung_table(self):
+        return pd.DataFrame(self.rungs, columns=RUNG_COLUMNS)
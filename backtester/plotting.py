@@ -0,0 +1,58 @@
+import matplotlib.pyplot as plt
+from .signals import BUY, SELL
+
+# Charts of the backtests, kept out of the strategy modules so importing the backtester does not load matplotlib
+
+
+def plot_strategy1(backtest):
+    plt.figure(figsize=(12, 6))
+
+    plt.plot(backtest.data.index, backtest.data['SPY Opening Price'], label='SPY Opening Price', color='blue')
+    buy_signals = backtest.ledger['open_index'][backtest.ledger['position'] == BUY]
+    sell_signals = backtest.ledger['open_index'][backtest.ledger['position'] == SELL]
+    plt.scatter(backtest.data.index[buy_signals], backtest.ledger['open_price'][backtest.ledger['position'] == BUY],
+                label='Buy', color='green', marker='^', s=70, zorder=5)
+    plt.scatter(backtest.data.index[sell_signals], backtest.ledger['open_price'][backtest.ledger['position'] == SELL],
+                label='Sell', color='red', marker='v', s=70, zorder=5)
+
+    plt.xlabel('Date')
+    plt.ylabel('SPY Opening Price')
+    plt.title('Backtest of Trading Strategy', size=12, weight='bold', y=1)
+    plt.legend(loc='upper left')
+
+    plt.show()
+
+
+def plot_strategy2(backtest):
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 10), sharex=True, height_ratios=[2, 1, 1])
+
+    ax1.plot(backtest.data.index, backtest.data['SPY Opening Price'], label='SPY Opening Price', color='blue')
+    buy_signals = backtest.ledger['position'] == BUY
+    sell_signals = backtest.ledger['position'] == SELL
+    ax1.scatter(backtest.data.index[backtest.ledger['open_index'][buy_signals]], backtest.ledger['open_price'][buy_signals],
+                label='Buy', color='green', marker='^', s=70, zorder=5)
+    ax1.scatter(backtest.data.index[backtest.ledger['open_index'][sell_signals]], backtest.ledger['open_price'][sell_signals],
+                label='Sell', color='red', marker='v', s=70, zorder=5)
+    ax1.set_ylabel('SPY Opening Price')
+    ax1.legend(loc='upper left')
+
+    ax2.plot(backtest.data.index, backtest.data['Fear and Greed Index'], label='Fear and Greed Index', color='orange')
+    ax2.set_ylabel('Fear and Greed Index')
+    ax2.legend(loc='upper left')
+
+    initial_shares = backtest.initial_balance // backtest.data.iloc[0]['SPY Opening Price']
+    buy_hold_equity = backtest.data['SPY Closing Price'] * initial_shares
+    buy_hold_equity.iloc[0] = backtest.initial_balance
+    daily_equity = backtest.calculate_daily_equity()
+
+    ax3.plot(daily_equity.index, daily_equity.values, label='Strategy', color='purple')
+    ax3.plot(backtest.data.index, buy_hold_equity, label='Buy & Hold', color='grey')
+    ax3.set_ylabel('Equity Balance')
+    ax3.set_xlabel('Date')
+    ax3.legend(loc='upper left')
+
+    fig.suptitle('Backtest of Trading Strategy', size=12, weight='bold', y=1)
+    plt.tight_layout()
+    plt.subplots_adjust(hspace=0.1)
+
+    plt.show()
@@ -0,0 +1,262 @@
+import numpy as np
+import pandas as pd
+from .engine import NS_PER_DAY, bracket_equity, round2, to_nanoseconds
+from .ledger import STRATEGY2_FIELDS, TradeLedger
+from .profiling import timed
+from .report import strategy2_report
+from .signals import BUY, SELL
+
+# Strategy 2 trades of a portfolio, with the column of the instrument each one traded
+PORTFOLIO_FIELDS = {'instrument': np.int64, **STRATEGY2_FIELDS}
+# How the risk of the positions opened on a bar is set, as a share of the balance:
+# 'per_trade' risks risk_per_trade % on every position like Backtest2, 'split' shares risk_per_trade % between the
+# positions opened on the same bar and 'weighted' scales risk_per_trade % by instrument weights that average to one
+ALLOCATIONS = ('per_trade', 'split', 'weighted')
+INSTRUMENT_COLUMNS = ['Instrument', 'Total Trades', 'Total Buys', 'Total Sells', 'Number of Winners', 'Win Rate (%)',
+                      'Total Returns', 'Buy and Hold Returns']
+
+
+def listed_range(open_price, close_price):
+    # First and last bar with prices of each instrument, len(prices) for an instrument without any
+    valid = np.isfinite(open_price) & np.isfinite(close_price)
+    bars = len(valid)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), bars)
+    last = np.where(valid.any(axis=0), bars - 1 - valid[::-1].argmax(axis=0), -1)
+    return first, last
+
+
+class Portfolio:
+    # Strategy 2 on many instruments at once with one shared balance. Prices are days x instruments arrays, NaN
+    # before an instrument lists and after it delists (gaps in between should be forward filled), and the Fear and
+    # Greed Index is one column for all of them. Every instrument has a buy and a sell slot, the signal state of
+    # bracket_signals, so the buy and sell days of the index are found once and each bar visits the open slots and
+    # the instruments that can open as whole arrays. On a bar positions are closed first, then new ones are sized on
+    # the balance and opened in instrument order and closed again if their bracket is hit the same bar. Balances add
+    # up in trade order, so a single instrument gives exactly the trades and balance of Backtest2. Positions still
+    # open on an instrument's last bar are closed at its close. risk_reward_ratio and loss_buffer may differ per
+    # instrument, max_leverage caps the notional of the open positions at a multiple of the balance
+    def __init__(self, dates, open_price, high_price, low_price, close_price, index, initial_balance, buy_threshold,
+                 sell_threshold, risk_reward_ratio=3, loss_buffer=3, risk_per_trade=1, allocation='per_trade',
+                 weights=None, max_leverage=None, instruments=None, profiler=None):
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Unknown allocation '{allocation}', expected one of {', '.join(ALLOCATIONS)}")
+        self.dates = pd.DatetimeIndex(dates)
+        self.nanoseconds = to_nanoseconds(self.dates)
+        self.open_price = np.asarray(open_price, dtype=float)
+        self.high_price = np.asarray(high_price, dtype=float)
+        self.low_price = np.asarray(low_price, dtype=float)
+        self.close_price = np.asarray(close_price, dtype=float)
+        self.index = np.asarray(index, dtype=float)
+        count = self.open_price.shape[1]
+        self.instruments = list(range(count)) if instruments is None else list(instruments)
+        self.initial_balance = initial_balance
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.risk_reward_ratio = np.broadcast_to(np.asarray(risk_reward_ratio, dtype=float), count)
+        self.loss_buffer = np.broadcast_to(np.asarray(loss_buffer, dtype=float), count)
+        self.risk_per_trade = risk_per_trade
+        self.allocation = allocation
+        weights = np.ones(count) if weights is None else np.asarray(weights, dtype=float)
+        self.weights = weights / weights.mean()
+        self.max_leverage = max_leverage
+        self.profiler = profiler
+        self.first, self.last = listed_range(self.open_price, self.close_price)
+        self.balance = initial_balance
+        self.ledger = TradeLedger(PORTFOLIO_FIELDS)
+        self.equity = None
+        self.report = {}
+
+    @classmethod
+    def from_frames(cls, prices, index, initial_balance, buy_threshold, sell_threshold, **kwargs):
+        # prices has (field, ticker) columns with Open, High, Low and Close fields, e.g. what yfinance downloads for
+        # many tickers, index is the Fear and Greed Index by date. Only days with an index value are kept
+        prices = prices[prices.index.isin(index.index)]
+        tickers = prices['Close'].columns
+        arrays = [prices[field][tickers].to_numpy(dtype=float) for field in ['Open', 'High', 'Low', 'Close']]
+        return cls(prices.index, *arrays, index.reindex(prices.index).to_numpy(dtype=float), initial_balance,
+                   buy_threshold, sell_threshold, instruments=list(tickers), **kwargs)
+
+    def buy_and_hold_return(self):
+        # Initial balance split between the instruments like the risk (evenly unless weighted), each bought at its
+        # first open and sold at its last close like Backtest2's buy and hold
+        listed = self.first <= self.last
+        instruments = np.flatnonzero(listed)
+        weights = self.weights if self.allocation == 'weighted' else np.ones(len(self.weights))
+        budget = self.initial_balance * weights[instruments] / weights[instruments].sum()
+        first_open = self.open_price[self.first[instruments], instruments]
+        last_close = self.close_price[self.last[instruments], instruments]
+        returns = np.zeros(len(self.weights))
+        returns[instruments] = round2((round2(last_close) - round2(first_open)) * (budget // first_open))
+        return returns
+
+    def _close(self, slots, trade_ids, prices, bar, extreme):
+        # Close the trades in the slots at prices on bar and return their returns in trade order
+        ledger = self.ledger
+        order = np.argsort(trade_ids, kind='stable')
+        trade_ids = trade_ids[order]
+        prices = round2(prices[order])
+        extreme = extreme[order]
+        buys = ledger['position'][trade_ids] == BUY
+        entry_price = ledger['open_price'][trade_ids]
+        shares = ledger['shares'][trade_ids]
+        equity_balance = ledger['equity_balance'][trade_ids]
+        returns = round2(np.where(buys, prices - entry_price, entry_price - prices) * shares)
+        max_drawdown = round2(np.where(buys, extreme - entry_price, entry_price - extreme) * shares)
+        max_drawdown = np.where((returns < 0) & (max_drawdown < returns), returns, max_drawdown)
+        ledger['close_index'][trade_ids] = bar
+        ledger['close_price'][trade_ids] = prices
+        ledger['returns'][trade_ids] = returns
+        ledger['pct_returns'][trade_ids] = round2((returns / equity_balance) * 100)
+        ledger['duration'][trade_ids] = (self.nanoseconds[bar] - self.nanoseconds[ledger['open_index'][trade_ids]]) // NS_PER_DAY
+        ledger['max_drawdown'][trade_ids] = max_drawdown
+        ledger['pct_max_drawdown'][trade_ids] = round2((max_drawdown / equity_balance) * 100)
+        self._active[slots] = False
+        return returns
+
+    def _add(self, balance, returns):
+        # Added one after the other like the single instrument simulation does
+        return np.cumsum(np.concatenate(([balance], returns)))[-1] if len(returns) else balance
+
+    def _exits(self, bar, balance):
+        # Open slots closed by their bracket on this bar or by the instrument's last bar, at its close
+        slots = np.flatnonzero(self._active)
+        if not len(slots):
+            return balance
+        count = len(self.weights)
+        instruments = slots % count
+        buys = slots < count
+        high = self.high_price[bar, instruments]
+        low = self.low_price[bar, instruments]
+        extreme = self._extreme[slots] = np.where(buys, np.fmin(self._extreme[slots], low), np.fmax(self._extreme[slots], high))
+        take_profit = self._take_profit[slots]
+        stop_loss = self._stop_loss[slots]
+        hit_target = np.where(buys, high >= take_profit, low <= take_profit)
+        hit_stop = np.where(buys, low <= stop_loss, high >= stop_loss)
+        ending = self.last[instruments] == bar
+        exits = np.flatnonzero(hit_target | hit_stop | ending)
+        if not len(exits):
+            return balance
+        prices = np.where(ending, self.close_price[bar, instruments], np.where(hit_target, take_profit, stop_loss))
+        return self._add(balance, self._close(slots[exits], self._trade_id[slots[exits]], prices[exits], bar, extreme[exits]))
+
+    def _opens(self, bar, balance, buy_day, sell_day):
+        # Slots opening on this bar, a buy where the buy slot is free and otherwise a sell where the sell slot is free
+        count = len(self.weights)
+        tradable = (self.first <= bar) & (bar < self.last) & np.isfinite(self.open_price[bar])
+        buying = tradable & ~self._active[:count] if buy_day else np.zeros(count, dtype=bool)
+        selling = tradable & ~buying & ~self._active[count:] if sell_day else np.zeros(count, dtype=bool)
+        instruments = np.flatnonzero(buying | selling)
+        if not len(instruments):
+            return balance
+        buys = buying[instruments]
+        price = self.open_price[bar, instruments]
+        stop_factor = self.loss_buffer[instruments] * 0.01
+        target_factor = self.loss_buffer[instruments] * 0.01 * self.risk_reward_ratio[instruments]
+        take_profit = np.where(buys, price * (1 + target_factor), price * (1 - target_factor))
+        stop_loss = np.where(buys, price * (1 - stop_factor), price * (1 + stop_factor))
+        risk_amount = self.risk_per_trade * 0.01 * balance
+        if self.allocation == 'split':
+            risk_amount = risk_amount / len(instruments)
+        elif self.allocation == 'weighted':
+            risk_amount = risk_amount * self.weights[instruments]
+        shares = np.floor_divide(risk_amount, np.where(buys, price - stop_loss, stop_loss - price))
+        open_price = round2(price)
+        if self.max_leverage is not None:
+            held = self._trade_id[np.flatnonzero(self._active)]
+            room = max(self.max_leverage * balance - (self.ledger['shares'][held] * self.ledger['open_price'][held]).sum(), 0)
+            notional = (shares * open_price).sum()
+            if notional > room:
+                shares = np.floor(shares * (room / notional))
+
+        trade_ids = np.arange(len(self.ledger), len(self.ledger) + len(instruments))
+        opened = len(instruments)
+        self.ledger.extend_columns({
+            'instrument': instruments, 'open_index': np.full(opened, bar), 'position': np.where(buys, BUY, SELL),
+            'open_price': open_price, 'shares': shares, 'take_profit': take_profit, 'stop_loss': stop_loss,
+            'equity_balance': np.full(opened, balance), 'close_index': np.full(opened, -1),
+            'close_price': np.full(opened, np.nan), 'returns': np.zeros(opened), 'pct_returns': np.zeros(opened),
+            'duration': np.full(opened, -1), 'max_drawdown': np.zeros(opened), 'pct_max_drawdown': np.zeros(opened),
+        })
+        slots = np.where(buys, instruments, instruments + count)
+        self._active[slots] = True
+        self._trade_id[slots] = trade_ids
+        self._take_profit[slots] = take_profit
+        self._stop_loss[slots] = stop_loss
+
+        # The bar of a new position is both ends of its range, so its extreme is that bar's low or high
+        high = self.high_price[bar, instruments]
+        low = self.low_price[bar, instruments]
+        extreme = self._extreme[slots] = np.where(buys, low, high)
+        hit_target = np.where(buys, high >= take_profit, low <= take_profit)
+        exits = np.flatnonzero(hit_target | np.where(buys, low <= stop_loss, high >= stop_loss))
+        if not len(exits):
+            return balance
+        prices = np.where(hit_target, take_profit, stop_loss)
+        return self._add(balance, self._close(slots[exits], trade_ids[exits], prices[exits], bar, extreme[exits]))
+
+    def simulate(self):
+        # Final balance, filling the ledger. Bars without an open position or a signal day only cost two checks
+        count = len(self.weights)
+        self.ledger.clear()
+        self._active = np.zeros(2 * count, dtype=bool)
+        self._trade_id = np.full(2 * count, -1)
+        self._take_profit = np.zeros(2 * count)
+        self._stop_loss = np.zeros(2 * count)
+        self._extreme = np.zeros(2 * count)
+        buy_days = (self.index <= self.buy_threshold).tolist()
+        sell_days = (self.index >= self.sell_threshold).tolist()
+        balance = self.initial_balance
+        for bar in range(len(buy_days)):
+            if self._active.any():
+                balance = self._exits(bar, balance)
+            if buy_days[bar] or sell_days[bar]:
+                balance = self._opens(bar, balance, buy_days[bar], sell_days[bar])
+        return np.float64(balance) if len(self.ledger) else balance
+
+    def backtest(self):
+        bars = self.open_price.size
+        self.balance = timed(self.profiler, 'Simulation', self.simulate, bars=bars)
+        if self.profiler is not None:
+            self.profiler.count_trades('Simulation', self.ledger)
+        self.equity = timed(self.profiler, 'Equity', bracket_equity, self.close_price, self.initial_balance, self.ledger,
+                            bars=bars)
+        self.report = timed(self.profiler, 'Report', strategy2_report, self.dates.min(), self.dates.max(),
+                            self.initial_balance, self.balance, self.buy_and_hold_return().sum(), self.ledger,
+                            self.dates, self.equity)
+        return self
+
+    def instrument_report(self):
+        # Trades, win rate, realised returns and buy and hold returns of each instrument, whole column reductions
+        ledger = self.ledger
+        count = len(self.weights)
+        instrument = ledger['instrument']
+        trades = np.bincount(instrument, minlength=count)
+        buys = np.bincount(instrument[ledger['position'] == BUY], minlength=count)
+        winners = np.bincount(instrument[ledger['returns'] > 0], minlength=count)
+        returns = np.bincount(instrument, weights=ledger['returns'], minlength=count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            win_rate = np.where(trades > 0, np.round(winners / trades * 100, 2), 0.0)
+        return pd.DataFrame({
+            'Instrument': self.instruments, 'Total Trades': trades, 'Total Buys': buys, 'Total Sells': trades - buys,
+            'Number of Winners': winners, 'Win Rate (%)': win_rate, 'Total Returns': np.round(returns, 2),
+            'Buy and Hold Returns': np.round(self.buy_and_hold_return(), 2),
+        }, columns=INSTRUMENT_COLUMNS)
+
+    def transaction_records(self):
+        # Like Backtest2's records with the instrument of each trade, in the order the trades were opened
+        ledger = self.ledger
+        closed = ledger['close_index'] >= 0
+        return pd.DataFrame({
+            'Instrument': np.array(self.instruments, dtype=object)[ledger['instrument']],
+            'Open Date': self.dates[ledger['open_index']],
+            'Open Price': ledger['open_price'],
+            'Position': np.where(ledger['position'] == BUY, 'Buy', 'Sell').astype(object),
+            'Shares': ledger['shares'],
+            'Close Date': self.dates[ledger['close_index']].where(closed),
+            'Close Price': ledger['close_price'],
+            'Returns': ledger['returns'],
+            'Returns (%)': ledger['pct_returns'],
+            'Duration': ledger['duration'],
+            'Max Drawdown': ledger['max_drawdown'],
+            'Max Drawdown (%)': ledger['pct_max_drawdown'],
+        })
@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+PROFILE_COLUMNS = ['Phase', 'Calls', 'Total Time (s)', 'Average Time (ms)', 'Time (%)', 'Bars', 'Bars per Second',
+                   'Trades Opened', 'Trades Closed']
+
+
+def timed(profiler, phase, function, *args, bars=0):
+    # The only cost without a profiler is this call and the None check
+    if profiler is None:
+        return function(*args)
+    return profiler.call(phase, function, *args, bars=bars)
+
+
+class Profiler:
+    # Wall time, call counts, bars processed and trades per phase of a backtest. Passing the same profiler to every
+    # Backtest or grid of a sweep aggregates the whole sweep, table() exports it. The phases are
+    #   Backtest1, strategy1_grid: Signals, Simulation, Report
+    #   Backtest2: Signals, Simulation, Equity, Report, and Transaction Records when they are built
+    #   strategy2_grid, SuccessiveHalving: Signals, Schedule, Sizing, Equity, Report
+    #   WalkForward: Signals, Schedule, Sizing
+    #   Portfolio: Simulation, Equity, Report
+    #   ChunkedBacktest: Schedule, Sizing, Equity, Report
+    def __init__(self):
+        self.phases = {}
+
+    def _entry(self, phase):
+        entry = self.phases.get(phase)
+        if entry is None:
+            entry = self.phases[phase] = {'calls': 0, 'seconds': 0.0, 'bars': 0, 'opened': 0, 'closed': 0}
+        return entry
+
+    def call(self, phase, function, *args, bars=0):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        entry = self._entry(phase)
+        entry['calls'] += 1
+        entry['seconds'] += elapsed
+        entry['bars'] += bars
+        return result
+
+    def count_trades(self, phase, ledger):
+        entry = self._entry(phase)
+        entry['opened'] += len(ledger)
+        entry['closed'] += int(np.count_nonzero(ledger['close_index'] >= 0))
+
+    def merge(self, other):
+        # e.g. profilers returned by worker processes
+        for phase, counts in other.phases.items():
+            entry = self._entry(phase)
+            for key, value in counts.items():
+                entry[key] += value
+        return self
+
+    def reset(self):
+        self.phases = {}
+
+    def table(self):
+        total = sum(entry['seconds'] for entry in self.phases.values())
+        rows = []
+        for phase, entry in self.phases.items():
+            rows.append([phase, entry['calls'], entry['seconds'], entry['seconds'] / entry['calls'] * 1000 if entry['calls'] else 0,
+                         entry['seconds'] / total * 100 if total else 0, entry['bars'],
+                         entry['bars'] / entry['seconds'] if entry['seconds'] and entry['bars'] else 0,
+                         entry['opened'], entry['closed']])
+        table = pd.DataFrame(rows, columns=PROFILE_COLUMNS)
+        return table.sort_values('Total Time (s)', ascending=False, ignore_index=True)
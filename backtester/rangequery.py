@@ -0,0 +1,124 @@
+import numpy as np
+from .signals import BUY, HOLD, SELL
+
+
+class SparseTable:
+    # Range minimum/maximum over fixed values in O(1) per query. Values are split into blocks, each position
+    # stores the extreme up to the end (suffix) and from the start (prefix) of its block, and a sparse table over
+    # block extremes answers the run of whole blocks in between, which keeps memory close to 2n for long histories
+    def __init__(self, values, ufunc=np.fmin, block_size=64):
+        self.values = np.asarray(values, dtype=float)
+        self.ufunc = ufunc
+        self.block_size = block_size
+        length = len(self.values)
+        blocks = -(-length // block_size)
+        padding = np.inf if ufunc is np.fmin else -np.inf
+        padded = np.full(blocks * block_size, padding)
+        padded[:length] = self.values
+        padded = padded.reshape(blocks, block_size)
+
+        self.prefix = ufunc.accumulate(padded, axis=1).ravel()[:length]
+        self.suffix = ufunc.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()[:length]
+        self.levels = [ufunc.reduce(padded, axis=1)] if blocks else []
+        width = 1
+        while 2 * width <= blocks:
+            previous = self.levels[-1]
+            self.levels.append(ufunc(previous[:-width], previous[width:]))
+            width *= 2
+
+    def query(self, start, end):
+        # Extreme of values[start:end + 1], both ends inclusive like a label slice
+        start, end = int(start), int(end)
+        first_block = start // self.block_size
+        last_block = end // self.block_size
+        if first_block == last_block:
+            return self.ufunc.reduce(self.values[start:end + 1])
+        result = self.ufunc(self.suffix[start], self.prefix[end])
+        if last_block - first_block > 1:
+            low, high = first_block + 1, last_block - 1
+            level = (high - low + 1).bit_length() - 1
+            table = self.levels[level]
+            result = self.ufunc(result, self.ufunc(table[low], table[high - (1 << level) + 1]))
+        return result
+
+
+class PriceExtrema:
+    def __init__(self, low_price, high_price, block_size=64):
+        self.low = SparseTable(low_price, np.fmin, block_size)
+        self.high = SparseTable(high_price, np.fmax, block_size)
+
+    @classmethod
+    def from_frame(cls, data):
+        return cls(data['SPY Low Price'].to_numpy(dtype=float), data['SPY High Price'].to_numpy(dtype=float))
+
+    def lowest(self, start, end):
+        return self.low.query(start, end)
+
+    def highest(self, start, end):
+        return self.high.query(start, end)
+
+
+class ShiftedExtrema:
+    # Range queries of a window of the history starting at offset, answered by the extrema of the whole history
+    def __init__(self, extrema, offset):
+        self.extrema = extrema
+        self.offset = offset
+
+    def lowest(self, start, end):
+        return self.extrema.lowest(start + self.offset, end + self.offset)
+
+    def highest(self, start, end):
+        return self.extrema.highest(start + self.offset, end + self.offset)
+
+
+class CrossingIndex:
+    # Days on which the index is at or below / at or above a level, found once per level and shared by every
+    # threshold pair that uses it. A strategy 1 run then jumps from one signal to the next with a binary search
+    # per signal instead of scanning every day
+    def __init__(self, index):
+        self.index = np.asarray(index, dtype=float)
+        self._below = {}
+        self._above = {}
+
+    def below(self, level):
+        days = self._below.get(level)
+        if days is None:
+            days = self._below[level] = np.flatnonzero(self.index <= level)
+        return days
+
+    def above(self, level):
+        days = self._above.get(level)
+        if days is None:
+            days = self._above[level] = np.flatnonzero(self.index >= level)
+        return days
+
+    @staticmethod
+    def _next(days, start):
+        position = int(days.searchsorted(start))
+        return int(days[position]) if position < len(days) else None
+
+    def events(self, buy_threshold, sell_threshold, stop=None):
+        # Days and sides of the non-hold signals of the notebook's signal loop, limited to days before stop.
+        # A day that meets both thresholds while no signal is held is a buy, as in the signal loop
+        stop = len(self.index) if stop is None else stop
+        below = self.below(buy_threshold)
+        above = self.above(sell_threshold)
+        days = []
+        sides = []
+        signal = HOLD
+        day = 0
+        while True:
+            buy_day = self._next(below, day) if signal != BUY else None
+            sell_day = self._next(above, day) if signal != SELL else None
+            if buy_day is not None and (sell_day is None or buy_day <= sell_day):
+                day, signal = buy_day, BUY
+            elif sell_day is not None:
+                day, signal = sell_day, SELL
+            else:
+                break
+            if day >= stop:
+                break
+            days.append(day)
+            sides.append(signal)
+            day += 1
+        return np.array(days, dtype=np.int64), np.array(sides, dtype=np.int8)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+from .ledger import TradeLedger
+
+SENTIMENTS = ['Extreme Fear', 'Fear', 'Neutral', 'Greed', 'Extreme Greed']
+SENTIMENT_BINS = [25, 50, 55, 75]
+NEUTRAL = SENTIMENTS.index('Neutral')
+# Greed and Extreme Greed are greedy, Fear and Extreme Fear fearful and Neutral carries on the regime before it
+COMBINED_SENTIMENTS = ['Fearful', 'Greedy']
+REGIME_COLUMNS = ['Start Date', 'End Date', 'Length', 'Sentiment', 'SPY Return (%)']
+DURATION_COLUMNS = ['Sentiment', 'Regimes', 'Average Duration', 'Average SPY Return (%)']
+BAR_FIELDS = {'date': np.int64, 'close': np.float64}
+RUN_FIELDS = {'start': np.int64, 'length': np.int64, 'code': np.int8}
+
+
+def sentiment_codes(index):
+    # Position of each score in SENTIMENTS, the number of bins at or below it as np.digitize counts them but summed
+    # from one comparison per bin, which is a few times faster with so few bins. Same bands as the notebook, anything
+    # outside 0 to 75 falls into Extreme Greed like its else branch did
+    index = np.asarray(index, dtype=float)
+    codes = np.zeros(len(index), dtype=np.int8)
+    for edge in SENTIMENT_BINS:
+        codes += index >= edge
+    codes[~(index >= 0)] = len(SENTIMENTS) - 1
+    return codes
+
+
+def sentiment(index):
+    return np.array(SENTIMENTS, dtype=object)[sentiment_codes(index)]
+
+
+def rating(score):
+    # Sentiment of a single score, e.g. the latest one in the alert
+    return SENTIMENTS[sentiment_codes([score])[0]]
+
+
+def combined_codes(codes, previous=0):
+    # Position of each day in COMBINED_SENTIMENTS. A Neutral day takes the regime of the last day that was not Neutral,
+    # or previous when there is none, which is Fearful at the start of the history like in the notebook. The count of
+    # days that are not Neutral up to each day picks its regime out of those days
+    codes = np.asarray(codes)
+    known = codes != NEUTRAL
+    regimes = np.concatenate(([previous], codes[known] > NEUTRAL)).astype(np.int8)
+    return regimes[np.cumsum(known, dtype=np.int64)]
+
+
+def run_lengths(codes):
+    # Start position and length of each run of equal codes
+    codes = np.asarray(codes)
+    if not len(codes):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(codes[1:] != codes[:-1]) + 1))
+    return starts, np.diff(np.append(starts, len(codes)))
+
+
+class SentimentRegimes:
+    # Runs of consecutive bars with the same sentiment, or the same combined sentiment, found by run-length encoding
+    # the sentiment codes. Bars and runs are kept in ledgers that grow by doubling, so appending new bars classifies
+    # and encodes only those and extends the last run when they carry on its sentiment. The SPY return of a run is
+    # from the close of its first bar to the close of its last, the last run is still open and may grow
+    def __init__(self, combined=False):
+        self.combined = combined
+        self.labels = COMBINED_SENTIMENTS if combined else SENTIMENTS
+        self.bars = TradeLedger(BAR_FIELDS)
+        self.runs = TradeLedger(RUN_FIELDS)
+
+    @classmethod
+    def from_frame(cls, data, combined=False):
+        return cls(combined).append(data.index, data['Fear and Greed Index'], data.get('SPY Closing Price'))
+
+    def __len__(self):
+        return len(self.runs)
+
+    def append(self, dates, index, close=None):
+        # Dates must follow the bars already added. Without closing prices the returns of the runs are NaN
+        codes = sentiment_codes(index)
+        if self.combined:
+            codes = combined_codes(codes, self.runs['code'][-1] if len(self.runs) else 0)
+        dates = np.asarray(pd.DatetimeIndex(dates), dtype='datetime64[ns]').view(np.int64)
+        close = np.full(len(codes), np.nan) if close is None else np.asarray(close, dtype=float)
+        offset = len(self.bars)
+        self.bars.extend_columns({'date': dates, 'close': close})
+
+        starts, lengths = run_lengths(codes)
+        if len(starts) and len(self.runs) and codes[0] == self.runs['code'][-1]:
+            self.runs['length'][-1] += lengths[0]
+            starts, lengths = starts[1:], lengths[1:]
+        self.runs.extend_columns({'start': starts + offset, 'length': lengths, 'code': codes[starts]})
+        return self
+
+    def frame(self):
+        # One row per run, see REGIME_COLUMNS
+        starts = self.runs['start']
+        ends = starts + self.runs['length'] - 1
+        dates = self.bars['date'].astype('datetime64[ns]')
+        close = self.bars['close']
+        return pd.DataFrame({
+            'Start Date': dates[starts],
+            'End Date': dates[ends],
+            'Length': self.runs['length'],
+            'Sentiment': np.array(self.labels, dtype=object)[self.runs['code']],
+            'SPY Return (%)': (close[ends] / close[starts] - 1) * 100,
+        }, columns=REGIME_COLUMNS)
+
+    def durations(self):
+        # Number of runs, average length in bars and average SPY return of each sentiment, greediest first like the
+        # notebook's duration chart. Sentiments that never occurred have NaN averages
+        codes = self.runs['code']
+        starts = self.runs['start']
+        ends = starts + self.runs['length'] - 1
+        close = self.bars['close']
+        labels = len(self.labels)
+        counts = np.bincount(codes, minlength=labels)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lengths = np.bincount(codes, weights=self.runs['length'], minlength=labels) / counts
+            returns = np.bincount(codes, weights=(close[ends] / close[starts] - 1) * 100, minlength=labels) / counts
+        return pd.DataFrame({'Sentiment': self.labels, 'Regimes': counts, 'Average Duration': lengths,
+                             'Average SPY Return (%)': returns}, columns=DURATION_COLUMNS).iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,181 @@
+import numpy as np
+from .engine import NS_PER_DAY, to_nanoseconds
+from .signals import BUY, SELL
+
+# Daily returns of the equity curve are annualised over trading days
+TRADING_DAYS = 252
+
+STRATEGY2_REPORT_COLUMNS = [
+    'Start Date', 'End Date', 'Backtest Duration', 'Total Trades', 'Total Buys', 'Total Sells', 'Initial Balance',
+    'Final Balance', 'Total Returns', 'Total Returns (%)', 'Annualised Returns (%)', 'Average Returns',
+    'Average Returns (%)', 'Average Returns Per Trade', 'Average Returns Per Trade (%)', 'Average Trade Duration',
+    'Number of Winners', 'Number of Long Winners', 'Number of Short Winners', 'Average Winner Returns',
+    'Average Winner Returns (%)', 'Number of Losers', 'Number of Long Losers', 'Number of Short Losers',
+    'Average Loser Returns', 'Average Loser Returns (%)', 'Win Rate (%)', 'Average Drawdown', 'Average Drawdown (%)',
+    'Max Loss Streak', 'Max Equity Drawdown', 'Max Equity Drawdown (%)', 'Max Drawdown Duration', 'Volatility (%)',
+    'Sharpe Ratio', 'Sortino Ratio', 'Exposure (%)', 'Buy and Hold Returns', 'Buy and Hold Returns (%)', 'Annualised Buy and Hold Returns (%)',
+    'Average Buy and Hold Returns (%)', 'Performance vs Buy and Hold (%)'
+]
+
+
+def max_streak(mask):
+    mask = np.asarray(mask, dtype=bool)
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return int((np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)).max())
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else 0.0
+
+
+def _ratios(numerators, denominators):
+    # _ratio of each pair, an equity curve can reach 0 once a short loses the whole balance
+    return np.divide(numerators, denominators, out=np.zeros(len(numerators)), where=denominators != 0)
+
+
+def equity_metrics(dates, equity, trades):
+    # Risk of the daily equity curve, whole array reductions only. Drawdown duration runs from the peak before a
+    # drawdown to the day equity gets back to it, or to the last day. Exposure is the share of days ending with a
+    # position open
+    nanoseconds = to_nanoseconds(dates)
+    equity = np.asarray(equity, dtype=float)
+    days = len(equity)
+    peaks = np.maximum.accumulate(equity)
+    drawdowns = equity - peaks
+    underwater = np.diff(np.concatenate(([0], (drawdowns < 0).view(np.int8), [0])))
+    starts = np.flatnonzero(underwater == 1)
+    ends = np.minimum(np.flatnonzero(underwater == -1), days - 1)
+    durations = (nanoseconds[ends] - nanoseconds[np.maximum(starts - 1, 0)]) // NS_PER_DAY
+
+    returns = _ratios(np.diff(equity), equity[:-1])
+    volatility = np.std(returns, ddof=1) if len(returns) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2)) if len(returns) else 0.0
+    mean_return = np.mean(returns) if len(returns) else 0.0
+
+    held = np.zeros(days + 1, dtype=np.int64)
+    end = np.where(trades['close_index'] >= 0, trades['close_index'], days)
+    np.add.at(held, trades['open_index'], 1)
+    np.add.at(held, end, -1)
+    return {
+        'Max Equity Drawdown': round(drawdowns.min(), 2) if days else 0,
+        'Max Equity Drawdown (%)': round(_ratios(drawdowns, peaks).min() * 100, 2) if days else 0,
+        'Max Drawdown Duration': int(durations.max()) if len(durations) else 0,
+        'Volatility (%)': round(volatility * np.sqrt(TRADING_DAYS) * 100, 2),
+        'Sharpe Ratio': round(_ratio(mean_return, volatility) * np.sqrt(TRADING_DAYS), 2),
+        'Sortino Ratio': round(_ratio(mean_return, downside) * np.sqrt(TRADING_DAYS), 2),
+        'Exposure (%)': round(np.count_nonzero(np.cumsum(held[:days]) > 0) / days * 100, 2) if days else 0,
+    }
+
+
+def trade_statistics(trades):
+    # Every per-trade aggregate both reports need, each mask and count computed once over the ledger columns
+    returns = trades['returns']
+    pct_returns = trades['pct_returns']
+    durations = trades['duration'][trades['close_index'] >= 0]
+    winners = returns > 0
+    losers = returns < 0
+    total_winners = int(np.count_nonzero(winners))
+    total_losers = int(np.count_nonzero(losers))
+    return {
+        'total_trades': len(returns),
+        'avg_duration': np.mean(durations) if len(durations) else 0,
+        'winners': winners,
+        'losers': losers,
+        'total_winners': total_winners,
+        'total_losers': total_losers,
+        'avg_winner': round(np.mean(returns[winners]), 2) if total_winners else 0,
+        'pct_avg_winner': round(np.mean(pct_returns[winners]), 2) if total_winners else 0,
+        'avg_loser': round(np.mean(returns[losers]), 2) if total_losers else 0,
+        'pct_avg_loser': round(np.mean(pct_returns[losers]), 2) if total_losers else 0,
+    }
+
+
+def returns_metrics(days, years, initial_balance, balance, stats):
+    total_returns = balance - initial_balance
+    total_trades = stats['total_trades']
+    return {
+        'Initial Balance': initial_balance,
+        'Final Balance': round(balance, 2),
+        'Total Returns': round(total_returns, 2),
+        'Total Returns (%)': round((total_returns / initial_balance) * 100, 2),
+        'Annualised Returns (%)': round(((1 + total_returns / initial_balance) ** (365 / days) - 1) * 100, 2),
+        'Average Returns': round(total_returns / years, 2),
+        'Average Returns (%)': round((total_returns / initial_balance) * 100 / years, 2),
+        'Average Returns Per Trade': round(total_returns / total_trades, 2),
+        'Average Returns Per Trade (%)': round((total_returns / initial_balance) * 100 / total_trades, 2),
+        'Average Trade Duration': int(stats['avg_duration']),
+    }
+
+
+def buy_and_hold_metrics(days, years, initial_balance, balance, buy_and_hold_returns):
+    return {
+        'Buy and Hold Returns': round(buy_and_hold_returns, 2),
+        'Buy and Hold Returns (%)': round((buy_and_hold_returns / initial_balance) * 100, 2),
+        'Annualised Buy and Hold Returns (%)': round(((1 + buy_and_hold_returns / initial_balance) ** (365 / days) - 1) * 100, 2),
+        'Average Buy and Hold Returns (%)': round((buy_and_hold_returns / initial_balance) * 100 / years, 2),
+        'Performance vs Buy and Hold (%)': round(((balance - (buy_and_hold_returns + initial_balance)) / (buy_and_hold_returns + initial_balance)) * 100, 2)
+    }
+
+
+def strategy1_report(start_date, end_date, initial_balance, balance, buy_and_hold_returns, trades):
+    # trades is a TradeLedger (or a mapping of its columns), every metric is a reduction over its columns
+    stats = trade_statistics(trades)
+    days = (end_date - start_date).days
+    years = end_date.year - start_date.year
+
+    report = returns_metrics(days, years, initial_balance, balance, stats)
+    report.update({
+        'Number of Winners': stats['total_winners'],
+        'Average Winner Returns': stats['avg_winner'],
+        'Average Winner Returns (%)': stats['pct_avg_winner'],
+        'Number of Losers': stats['total_losers'],
+        'Average Loser Returns': stats['avg_loser'],
+        'Average Loser Returns (%)': stats['pct_avg_loser'],
+        'Win Rate (%)': round((stats['total_winners'] / stats['total_trades']) * 100, 2),
+    })
+    report.update(buy_and_hold_metrics(days, years, initial_balance, balance, buy_and_hold_returns))
+    report['Total Trades'] = stats['total_trades']
+    return report
+
+
+def strategy2_report(start_date, end_date, initial_balance, balance, buy_and_hold_returns, trades, dates, equity):
+    # dates and equity are the daily equity curve of the run, see engine.bracket_equity
+    stats = trade_statistics(trades)
+    positions = trades['position']
+    longs = positions == BUY
+    shorts = positions == SELL
+    winners = stats['winners']
+    losers = stats['losers']
+    days = (end_date - start_date).days
+    years = end_date.year - start_date.year
+
+    report = {
+        'Start Date': start_date,
+        'End Date': end_date,
+        'Backtest Duration': days,
+        'Total Trades': stats['total_trades'],
+        'Total Buys': int(np.count_nonzero(longs)),
+        'Total Sells': int(np.count_nonzero(shorts)),
+    }
+    report.update(returns_metrics(days, years, initial_balance, balance, stats))
+    report.update({
+        'Number of Winners': stats['total_winners'],
+        'Number of Long Winners': int(np.count_nonzero(winners & longs)),
+        'Number of Short Winners': int(np.count_nonzero(winners & shorts)),
+        'Average Winner Returns': stats['avg_winner'],
+        'Average Winner Returns (%)': stats['pct_avg_winner'],
+        'Number of Losers': stats['total_losers'],
+        'Number of Long Losers': int(np.count_nonzero(losers & longs)),
+        'Number of Short Losers': int(np.count_nonzero(losers & shorts)),
+        'Average Loser Returns': stats['avg_loser'],
+        'Average Loser Returns (%)': stats['pct_avg_loser'],
+        'Win Rate (%)': round((stats['total_winners'] / stats['total_trades']) * 100, 2),
+        'Average Drawdown': round(np.mean(trades['max_drawdown']), 2),
+        'Average Drawdown (%)': round(np.mean(trades['pct_max_drawdown']), 2),
+        'Max Loss Streak': max_streak(losers),
+    })
+    report.update(equity_metrics(dates, equity, trades))
+    report.update(buy_and_hold_metrics(days, years, initial_balance, balance, buy_and_hold_returns))
+    return report
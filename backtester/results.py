@@ -0,0 +1,116 @@
+import hashlib
+import json
+import re
+import sqlite3
+
+import pandas as pd
+from .grid import STRATEGY2_PARAMETERS
+from .report import STRATEGY2_REPORT_COLUMNS
+
+STRATEGY2_COLUMNS = STRATEGY2_PARAMETERS + STRATEGY2_REPORT_COLUMNS
+DATE_COLUMNS = ['Start Date', 'End Date']
+# Columns indexed when the table is created, more can be added with create_index
+DEFAULT_INDEXES = [['Performance vs Buy and Hold (%)'], ['Max Loss Streak'], ['Total Returns (%)'],
+                   ['Max Equity Drawdown (%)'], ['Sharpe Ratio']]
+
+
+def result_key(version, initial_balance, params):
+    # Parameters are hashed as floats so e.g. a risk per trade of 1 and 1.0 give the same key
+    payload = json.dumps([version, float(initial_balance), [float(value) for value in params]])
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def frame_version(data):
+    # Content hash of a DataFrame, for sweeps over data that does not come from a DatasetStore
+    digest = hashlib.sha256(json.dumps([str(name) for name in data.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _value(value):
+    # sqlite3 binds Python scalars only, timestamps are kept as ISO dates
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+
+class ResultStore:
+    # Sweep rows in one SQLite table, one row per combination keyed by a hash of its parameters, the initial balance
+    # and the dataset version. Every batch is appended in its own transaction as it finishes, so an interrupted sweep
+    # keeps what it finished and a rerun only computes the missing combinations. Rows are never updated
+    def __init__(self, path, columns=STRATEGY2_COLUMNS, parameters=STRATEGY2_PARAMETERS, indexes=DEFAULT_INDEXES):
+        self.path = path
+        self.columns = list(columns)
+        self.parameters = list(parameters)
+        self.connection = sqlite3.connect(path)
+        # Readers can query while a sweep is still appending
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        definitions = ', '.join(_quote(name) + (' TEXT' if name in DATE_COLUMNS else '') for name in self.columns)
+        with self.connection:
+            self.connection.execute(f"CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, "
+                                    f"dataset_version TEXT NOT NULL, {definitions})")
+            self.create_index('dataset_version')
+            for columns in indexes:
+                self.create_index(*columns)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def create_index(self, *columns):
+        name = 'index_' + '_'.join(re.sub(r'[^0-9a-z]+', '_', column.lower()).strip('_') for column in columns)
+        with self.connection:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON results "
+                                    f"({', '.join(_quote(column) for column in columns)})")
+
+    def keys(self, version):
+        cursor = self.connection.execute('SELECT key FROM results WHERE dataset_version = ?', (version,))
+        return {key for key, in cursor}
+
+    def append(self, version, initial_balance, rows):
+        # rows are tuples in the order of self.columns, rows already stored are skipped. Returns the rows added
+        parameter_positions = [self.columns.index(name) for name in self.parameters]
+        records = [(result_key(version, initial_balance, [row[position] for position in parameter_positions]), version,
+                    *map(_value, row)) for row in rows]
+        placeholders = ', '.join('?' * (len(self.columns) + 2))
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(f"INSERT OR IGNORE INTO results VALUES ({placeholders})", records)
+            return self.connection.total_changes - before
+
+    def query(self, where=None, params=(), order_by=None, descending=False, limit=None, version=None, columns=None):
+        # where is an SQL condition on quoted column names with ? placeholders for params, e.g.
+        # query('"Performance vs Buy and Hold (%)" > ?', (0,), order_by='Max Loss Streak')
+        conditions = [] if where is None else [f"({where})"]
+        params = list(params)
+        if version is not None:
+            conditions.append('dataset_version = ?')
+            params.append(version)
+        columns = self.columns if columns is None else list(columns)
+        sql = f"SELECT {', '.join(_quote(name) for name in columns)} FROM results"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if order_by is not None:
+            order_by = [order_by] if isinstance(order_by, str) else order_by
+            sql += ' ORDER BY ' + ', '.join(_quote(name) + (' DESC' if descending else '') for name in order_by)
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        results = pd.DataFrame(self.connection.execute(sql, params).fetchall(), columns=columns)
+        for name in DATE_COLUMNS:
+            if name in results:
+                results[name] = pd.to_datetime(results[name])
+        return results
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+
+RESAMPLE_COLUMNS = ['Final Balance', 'Max Drawdown (%)', 'Max Loss Streak']
+INTERVAL_COLUMNS = ['Metric', 'Actual', 'Mean', 'Lower', 'Median', 'Upper']
+
+
+def trade_fractions(trades, initial_balance):
+    # Return of each closed trade as a fraction of the realised balance just before it closed, in close order, so
+    # compounding them gives back the final balance of the run
+    closed = np.flatnonzero(trades['close_index'] >= 0)
+    closed = closed[np.lexsort((trades['open_index'][closed], trades['close_index'][closed]))]
+    returns = trades['returns'][closed]
+    balances = initial_balance + np.concatenate(([0.0], np.cumsum(returns)[:-1]))
+    return returns / balances
+
+
+def longest_runs(mask):
+    # Longest run of True in each row of a 2-D boolean array. The count up to each position minus the count at the
+    # last False before it is the length of the run ending there
+    counts = np.cumsum(mask, axis=1, dtype=np.int32)
+    resets = np.maximum.accumulate(counts * ~mask, axis=1)
+    return np.subtract(counts, resets, out=counts).max(axis=1, initial=0)
+
+
+def _path_metrics(initial_balance, log_growth):
+    # Final balance, max drawdown (%) and longest losing streak of each row of per step log growth, starting from
+    # initial_balance. Works in log space so the equity is a running sum, overwriting log_growth
+    losses = log_growth < 0
+    equity = np.cumsum(log_growth, axis=1, out=log_growth)
+    peaks = np.maximum.accumulate(np.maximum(equity, 0), axis=1)
+    drawdowns = np.subtract(equity, peaks, out=peaks).min(axis=1, initial=0)
+    final_balance = initial_balance * np.exp(equity[:, -1]) if equity.shape[1] else np.full(len(equity), initial_balance)
+    return np.column_stack([final_balance, np.expm1(drawdowns) * 100, longest_runs(losses)])
+
+
+class MonteCarlo:
+    # Resamples of a run for distributions of its final balance, max drawdown and loss streak. Paths are drawn in
+    # chunks of rows of at most max_bytes per array, every metric is a whole chunk reduction along the path axis.
+    # Trade resamples compound the trade returns as fractions of the balance (see trade_fractions), so they keep the
+    # position sizing of the strategy and a shuffle ends on the same balance as the run. Drawdowns of trade paths are
+    # measured between trades, the block bootstrap of daily equity returns also sees the moves within trades
+    def __init__(self, initial_balance, fractions, equity=None, seed=0, max_bytes=2 ** 22):
+        self.initial_balance = initial_balance
+        self.fractions = np.asarray(fractions, dtype=float)
+        # A trade losing more than the balance leaves nothing to compound
+        self.log_growth = np.log1p(np.maximum(self.fractions, -1))
+        self.equity = None if equity is None else np.asarray(equity, dtype=float)
+        self.rng = np.random.default_rng(seed)
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_backtest(cls, backtest, seed=0, max_bytes=2 ** 22):
+        # A Backtest that has run, strategy 2 runs also bring their daily equity for block_bootstrap
+        equity = getattr(backtest, 'equity', None)
+        return cls(backtest.initial_balance, trade_fractions(backtest.ledger, backtest.initial_balance), equity, seed,
+                   max_bytes)
+
+    def _chunks(self, paths, length):
+        # Rows per chunk, small enough for the chunk to stay in cache through every pass over it
+        rows = max(1, self.max_bytes // (8 * max(length, 1)))
+        for start in range(0, paths, rows):
+            yield min(rows, paths - start)
+
+    def _daily_log_growth(self):
+        if self.equity is None:
+            raise ValueError('the daily equity of the run is needed for daily metrics')
+        return np.log(self.equity[1:] / self.equity[:-1])
+
+    def actual(self, daily=False):
+        # Metrics of the run itself, over its trades or over its daily equity like the block bootstrap
+        if daily:
+            metrics = _path_metrics(self.equity[0], self._daily_log_growth()[np.newaxis])
+        else:
+            metrics = _path_metrics(self.initial_balance, self.log_growth[np.newaxis].copy())
+        return pd.Series(metrics[0], index=RESAMPLE_COLUMNS)
+
+    def bootstrap(self, paths=10000):
+        # Paths of as many trades as the run drawn with replacement
+        trades = len(self.fractions)
+        return self._trade_paths(paths, lambda rows: self.log_growth[self.rng.integers(0, trades, (rows, trades))])
+
+    def shuffle(self, paths=10000):
+        # The trades of the run in random orders
+        return self._trade_paths(paths, lambda rows: self.rng.permuted(np.tile(self.log_growth, (rows, 1)), axis=1))
+
+    def _trade_paths(self, paths, draw):
+        if not len(self.fractions):
+            raise ValueError('the run has no closed trades to resample')
+        return self._frame([_path_metrics(self.initial_balance, draw(rows))
+                            for rows in self._chunks(paths, len(self.fractions))])
+
+    def block_bootstrap(self, paths=10000, block_size=20):
+        # Daily equity returns resampled in blocks of consecutive days, wrapping around the end, so paths keep the
+        # short term dependence of the returns. Loss streaks count losing days
+        log_growth = self._daily_log_growth()
+        days = len(log_growth)
+        blocks = -(-days // block_size)
+        offsets = np.arange(block_size)
+        results = []
+        for rows in self._chunks(paths, blocks * block_size):
+            days_drawn = (self.rng.integers(0, days, (rows, blocks, 1)) + offsets) % days
+            results.append(_path_metrics(self.equity[0], log_growth[days_drawn.reshape(rows, -1)[:, :days]]))
+        return self._frame(results)
+
+    @staticmethod
+    def _frame(results):
+        samples = pd.DataFrame(np.concatenate(results), columns=RESAMPLE_COLUMNS)
+        samples['Max Loss Streak'] = samples['Max Loss Streak'].astype(np.int64)
+        return samples
+
+    def intervals(self, samples, confidence=0.9, daily=False):
+        # Mean and the central confidence interval of each metric of the resamples next to the run's own value,
+        # daily for samples of block_bootstrap
+        tail = (1 - confidence) / 2 * 100
+        lower, median, upper = np.percentile(samples.to_numpy(dtype=float), [tail, 50, 100 - tail], axis=0)
+        actual = self.actual(daily)
+        return pd.DataFrame({'Metric': RESAMPLE_COLUMNS, 'Actual': actual.to_numpy(), 'Mean': samples.mean().to_numpy(),
+                             'Lower': lower, 'Median': median, 'Upper': upper}, columns=INTERVAL_COLUMNS)
@@ -0,0 +1,48 @@
+import numpy as np
+
+# Signals are stored as int8 codes rather than strings to keep signal arrays compact
+HOLD = 0
+BUY = 1
+SELL = -1
+
+SIGNAL_NAMES = {HOLD: 'Hold', BUY: 'Buy', SELL: 'Sell'}
+
+
+def bracket_signals(open_price, high_price, low_price, index, buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer):
+    open_price = np.asarray(open_price, dtype=float).tolist()
+    high_price = np.asarray(high_price, dtype=float).tolist()
+    low_price = np.asarray(low_price, dtype=float).tolist()
+    index = np.asarray(index, dtype=float).tolist()
+    stop_factor = loss_buffer * 0.01
+    target_factor = loss_buffer * 0.01 * risk_reward_ratio
+    open_buy = False
+    buy_tp = buy_sl = None
+    open_sell = False
+    sell_tp = sell_sl = None
+    signals = np.zeros(len(index), dtype=np.int8)
+
+    for i in range(len(index)):
+        high = high_price[i]
+        low = low_price[i]
+        # Check if any open buy/sell positions hit take profit or stop loss, allow the same signal again if so
+        if open_buy and (high >= buy_tp or low <= buy_sl):
+            open_buy = False
+        if open_sell and (low <= sell_tp or high >= sell_sl):
+            open_sell = False
+        # Buy criteria hit with no existing buy position, otherwise sell criteria hit with no existing sell position
+        if index[i] <= buy_threshold and not open_buy:
+            open_buy = True
+            buy_sl = open_price[i] * (1 - stop_factor)
+            buy_tp = open_price[i] * (1 + target_factor)
+            signals[i] = BUY
+        elif index[i] >= sell_threshold and not open_sell:
+            open_sell = True
+            sell_sl = open_price[i] * (1 + stop_factor)
+            sell_tp = open_price[i] * (1 - target_factor)
+            signals[i] = SELL
+        # Check if a newly opened position hit take profit or stop loss on the same day
+        if open_buy and (high >= buy_tp or low <= buy_sl):
+            open_buy = False
+        if open_sell and (low <= sell_tp or high >= sell_sl):
+            open_sell = False
+    return signals
@@ -0,0 +1,219 @@
+import copy
+import json
+
+import numpy as np
+import pandas as pd
+from .engine import NS_PER_DAY, bracket_buy_and_hold, bracket_equity, close_bracket_trade, round2
+from .ledger import STRATEGY2_FIELDS, TradeLedger
+from .report import strategy2_report
+from .signals import BUY, HOLD, SELL, SIGNAL_NAMES
+
+# Everything a stream needs to carry on from where it stopped, saved by checkpoint and loaded by restore
+CHECKPOINT_FIELDS = [
+    'initial_balance', 'buy_threshold', 'sell_threshold', 'risk_reward_ratio', 'loss_buffer', 'risk_per_trade',
+    'balance', 'open_buy', 'buy_tp', 'buy_sl', 'open_sell', 'sell_tp', 'sell_sl', 'trades', 'open_trades', 'dates',
+    'closes', 'first_open', 'last_bar', 'pending'
+]
+
+
+class BracketStream:
+    # Strategy 2 fed one bar at a time. Each bar runs the signal state of bracket_signals and the order handling of
+    # simulate_bracket_orders for a single day, visiting only the open positions. A batch backtest closes every position
+    # at the close of its last day instead, so the positions as they stood before the latest bar are kept aside
+    # and result() closes them at that bar's close, which gives exactly what Backtest.backtest() returns on the same history
+    def __init__(self, initial_balance, buy_threshold, sell_threshold, risk_reward_ratio=3, loss_buffer=3, risk_per_trade=1):
+        self.initial_balance = initial_balance
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+        self.risk_reward_ratio = risk_reward_ratio
+        self.loss_buffer = loss_buffer
+        self.risk_per_trade = risk_per_trade
+        self.balance = initial_balance
+        # Signal state, as in bracket_signals
+        self.open_buy = False
+        self.buy_tp = self.buy_sl = None
+        self.open_sell = False
+        self.sell_tp = self.sell_sl = None
+        # Trade records in ledger field order, open positions as [trade id, extreme price since the open]
+        self.trades = []
+        self.open_trades = []
+        self.dates = []
+        self.closes = []
+        self.first_open = None
+        self.last_bar = None
+        # Balance, trade count and open positions before the latest bar
+        self.pending = None
+
+    @property
+    def stop_factor(self):
+        return self.loss_buffer * 0.01
+
+    @property
+    def target_factor(self):
+        return self.loss_buffer * 0.01 * self.risk_reward_ratio
+
+    def replay(self, data):
+        dates = data.index.to_numpy().astype('datetime64[ns]').astype(np.int64).tolist()
+        columns = zip(dates, data['SPY Opening Price'].to_numpy(dtype=float).tolist(),
+                      data['SPY High Price'].to_numpy(dtype=float).tolist(),
+                      data['SPY Low Price'].to_numpy(dtype=float).tolist(),
+                      data['SPY Closing Price'].to_numpy(dtype=float).tolist(),
+                      data['Fear and Greed Index'].to_numpy(dtype=float).tolist())
+        for bar in columns:
+            self.update(*bar)
+        return self
+
+    def update(self, date, open_price, high_price, low_price, close_price, fear_and_greed):
+        # Feed the next day and return the signals and fills it produced
+        date = date if isinstance(date, int) else int(pd.Timestamp(date).as_unit('ns').value)
+        open_price, high_price, low_price, close_price = float(open_price), float(high_price), float(low_price), float(close_price)
+        index = len(self.dates)
+        self.dates.append(date)
+        self.closes.append(close_price)
+        if self.first_open is None:
+            self.first_open = open_price
+        self.pending = [self.balance, len(self.trades), [list(position) for position in self.open_trades]]
+        self.last_bar = [high_price, low_price, close_price]
+
+        signal = self._signal(open_price, high_price, low_price, float(fear_and_greed))
+        events = []
+        # Check closing positions first, then open any new position and close it on the same day if necessary
+        still_open = []
+        for position in self.open_trades:
+            self._extend(position, high_price, low_price)
+            if not self._exit(position, index, high_price, low_price, events):
+                still_open.append(position)
+        self.open_trades = still_open
+
+        if signal != HOLD:
+            trade_id = self._open(index, signal, open_price, events)
+            position = [trade_id, low_price if signal == BUY else high_price]
+            if not self._exit(position, index, high_price, low_price, events):
+                self.open_trades.append(position)
+        return events
+
+    def _signal(self, open_price, high_price, low_price, fear_and_greed):
+        signal = HOLD
+        if self.open_buy and (high_price >= self.buy_tp or low_price <= self.buy_sl):
+            self.open_buy = False
+        if self.open_sell and (low_price <= self.sell_tp or high_price >= self.sell_sl):
+            self.open_sell = False
+        if fear_and_greed <= self.buy_threshold and not self.open_buy:
+            self.open_buy = True
+            self.buy_sl = open_price * (1 - self.stop_factor)
+            self.buy_tp = open_price * (1 + self.target_factor)
+            signal = BUY
+        elif fear_and_greed >= self.sell_threshold and not self.open_sell:
+            self.open_sell = True
+            self.sell_sl = open_price * (1 + self.stop_factor)
+            self.sell_tp = open_price * (1 - self.target_factor)
+            signal = SELL
+        if self.open_buy and (high_price >= self.buy_tp or low_price <= self.buy_sl):
+            self.open_buy = False
+        if self.open_sell and (low_price <= self.sell_tp or high_price >= self.sell_sl):
+            self.open_sell = False
+        return signal
+
+    def _open(self, index, signal, price, events):
+        risk_amount = self.risk_per_trade * 0.01 * self.balance
+        if signal == BUY:
+            take_profit = price * (1 + self.target_factor)
+            stop_loss = price * (1 - self.stop_factor)
+            shares = risk_amount // (price - stop_loss)
+        else:
+            take_profit = price * (1 - self.target_factor)
+            stop_loss = price * (1 + self.stop_factor)
+            shares = risk_amount // (stop_loss - price)
+        trade = [index, signal, round2(price), shares, take_profit, stop_loss, self.balance,
+                 None, None, 0, 0, None, 0, 0]
+        self.trades.append(trade)
+        events.append({'Date': pd.Timestamp(self.dates[index]), 'Event': 'Open', 'Position': SIGNAL_NAMES[signal],
+                       'Price': trade[2], 'Shares': shares, 'Take Profit': take_profit, 'Stop Loss': stop_loss})
+        return len(self.trades) - 1
+
+    def _extend(self, position, high_price, low_price):
+        # Running extreme against the position since its open, NaN prices are skipped like PriceExtrema does
+        if self.trades[position[0]][1] == BUY:
+            position[1] = float(np.fmin(position[1], low_price))
+        else:
+            position[1] = float(np.fmax(position[1], high_price))
+
+    def _exit(self, position, index, high_price, low_price, events):
+        trade = self.trades[position[0]]
+        if trade[1] == BUY:
+            if high_price >= trade[4]:
+                price = trade[4]
+            elif low_price <= trade[5]:
+                price = trade[5]
+            else:
+                return False
+        else:
+            if low_price <= trade[4]:
+                price = trade[4]
+            elif high_price >= trade[5]:
+                price = trade[5]
+            else:
+                return False
+        self.balance += self._close(trade, position[1], index, price)
+        events.append({'Date': pd.Timestamp(self.dates[index]), 'Event': 'Close', 'Position': SIGNAL_NAMES[trade[1]],
+                       'Price': trade[8], 'Returns': trade[9]})
+        return True
+
+    def _close(self, trade, extreme_price, index, price):
+        duration = (self.dates[index] - self.dates[trade[0]]) // NS_PER_DAY
+        return close_bracket_trade(trade, index, price, extreme_price, duration)
+
+    def result(self):
+        # Trade records and final balance of a batch backtest over every bar fed so far
+        if self.pending is None:
+            return [], self.initial_balance
+        balance, count, open_trades = self.pending
+        high_price, low_price, close_price = self.last_bar
+        index = len(self.dates) - 1
+        records = [list(trade) for trade in self.trades[:count]]
+        for trade_id, extreme_price in open_trades:
+            trade = records[trade_id]
+            if trade[1] == BUY:
+                extreme_price = float(np.fmin(extreme_price, low_price))
+            else:
+                extreme_price = float(np.fmax(extreme_price, high_price))
+            balance += self._close(trade, extreme_price, index, close_price)
+        return records, np.float64(balance) if records else self.initial_balance
+
+    def ledger(self):
+        records, _ = self.result()
+        return TradeLedger.from_records(STRATEGY2_FIELDS, records)
+
+    def equity(self):
+        # Daily equity of the batch backtest over every bar fed so far
+        return bracket_equity(self.closes, self.initial_balance, self.ledger())
+
+    def report(self):
+        records, balance = self.result()
+        ledger = TradeLedger.from_records(STRATEGY2_FIELDS, records)
+        start_date, end_date = pd.Timestamp(self.dates[0]), pd.Timestamp(self.dates[-1])
+        return strategy2_report(start_date, end_date, self.initial_balance, balance,
+                                bracket_buy_and_hold(self.first_open, self.last_bar[2], self.initial_balance), ledger,
+                                np.array(self.dates, dtype='datetime64[ns]'),
+                                bracket_equity(self.closes, self.initial_balance, ledger))
+
+    def checkpoint(self):
+        # A copy, so the checkpoint stays as it was while the stream is fed more bars
+        return copy.deepcopy({field: getattr(self, field) for field in CHECKPOINT_FIELDS})
+
+    @classmethod
+    def restore(cls, state):
+        stream = cls(state['initial_balance'], state['buy_threshold'], state['sell_threshold'],
+                     state['risk_reward_ratio'], state['loss_buffer'], state['risk_per_trade'])
+        for field in CHECKPOINT_FIELDS:
+            setattr(stream, field, copy.deepcopy(state[field]))
+        return stream
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.checkpoint(), file)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.restore(json.load(file))
@@ -0,0 +1,131 @@
+import math
+import os
+import time
+from itertools import product
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from .grid import STRATEGY2_PARAMETERS, MarketArrays, strategy2_rows
+from .profiling import Profiler
+from .report import STRATEGY2_REPORT_COLUMNS
+from .results import frame_version, result_key
+
+PRICE_COLUMNS = ('SPY Opening Price', 'SPY High Price', 'SPY Low Price', 'SPY Closing Price', 'Fear and Greed Index')
+
+# Market data attached once per worker process by the pool initializer
+_worker_memory = None
+_worker_market = None
+
+
+class SharedMarketData:
+    # Dates followed by the price and index columns in one shared memory block, laid out as 8-byte columns
+    def __init__(self, data):
+        self.length = len(data)
+        self.date_dtype = data.index.to_numpy().dtype.str
+        self.memory = SharedMemory(create=True, size=max(1, (len(PRICE_COLUMNS) + 1) * self.length * 8))
+        dates, prices = self.views(self.memory, self.length, self.date_dtype)
+        dates[:] = data.index.to_numpy()
+        for row, column in enumerate(PRICE_COLUMNS):
+            prices[row] = data[column].to_numpy(dtype=float)
+
+    @staticmethod
+    def views(memory, length, date_dtype):
+        dates = np.ndarray((length,), dtype=date_dtype, buffer=memory.buf)
+        prices = np.ndarray((len(PRICE_COLUMNS), length), dtype=np.float64, buffer=memory.buf, offset=length * 8)
+        return dates, prices
+
+    @staticmethod
+    def market(memory, length, date_dtype):
+        # Only the date index is copied into the process, the price and index columns are views into shared memory
+        dates, prices = SharedMarketData.views(memory, length, date_dtype)
+        return MarketArrays(dates.copy(), *prices)
+
+    def close(self):
+        self.memory.close()
+        self.memory.unlink()
+
+
+def _attach(name, length, date_dtype):
+    global _worker_memory, _worker_market
+    _worker_memory = SharedMemory(name=name)
+    _worker_market = SharedMarketData.market(_worker_memory, length, date_dtype)
+
+
+def _run_batch(task):
+    batch_id, batch, initial_balance, risk_per_trades, buy_and_hold_returns, profile = task
+    start = time.perf_counter()
+    profiler = Profiler() if profile else None
+    rows = []
+    for params in batch:
+        for row in strategy2_rows(_worker_market, initial_balance, *params, risk_per_trades, buy_and_hold_returns, profiler):
+            rows.append(tuple(row.values()))
+    return batch_id, rows, os.getpid(), time.perf_counter() - start, profiler
+
+
+class Sweep:
+    def __init__(self, data, initial_balance, processes=None, chunk_size=None, profiler=None):
+        self.data = data
+        self.profiler = profiler # phase timings of every worker are merged into it
+        self.initial_balance = initial_balance
+        self.processes = processes or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.columns = STRATEGY2_PARAMETERS + STRATEGY2_REPORT_COLUMNS
+        self.worker_stats = {}
+
+    def iter_strategy2(self, buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades):
+        # Yields (batch id, rows) as soon as each batch finishes, rows are tuples in the order of self.columns
+        units = list(product(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers))
+        return self._iter_units(units, list(risk_per_trades))
+
+    def _iter_units(self, units, risk_per_trades):
+        chunk_size = self.chunk_size or max(1, math.ceil(len(units) / (self.processes * 8)))
+        batches = [units[start:start + chunk_size] for start in range(0, len(units), chunk_size)]
+        self.worker_stats = {}
+        buy_and_hold_returns = MarketArrays.from_frame(self.data).strategy2_buy_and_hold(self.initial_balance)
+
+        shared = SharedMarketData(self.data)
+        try:
+            tasks = [(batch_id, batch, self.initial_balance, risk_per_trades, buy_and_hold_returns, self.profiler is not None)
+                     for batch_id, batch in enumerate(batches)]
+            initargs = (shared.memory.name, shared.length, shared.date_dtype)
+            with get_context().Pool(self.processes, initializer=_attach, initargs=initargs) as pool:
+                for batch_id, rows, pid, elapsed, profiler in pool.imap_unordered(_run_batch, tasks):
+                    if profiler is not None:
+                        self.profiler.merge(profiler)
+                    stats = self.worker_stats.setdefault(pid, [0, 0, 0.0])
+                    stats[0] += 1
+                    stats[1] += len(rows)
+                    stats[2] += elapsed
+                    yield batch_id, rows
+        finally:
+            shared.close()
+
+    def strategy2(self, buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades):
+        batches = dict(self.iter_strategy2(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades))
+        rows = [row for batch_id in sorted(batches) for row in batches[batch_id]]
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def store_strategy2(self, store, buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades,
+                        version=None):
+        # Appends every batch to a ResultStore as it finishes, skipping combinations already stored for this dataset
+        # version (e.g. DatasetStore.version, a hash of the frame by default). Returns the number of rows added
+        version = frame_version(self.data) if version is None else version
+        risk_per_trades = list(risk_per_trades)
+        stored = store.keys(version)
+        units = [unit for unit in product(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers)
+                 if any(result_key(version, self.initial_balance, unit + (risk_per_trade,)) not in stored
+                        for risk_per_trade in risk_per_trades)]
+        if not units:
+            return 0
+        return sum(store.append(version, self.initial_balance, rows) for _, rows in self._iter_units(units, risk_per_trades))
+
+    def throughput(self):
+        records = [{'Worker': pid,
+                    'Batches': batches,
+                    'Combinations': combinations,
+                    'Busy Time (s)': round(busy, 3),
+                    'Combinations Per Second': round(combinations / busy, 1) if busy else 0}
+                   for pid, (batches, combinations, busy) in sorted(self.worker_stats.items())]
+        return pd.DataFrame(records)
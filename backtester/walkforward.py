@@ -0,0 +1,170 @@
+import math
+import os
+from itertools import groupby
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from .engine import bracket_buy_and_hold, bracket_equity, bracket_schedule, size_bracket_schedule
+from .grid import STRATEGY2_PARAMETERS, MarketArrays, strategy2_balances
+from .ledger import STRATEGY2_FIELDS, TradeLedger
+from .optimize import grid_candidates
+from .profiling import Profiler, timed
+from .report import strategy2_report
+from .signals import bracket_signals
+from .sweep import SharedMarketData
+
+WINDOW_COLUMNS = ['Train Start', 'Train End', 'Test Start', 'Test End'] + STRATEGY2_PARAMETERS + [
+    'In-Sample Performance vs Buy and Hold (%)', 'Out-of-Sample Trades', 'Out-of-Sample Returns (%)',
+    'Out-of-Sample Performance vs Buy and Hold (%)']
+
+# Market data and candidates attached once per worker process by the pool initializer
+_worker_memory = None
+_worker_market = None
+_worker_candidates = None
+
+
+def walk_forward_windows(dates, train_months, test_months, anchored=False):
+    # (train start, test start, test stop) day positions, training on [train start, test start) and testing on
+    # [test start, test stop). Test windows follow each other to the end of the data, the last one may be shorter.
+    # Rolling windows move the training start along with the test window, anchored ones train from the first day
+    dates = pd.DatetimeIndex(dates)
+    first = dates[0]
+    windows = []
+    step = 0
+    while True:
+        test_start = int(dates.searchsorted(first + pd.DateOffset(months=train_months + step * test_months)))
+        test_stop = int(dates.searchsorted(first + pd.DateOffset(months=train_months + (step + 1) * test_months)))
+        if len(dates) - test_start < 2:
+            return windows
+        train_start = 0 if anchored else int(dates.searchsorted(first + pd.DateOffset(months=step * test_months)))
+        windows.append((train_start, test_start, test_stop))
+        step += 1
+
+
+def window_balances(market, initial_balance, candidates, windows, anchored, profiler=None):
+    # Final balance of each candidate on each training window, one row per window. Anchored windows are prefixes of
+    # the history, so each group of candidates sharing signals is scheduled once over the longest one
+    if anchored:
+        return strategy2_balances(market, initial_balance, candidates, [test_start for _, test_start, _ in windows],
+                                  profiler)
+    return np.array([strategy2_balances(market.window(train_start, test_start), initial_balance, candidates,
+                                        profiler=profiler) for train_start, test_start, _ in windows])
+
+
+def _attach(name, length, date_dtype, candidates):
+    global _worker_memory, _worker_market, _worker_candidates
+    _worker_memory = SharedMemory(name=name)
+    _worker_market = SharedMarketData.market(_worker_memory, length, date_dtype)
+    _worker_candidates = candidates
+
+
+def _run_task(task):
+    windows, positions, initial_balance, anchored, profile = task
+    profiler = Profiler() if profile else None
+    candidates = [_worker_candidates[position] for position in positions]
+    return task, window_balances(_worker_market, initial_balance, candidates, windows, anchored, profiler), profiler
+
+
+class WalkForward:
+    # Strategy 2 fitted on each training window by an exhaustive grid and traded on the test window after it with the
+    # best parameters. Every window is a view into the same price and index arrays and reuses the range queries of
+    # the whole history. Training runs in parallel worker processes sharing the market data, test windows run
+    # one after the other so each starts with the balance the previous one ended with and the out-of-sample trades,
+    # equity and report are stitched over the whole tested period
+    def __init__(self, data, initial_balance, train_months=36, test_months=12, anchored=False, processes=None,
+                 profiler=None):
+        self.data = data
+        self.market = MarketArrays.from_frame(data)
+        self.initial_balance = initial_balance
+        self.anchored = anchored
+        self.windows = walk_forward_windows(self.market.dates, train_months, test_months, anchored)
+        self.processes = processes or os.cpu_count()
+        self.profiler = profiler
+        self.results = None # one row per window, see WINDOW_COLUMNS
+        self.ledger = None
+        self.balance = initial_balance
+        self.equity = None
+        self.report = None
+
+    def _tasks(self, candidates):
+        # Rolling windows are split between workers, anchored ones share their schedules so the candidates are split
+        # instead, without splitting a group that shares signals
+        profile = self.profiler is not None
+        if not self.anchored:
+            return [([window], list(range(len(candidates))), self.initial_balance, False, profile) for window in self.windows]
+        order = sorted(range(len(candidates)), key=lambda position: candidates[position][:4])
+        groups = [list(positions) for _, positions in groupby(order, key=lambda position: candidates[position][:4])]
+        chunk_size = max(1, math.ceil(len(groups) / (self.processes * 4)))
+        return [(self.windows, [position for group in groups[start:start + chunk_size] for position in group],
+                 self.initial_balance, True, profile) for start in range(0, len(groups), chunk_size)]
+
+    def optimize(self, candidates):
+        # Index into candidates of the best one and its in-sample performance vs buy and hold, per window. The best is
+        # the highest final balance, the first one on a tie like a stable sort of the grid
+        balances = np.empty((len(self.windows), len(candidates)))
+        if self.processes == 1:
+            balances[:] = window_balances(self.market, self.initial_balance, candidates, self.windows, self.anchored,
+                                          self.profiler)
+        else:
+            tasks = self._tasks(candidates)
+            shared = SharedMarketData(self.data)
+            try:
+                initargs = (shared.memory.name, shared.length, shared.date_dtype, candidates)
+                with get_context().Pool(min(self.processes, len(tasks)), initializer=_attach, initargs=initargs) as pool:
+                    for (windows, positions, *_), task_balances, profiler in pool.imap_unordered(_run_task, tasks):
+                        if profiler is not None:
+                            self.profiler.merge(profiler)
+                        rows = [self.windows.index(window) for window in windows]
+                        balances[np.ix_(rows, positions)] = task_balances
+            finally:
+                shared.close()
+
+        best = []
+        for (train_start, test_start, _), window in zip(self.windows, balances):
+            index = int(np.argmax(window))
+            base = bracket_buy_and_hold(self.market.open_price[train_start], self.market.close_price[test_start - 1],
+                                        self.initial_balance) + self.initial_balance
+            best.append((index, round((window[index] - base) / base * 100, 2)))
+        return best
+
+    def _test(self, market, params, balance):
+        bars = len(market.open_price)
+        signals = timed(self.profiler, 'Signals', bracket_signals, market.open_price, market.high_price, market.low_price,
+                        market.index, *params[:4], bars=bars)
+        schedule = timed(self.profiler, 'Schedule', bracket_schedule, market.dates, market.open_price, market.high_price,
+                         market.low_price, market.close_price, signals, params[2], params[3], market.extrema, bars=bars)
+        return timed(self.profiler, 'Sizing', size_bracket_schedule, schedule, balance, params[4])
+
+    def run(self, buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades):
+        candidates = grid_candidates(buy_thresholds, sell_thresholds, risk_reward_ratios, loss_buffers, risk_per_trades)
+        best = self.optimize(candidates)
+        tested_start = self.windows[0][1]
+        balance = self.initial_balance
+        records = []
+        rows = []
+        for (train_start, test_start, test_stop), (index, performance) in zip(self.windows, best):
+            params = candidates[index]
+            market = self.market.window(test_start, test_stop)
+            window_records, window_balance = self._test(market, params, balance)
+            for record in window_records: # day positions relative to the start of the tested period
+                record[0] += test_start - tested_start
+                record[7] += test_start - tested_start
+            records.extend(window_records)
+            base = bracket_buy_and_hold(market.open_price[0], market.close_price[-1], balance) + balance
+            rows.append([self.market.dates[train_start], self.market.dates[test_start - 1], market.start_date,
+                         market.end_date, *params, performance, len(window_records),
+                         round((window_balance - balance) / balance * 100, 2), round((window_balance - base) / base * 100, 2)])
+            balance = window_balance
+
+        tested = self.market.window(tested_start, len(self.market.open_price))
+        self.results = pd.DataFrame(rows, columns=WINDOW_COLUMNS)
+        self.ledger = TradeLedger.from_records(STRATEGY2_FIELDS, records)
+        self.balance = np.float64(balance) if records else balance
+        equity = bracket_equity(tested.close_price, self.initial_balance, self.ledger)
+        self.equity = pd.Series(equity, index=tested.dates, name='Equity')
+        self.report = strategy2_report(tested.start_date, tested.end_date, self.initial_balance, self.balance,
+                                       tested.strategy2_buy_and_hold(self.initial_balance), self.ledger,
+                                       tested.nanoseconds, equity)
+        return self
@@ -0,0 +1,39 @@
+# Times ChunkedBacktest on synthetic minute bars kept in a DatasetStore, up to ten million bars, and traces the peak
+# memory it allocates, which grows with the trades and days of the history rather than its bars. Backtest2 runs on
+# the same bars loaded in memory for comparison. Run from the repository root with
+# `python benchmarks/bench_chunked.py`
+import tempfile
+import time
+import tracemalloc
+
+from common import synthetic_market_data
+from backtester import Backtest2, ChunkedBacktest, DatasetStore
+
+PARAMS = (100000, 20, 80, 3, 0.5, 1)
+
+
+def main():
+    for bars in [10 ** 6, 4 * 10 ** 6, 10 ** 7]:
+        data = synthetic_market_data(bars).drop(columns=['Sentiment'])
+        with tempfile.TemporaryDirectory() as directory:
+            store = DatasetStore(directory).write(data)
+            if bars == 10 ** 6:
+                start = time.perf_counter()
+                Backtest2(data, *PARAMS).backtest()
+                print(f"{bars:>9} bars Backtest2 in memory: {time.perf_counter() - start:6.2f} s")
+            del data
+
+            start = time.perf_counter()
+            backtest = ChunkedBacktest(store, *PARAMS).backtest()
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            ChunkedBacktest(store, *PARAMS).backtest()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{bars:>9} bars ChunkedBacktest: {elapsed:6.2f} s, {bars / elapsed / 1e6:5.1f}M bars/s, "
+                  f"peak {peak / 2 ** 20:6.1f} MiB, {len(backtest.ledger)} trades, "
+                  f"{len(backtest.equity)} days")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+# Times the daily job (latest score for the alert and the updated dataset backfilled to a fixed end date) against a
+# local fake graphdata endpoint with 50 ms of latency per response: a cold cache, a warm one within the TTL and a warm
+# one past it where every request is conditional, with the bytes each one downloads. Run from the repository root with
+# `python benchmarks/bench_cnnfetch.py`
+import asyncio
+import json
+import tempfile
+import threading
+import time
+
+import pandas as pd
+from aiohttp import web
+
+from common import ROOT
+from backtester.cnnfetch import CNNFetcher, missing_ranges
+from backtester.dataset import load_updated
+
+UPDATED_PATH = ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json'
+END = pd.Timestamp('2024-12-31')
+LATENCY = 0.05
+PORT = 8765
+served = {'bytes': 0}
+
+
+async def graphdata(request):
+    await asyncio.sleep(LATENCY)
+    key = request.match_info.get('date', 'latest')
+    etag = f'"{key}"'
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers={'ETag': etag})
+    if key == 'latest':
+        body = UPDATED_PATH.read_bytes()
+    else:
+        data = [{'x': day.value / 10 ** 6, 'y': 50.0, 'rating': 'neutral'} for day in pd.bdate_range(key, END)]
+        body = json.dumps({'fear_and_greed_historical': {'data': data}}).encode()
+        served['bytes'] += len(body)
+    return web.Response(body=body, headers={'ETag': etag, 'Content-Type': 'application/json'})
+
+
+def serve(ready):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    app = web.Application()
+    app.router.add_get('/graphdata/', graphdata)
+    app.router.add_get('/graphdata/{date}', graphdata)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', PORT).start())
+    ready.set()
+    loop.run_forever()
+
+
+def daily_job(fetcher, ranges):
+    start = time.perf_counter()
+    fetcher.current()
+    scores = fetcher.backfill(ranges)
+    return time.perf_counter() - start, len(scores)
+
+
+def main():
+    ready = threading.Event()
+    threading.Thread(target=serve, args=(ready,), daemon=True).start()
+    ready.wait()
+    url = f'http://127.0.0.1:{PORT}/graphdata/'
+    ranges = missing_ranges(load_updated(UPDATED_PATH)['Date'], END)
+    with tempfile.TemporaryDirectory() as directory:
+        for label, ttl in [('cold', 6 * 3600), ('warm', 6 * 3600), ('past ttl', 0)]:
+            fetcher = CNNFetcher(directory, url, ttl=ttl)
+            served['bytes'] = 0
+            elapsed, days = daily_job(fetcher, ranges)
+            print(f"{label:<8}: {elapsed * 1000:8.1f} ms, {fetcher.requests:>2} requests, "
+                  f"{served['bytes'] / 1024:7.1f} KiB of history, {days} days backfilled")
+
+
+if __name__ == '__main__':
+    main()
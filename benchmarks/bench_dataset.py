@@ -0,0 +1,64 @@
+# Compares the notebook's row-by-row ingest of the CNN JSON against the typed column loader, and building the merged
+# frame from the source files against loading it from the columnar dataset store,
+# run from the repository root with `python benchmarks/bench_dataset.py`
+import json
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from common import ROOT, load_market_data
+from backtester.cnn import read_payload
+from backtester.dataset import DatasetStore, load_historical, load_updated, merge_datasets
+
+HISTORICAL = ROOT / 'datasets' / 'fear_and_greed_data_01Mar11_18Sep20.csv'
+UPDATED = ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json'
+
+
+def legacy_load_updated(path):
+    with open(path) as json_file:
+        data = json.load(json_file)
+    df_updated = pd.DataFrame(data['fear_and_greed_historical']['data'])
+    df_updated.rename(columns={'x': 'Date', 'y': 'Fear and Greed Index'}, inplace=True)
+    df_updated['Date'] = df_updated['Date'].astype(int)
+    df_updated['Date'] = df_updated['Date'].apply(lambda x: datetime.fromtimestamp(x/1000).strftime('%Y-%m-%d'))
+    df_updated = df_updated[df_updated['Date'] >= '2020-08-03']
+    df_updated["Fear and Greed Index"] = df_updated["Fear and Greed Index"].apply(lambda x: round(x))
+    return df_updated
+
+
+def main():
+    spy = load_market_data()[['SPY Opening Price', 'SPY High Price', 'SPY Low Price', 'SPY Closing Price']].reset_index()
+    repeats = 20
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        legacy_load_updated(UPDATED)
+    legacy_time = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        payload = read_payload(UPDATED)
+    payload_time = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        data = merge_datasets(load_historical(HISTORICAL), load_updated(UPDATED), spy, end='2024-08-01')
+    build_time = (time.perf_counter() - start) / repeats
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = DatasetStore(directory).write(data)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            loaded = store.load()
+        load_time = (time.perf_counter() - start) / repeats
+
+    print(f"CNN JSON, notebook ingest of the score series: {legacy_time * 1000:.1f} ms")
+    print(f"CNN JSON, typed columns for all {len(payload.series)} series: {payload_time * 1000:.1f} ms")
+    print(f"Rows: {len(loaded)}")
+    print(f"Build from sources (without the SPY download): {build_time * 1000:.1f} ms")
+    print(f"Load from dataset store: {load_time * 1000:.2f} ms ({build_time / load_time:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+# Times single backtests, signals to report, on each engine for both strategies, run from the repository root with
+# `python benchmarks/bench_engines.py`. Parity of the engines is tested in tests/test_compiled_parity.py
+import time
+
+from common import load_market_data
+from backtester import Backtest1, Backtest2, compiled
+
+
+def time_backtest(cls, data, params, engine, repeats=50):
+    cls(data, 100000, *params, engine=engine).backtest() # compiles the kernels on the first call
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cls(data, 100000, *params, engine=engine).backtest()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    data = load_market_data()
+    print(f"Rows: {len(data)}, Numba available: {compiled.NUMBA_AVAILABLE}")
+
+    engines = ['numpy', 'numba'] if compiled.NUMBA_AVAILABLE else ['numpy']
+    for cls, params in [(Backtest1, (5, 95)), (Backtest2, (30, 100, 8, 4, 5)), (Backtest2, (35, 75, 2, 1, 3))]:
+        timings = ', '.join(f"{engine} {time_backtest(cls, data, params, engine) * 1000:.3f} ms" for engine in engines)
+        print(f"{cls.__module__.split('.')[-1]} {params}: {timings}")
+
+
+if __name__ == '__main__':
+    main()
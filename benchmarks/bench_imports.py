@@ -0,0 +1,48 @@
+# Measures what a fresh worker process pays to import the backtester: wall time, peak RSS and whether matplotlib
+# got loaded, against the same import with matplotlib.pyplot loaded up front as the strategy modules used to do,
+# run from the repository root with `python benchmarks/bench_imports.py`
+import json
+import statistics
+import subprocess
+import sys
+
+from common import ROOT
+
+# Each case runs in its own interpreter, the child reports its own import time and peak RSS
+CHILD = """
+import json, resource, sys, time
+start = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'max_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  'matplotlib': 'matplotlib' in sys.modules, 'modules': len(sys.modules)}}))
+"""
+
+CASES = [
+    ('numpy and pandas only', 'import numpy, pandas'),
+    ('from backtester import Backtest2', 'from backtester import Backtest2'),
+    ('from backtester import Backtest1, Backtest2, Sweep', 'from backtester import Backtest1, Backtest2, Sweep'),
+    ('Backtest2 with matplotlib.pyplot (previous layout)', 'import matplotlib.pyplot\nfrom backtester import Backtest2'),
+]
+
+
+def measure(imports, repeats):
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', CHILD.format(imports=imports)], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        runs.append(json.loads(output))
+    return runs
+
+
+def main():
+    repeats = 5
+    for name, imports in CASES:
+        runs = measure(imports, repeats)
+        print(f"{name:<52} {statistics.median(run['seconds'] for run in runs) * 1000:8.1f} ms "
+              f"{statistics.median(run['max_rss_kib'] for run in runs) / 1024:8.1f} MiB RSS "
+              f"{runs[0]['modules']:5} modules, matplotlib {'loaded' if runs[0]['matplotlib'] else 'not loaded'}")
+
+
+if __name__ == '__main__':
+    main()
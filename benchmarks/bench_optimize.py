@@ -0,0 +1,45 @@
+# Compares the successive halving search with the exhaustive strategy 2 grid of the notebook: how many of the grid's
+# best combinations it finds and what share of the grid's backtested bars it needs, run from the repository root
+# with `python benchmarks/bench_optimize.py`
+import time
+import warnings
+
+from common import load_market_data
+from backtester.grid import STRATEGY2_PARAMETERS, strategy2_grid
+from backtester.optimize import SuccessiveHalving, grid_candidates, sample_candidates
+
+grid = ([5, 10, 15, 20, 25, 30, 35], [75, 80, 85, 90, 95, 100], [1, 2, 3, 4, 5, 6, 8, 10], [1, 2, 3, 4, 5], [1, 2, 3, 4, 5])
+
+
+def best(results, count):
+    return [tuple(row) for row in results[STRATEGY2_PARAMETERS].head(count).itertuples(index=False)]
+
+
+def main():
+    warnings.simplefilter('ignore', RuntimeWarning) # short prefixes can give empty means
+    for seed in range(3):
+        data = load_market_data(seed)
+        start = time.perf_counter()
+        full = strategy2_grid(data, 100000, *grid)
+        grid_seconds = time.perf_counter() - start
+        full = full.sort_values('Performance vs Buy and Hold (%)', ascending=False, kind='stable', ignore_index=True)
+
+        for eta, min_fraction in [(3, 1 / 3), (2, 1 / 4), (3, 1 / 9)]:
+            search = SuccessiveHalving(data, 100000, eta=eta, min_fraction=min_fraction)
+            start = time.perf_counter()
+            results = search.run(grid_candidates(*grid))
+            seconds = time.perf_counter() - start
+            found = len(set(best(full, 5)) & set(best(results, 5)))
+            print(f"seed {seed} eta {eta} windows {search.windows}: top 5 found {found}/5, best found "
+                  f"{best(full, 1) == best(results, 1)}, {search.bars_evaluated / (len(full) * len(data)) * 100:.0f}% of "
+                  f"the grid's bars, {seconds:.2f} s vs {grid_seconds:.2f} s")
+
+    # Continuous ranges, the grid cannot cover them
+    search = SuccessiveHalving(load_market_data(0), 100000)
+    results = search.run(sample_candidates([(5, 35), (75, 100), (1, 10), (1, 5), [1, 2, 3, 4, 5]], 2000))
+    print(search.rung_table().to_string(index=False))
+    print(results[STRATEGY2_PARAMETERS + ['Performance vs Buy and Hold (%)']].head(5).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+# Times the portfolio engine on random universes of up to 500 instruments over 15 years of daily bars, against running
+# Backtest2 once per instrument with its own balance. The portfolio pays a fixed cost per bar, so it only wins once the
+# universe is large. Run from the repository root with
+# `python benchmarks/bench_portfolio.py`
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import synthetic_market_data
+from backtester import Backtest2, Portfolio, Profiler
+
+BARS = 3780
+PARAMS = (40, 60, 3, 2)
+
+
+def universe(instruments, seed=0):
+    # Independent random walks, each listing on a random day in the first five years
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, (BARS, instruments)), axis=0))
+    open_ = close * np.exp(rng.normal(0, 0.004, (BARS, instruments)))
+    high = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.006, (BARS, instruments))))
+    low = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.006, (BARS, instruments))))
+    listed = np.arange(BARS)[:, None] >= rng.integers(0, 1260, instruments)
+    return [np.where(listed, prices, np.nan) for prices in (open_, high, low, close)]
+
+
+def main():
+    market = synthetic_market_data(BARS)
+    prices = universe(500)
+    for instruments in [1, 50, 500]:
+        arrays = [array[:, :instruments] for array in prices]
+        for allocation in ['per_trade', 'split']:
+            profiler = Profiler()
+            start = time.perf_counter()
+            portfolio = Portfolio(market.index, *arrays, market['Fear and Greed Index'], 1000000, *PARAMS,
+                                  risk_per_trade=0.5, allocation=allocation, profiler=profiler).backtest()
+            elapsed = time.perf_counter() - start
+            print(f"{instruments:>3} instruments {allocation:<9}: {elapsed * 1000:7.1f} ms, {len(portfolio.ledger):>6} trades, "
+                  f"Sharpe Ratio {portfolio.report['Sharpe Ratio']}")
+    print(profiler.table().to_string(index=False))
+
+    start = time.perf_counter()
+    for instrument in range(500):
+        listed = np.isfinite(prices[0][:, instrument])
+        data = pd.DataFrame({'Fear and Greed Index': market['Fear and Greed Index'].to_numpy()[listed],
+                             'SPY Opening Price': prices[0][listed, instrument], 'SPY High Price': prices[1][listed, instrument],
+                             'SPY Low Price': prices[2][listed, instrument], 'SPY Closing Price': prices[3][listed, instrument]},
+                            index=market.index[listed])
+        Backtest2(data, 1000000, *PARAMS, 0.5).backtest()
+    print(f"500 Backtest2 runs one instrument at a time: {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
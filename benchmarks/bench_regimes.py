@@ -0,0 +1,39 @@
+# Times the notebook's sentiment duration loop against SentimentRegimes on the real history, then the run-length
+# encoding of synthetic histories up to ten million minute bars and appending one more bar to them. Both give the
+# same durations, see tests/test_regimes.py. Run from the repository root with `python benchmarks/bench_regimes.py`
+import time
+
+import pandas as pd
+
+from common import load_market_data, notebook_durations, synthetic_market_data
+from backtester.regimes import SentimentRegimes, sentiment
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    data = load_market_data()
+    data['Sentiment'] = sentiment(data['Fear and Greed Index'])
+    _, loop = timed(notebook_durations, data)
+    durations, vectorised = timed(lambda: SentimentRegimes.from_frame(data).durations())
+    print(f"notebook loop {loop * 1000:8.1f} ms, SentimentRegimes {vectorised * 1000:6.2f} ms on {len(data)} days")
+    print(durations.to_string(index=False))
+
+    for bars in [10 ** 5, 10 ** 6, 10 ** 7]:
+        data = synthetic_market_data(bars)
+        for combined in [False, True]:
+            regimes, elapsed = timed(SentimentRegimes.from_frame, data, combined)
+            _, frame = timed(regimes.frame)
+            regimes.append([data.index[-1] + pd.Timedelta(minutes=1)], [50], [data['SPY Closing Price'].iloc[-1]])
+            _, append = timed(regimes.append, [data.index[-1] + pd.Timedelta(minutes=2)], [50],
+                              [data['SPY Closing Price'].iloc[-1]])
+            print(f"{bars:>9} bars {'combined' if combined else 'sentiment':<9}: encode {elapsed * 1000:7.1f} ms, "
+                  f"frame {frame * 1000:6.1f} ms, append one bar {append * 1000:6.3f} ms, {len(regimes)} runs")
+
+
+if __name__ == '__main__':
+    main()
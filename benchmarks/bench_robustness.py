@@ -0,0 +1,39 @@
+# Times bootstrap, shuffle and block bootstrap resamples of trade ledgers of growing size with the peak memory they
+# take, which stays bounded by the chunk size however many paths are drawn, run from the repository root with
+# `python benchmarks/bench_robustness.py`
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import load_market_data
+from backtester import Backtest2
+from backtester.robustness import MonteCarlo
+
+
+def measure(function, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    backtest = Backtest2(load_market_data(), 100000, 25, 100, 10, 2, 5).backtest()
+    monte_carlo = MonteCarlo.from_backtest(backtest)
+    print(monte_carlo.intervals(monte_carlo.bootstrap(10000)).to_string(index=False))
+    print(monte_carlo.intervals(monte_carlo.block_bootstrap(10000), daily=True).to_string(index=False))
+
+    rng = np.random.default_rng(0)
+    for trades in [100, 1000, 5000]:
+        monte_carlo = MonteCarlo(100000, rng.normal(0.002, 0.02, trades), 100000 * np.cumprod(1 + rng.normal(0.0004, 0.01, trades)))
+        for method in ['bootstrap', 'shuffle', 'block_bootstrap']:
+            elapsed, peak = measure(getattr(monte_carlo, method), 100000)
+            print(f"{method:<16} 100000 paths x {trades:>5} steps: {elapsed:6.2f} s, peak {peak:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
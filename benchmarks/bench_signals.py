@@ -0,0 +1,52 @@
+# Compares the legacy row-by-row strategy 1 signal loop against the array signal engine and the crossing index
+# on the 2011-2024 Fear and Greed history, run from the repository root with `python benchmarks/bench_signals.py`.
+# Their parity is tested in tests/test_signals.py
+import time
+
+import numpy as np
+
+from common import legacy_generate_signal, load_fear_and_greed, threshold_signals
+from backtester.rangequery import CrossingIndex
+
+
+def main():
+    data = load_fear_and_greed()
+    thresholds = [(buy_threshold, sell_threshold) for buy_threshold in range(5, 36) for sell_threshold in range(65, 96)]
+    legacy_sample = thresholds[::60]
+    print(f"Rows: {len(data)}, threshold combinations: {len(thresholds)}")
+
+    start = time.perf_counter()
+    for params in legacy_sample:
+        legacy_generate_signal(data, *params)
+    legacy_time = (time.perf_counter() - start) / len(legacy_sample)
+
+    start = time.perf_counter()
+    index = data['Fear and Greed Index'].to_numpy()
+    for params in thresholds:
+        threshold_signals(index, *params)
+    array_time = (time.perf_counter() - start) / len(thresholds)
+
+    print(f"Legacy loop: {legacy_time * 1000:.3f} ms per combination "
+          f"({legacy_time * len(thresholds):.2f} s for the full sweep)")
+    print(f"Array engine: {array_time * 1000:.3f} ms per combination "
+          f"({array_time * len(thresholds):.4f} s for the full sweep)")
+    print(f"Speedup: {legacy_time / array_time:.0f}x")
+
+    # The crossing index only visits signal days, so its cost per combination stays flat as bars get finer
+    for bars_per_day in [1, 30, 300]:
+        history = np.repeat(index, bars_per_day)
+        start = time.perf_counter()
+        for params in thresholds[::10]:
+            np.flatnonzero(threshold_signals(history, *params))
+        scan_time = (time.perf_counter() - start) / len(thresholds[::10])
+        start = time.perf_counter()
+        crossings = CrossingIndex(history)
+        for params in thresholds:
+            crossings.events(*params)
+        crossing_time = (time.perf_counter() - start) / len(thresholds)
+        print(f"{len(history)} bars: array engine {scan_time * 1000:.3f} ms, "
+              f"crossing index {crossing_time * 1000:.3f} ms per combination (including building the index)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# Times Backtest2 over the strategy 2 parameter grid from the notebook,
+# run from the repository root with `python benchmarks/bench_strategy2.py`
+import time
+from itertools import product
+
+from common import load_market_data
+from backtester import Backtest2, strategy2_grid
+
+buy_threshold = [5, 10, 15, 20, 25, 30, 35]
+sell_threshold = [75, 80, 85, 90, 95, 100]
+risk_reward_ratio = [1, 2, 3, 4, 5, 6, 8, 10]
+loss_buffer = [1, 2, 3, 4, 5]
+risk_per_trade = [1, 2, 3, 4, 5]
+
+
+def main():
+    data = load_market_data()
+    all_params = list(product(buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer, risk_per_trade))
+    sample = all_params[::40]
+    print(f"Rows: {len(data)}, parameter combinations: {len(all_params)}")
+
+    start = time.perf_counter()
+    for params in sample:
+        Backtest2(data, 100000, *params).backtest()
+    elapsed = (time.perf_counter() - start) / len(sample)
+
+    print(f"Backtest2: {elapsed * 1000:.2f} ms per combination ({elapsed * len(all_params):.1f} s for the full grid)")
+
+    start = time.perf_counter()
+    results = strategy2_grid(data, 100000, buy_threshold, sell_threshold, risk_reward_ratio, loss_buffer, risk_per_trade)
+    elapsed = time.perf_counter() - start
+    print(f"strategy2_grid: {elapsed * 1000 / len(results):.2f} ms per combination ({elapsed:.1f} s for the full grid)")
+
+
+if __name__ == '__main__':
+    main()
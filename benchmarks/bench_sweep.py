@@ -0,0 +1,29 @@
+# Measures how the shared memory sweep runner scales with the number of worker processes,
+# run from the repository root with `python benchmarks/bench_sweep.py`
+import os
+import time
+
+from common import load_market_data
+from backtester import Sweep
+
+grid = ([5, 10, 15, 20, 25, 30, 35], [75, 80, 85, 90, 95, 100], [1, 2, 3, 4, 5, 6, 8, 10], [1, 2, 3, 4, 5], [1, 2, 3, 4, 5])
+
+
+def main():
+    data = load_market_data()
+    process_counts = sorted({1, 2, 4, 8, 16, 32, 64, os.cpu_count()} & set(range(1, os.cpu_count() + 1)))
+    baseline = None
+
+    for processes in process_counts:
+        sweep = Sweep(data, 100000, processes=processes)
+        start = time.perf_counter()
+        results = sweep.strategy2(*grid)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{processes:>3} processes: {elapsed:.2f} s for {len(results)} combinations, "
+              f"speedup {baseline / elapsed:.1f}x, efficiency {baseline / elapsed / processes * 100:.0f}%")
+    print(sweep.throughput().to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# Times the training of walk-forward optimisation of strategy 2 against slicing the DataFrame and running a fresh
+# grid for every window, and a whole walk-forward run on all cores. tests/test_walkforward.py checks that both find
+# the same parameters. Run from the repository root with `python benchmarks/bench_walkforward.py`
+import os
+import time
+
+import numpy as np
+
+from common import load_market_data
+from backtester import WalkForward
+from backtester.grid import MarketArrays, strategy2_balances
+from backtester.optimize import grid_candidates
+
+grid = ([5, 10, 15, 20, 25, 30, 35], [75, 80, 85, 90, 95, 100], [1, 2, 4, 6, 10], [1, 2, 3, 5], [1, 3, 5])
+
+
+def sliced(data, walk_forward, candidates):
+    # Index of the best candidate of each training window, from a fresh MarketArrays and grid per window
+    return [int(np.argmax(strategy2_balances(MarketArrays.from_frame(data.iloc[train_start:test_start]), 100000, candidates)))
+            for train_start, test_start, _ in walk_forward.windows]
+
+
+def main():
+    data = load_market_data()
+    candidates = grid_candidates(*grid)
+    for anchored in (False, True):
+        walk_forward = WalkForward(data, 100000, anchored=anchored, processes=1)
+        start = time.perf_counter()
+        sliced(data, walk_forward, candidates)
+        sliced_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        walk_forward.optimize(candidates)
+        view_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        WalkForward(data, 100000, anchored=anchored).run(*grid)
+        parallel_seconds = time.perf_counter() - start
+        print(f"{'anchored' if anchored else 'rolling'}: {len(walk_forward.windows)} windows x {len(candidates)} "
+              f"combinations, training on sliced frames {sliced_seconds:.2f} s, walk-forward training {view_seconds:.2f} s, "
+              f"whole run on {os.cpu_count()} processes {parallel_seconds:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from backtester.dataset import load_historical, load_updated, sentiment
+from backtester.signals import BUY, HOLD, SELL, SIGNAL_NAMES
+
+
+def load_fear_and_greed():
+    data = pd.concat([load_historical(ROOT / 'datasets' / 'fear_and_greed_data_01Mar11_18Sep20.csv'),
+                      load_updated(ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json')]).drop_duplicates()
+    data = data[data['Date'] <= '2024-08-01']
+    return data.set_index('Date')
+
+
+def load_market_data(seed=0):
+    # SPY prices are fetched from Yahoo Finance in the notebook, so a seeded random walk stands in for them here
+    data = load_fear_and_greed()
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.011, len(data))))
+    open_ = close * np.exp(rng.normal(0, 0.004, len(data)))
+    data['SPY Opening Price'] = open_
+    data['SPY High Price'] = np.maximum(open_, close) * np.exp(np.abs(rng.normal(0, 0.006, len(data))))
+    data['SPY Low Price'] = np.minimum(open_, close) * np.exp(-np.abs(rng.normal(0, 0.006, len(data))))
+    data['SPY Closing Price'] = close
+    return data
+
+
+def synthetic_market_data(bars, seed=0):
+    # Fear and Greed Index and SPY prices of any length from a fixed seed, so every run and every commit benchmarks the
+    # same data. The index is a random walk minus its 60 bar moving average, scaled to swing between fear and greed
+    # like the real one. Bars are daily while the dates fit in pandas' range and minutes for longer series, with the
+    # price moves scaled down to a 390 minute trading day
+    rng = np.random.default_rng(seed)
+    daily = bars <= 20000
+    step = 1 if daily else 1 / 390
+    walk = np.cumsum(rng.normal(0, 1, bars + 60))
+    totals = np.cumsum(np.concatenate(([0], walk)))
+    cycle = walk[60:] - (totals[61:] - totals[1:-60]) / 60
+    index = np.clip(np.rint(50 + 20 * cycle / cycle.std()), 0, 100)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0004 * step, 0.011 * step ** 0.5, bars)))
+    open_ = close * np.exp(rng.normal(0, 0.004 * step ** 0.5, bars))
+    wicks = np.abs(rng.normal(0, 0.006 * step ** 0.5, (2, bars)))
+    dates = pd.date_range('2011-01-03', periods=bars, freq='B' if daily else 'min', name='Date')
+    return pd.DataFrame({
+        'Fear and Greed Index': index.astype(np.int64),
+        'Sentiment': sentiment(index),
+        'SPY Opening Price': open_,
+        'SPY High Price': np.maximum(open_, close) * np.exp(wicks[0]),
+        'SPY Low Price': np.minimum(open_, close) * np.exp(-wicks[1]),
+        'SPY Closing Price': close,
+    }, index=dates)
+
+
+def legacy_generate_signal(data, buy_threshold, sell_threshold):
+    # The notebook's row-by-row strategy 1 signal loop
+    previous_signal = None
+    current_signal = None
+    signals = []
+
+    for index in range(0, len(data)):
+        if previous_signal != 'Buy' and data.iloc[index]['Fear and Greed Index'] <= buy_threshold:
+            current_signal = 'Buy'
+            previous_signal = current_signal
+        elif previous_signal != 'Sell' and data.iloc[index]['Fear and Greed Index'] >= sell_threshold:
+            current_signal = 'Sell'
+            previous_signal = current_signal
+        else:
+            current_signal = 'Hold'
+        signals.append(current_signal)
+    return signals
+
+
+def notebook_sentiment(score):
+    # The notebook's sentiment of a Fear and Greed Index score
+    return ('Extreme Fear' if (0 <= score < 25)
+            else 'Fear' if (25 <= score < 50)
+            else 'Neutral' if (50 <= score < 55)
+            else 'Greed' if (55 <= score < 75)
+            else 'Extreme Greed')
+
+
+def notebook_durations(df_final):
+    # The loop of the notebook's duration cell, returning the lengths of the runs of each sentiment and combined
+    # sentiment before they are averaged
+    sentiment_duration = {'Extreme Greed': [], 'Greed': [], 'Neutral': [], 'Fear': [], 'Extreme Fear': []}
+    combined_sentiment_duration = {'Greedy': [], 'Fearful': []}
+    current_sentiment = df_final.iloc[0]['Sentiment']
+    combined_current_sentiment = 'Greedy' if current_sentiment in ['Extreme Greed', 'Greed'] else 'Fearful'
+    duration = 0
+    combined_duration = 0
+    for i in range(0, len(df_final)):
+        sentiment = df_final.iloc[i]['Sentiment']
+        if sentiment == current_sentiment:
+            duration += 1
+        else:
+            sentiment_duration[current_sentiment].append(duration)
+            current_sentiment = sentiment
+            duration = 1
+
+        if combined_current_sentiment == 'Greedy' and sentiment in ['Extreme Greed', 'Greed', 'Neutral']:
+            combined_duration += 1
+        elif combined_current_sentiment == 'Fearful' and sentiment in ['Fear', 'Extreme Fear', 'Neutral']:
+            combined_duration += 1
+        else:
+            combined_sentiment_duration[combined_current_sentiment].append(combined_duration)
+            combined_current_sentiment = 'Greedy' if sentiment in ['Extreme Greed', 'Greed'] else 'Fearful'
+            combined_duration = 1
+
+        if i == len(df_final) - 1:
+            sentiment_duration[current_sentiment].append(duration)
+            combined_sentiment_duration[combined_current_sentiment].append(combined_duration)
+    return sentiment_duration, combined_sentiment_duration
+
+
+def signal_names(signals):
+    return [SIGNAL_NAMES[signal] for signal in np.asarray(signals).tolist()]
+
+
+def threshold_signals(index, buy_threshold, sell_threshold):
+    # Strategy 1 signals as a full int8 array, the scan the crossing index of Backtest1 replaced
+    index = np.asarray(index, dtype=float)
+    buys = index <= buy_threshold
+    sells = index >= sell_threshold
+    signals = np.zeros(len(index), dtype=np.int8)
+    events = np.flatnonzero(buys | sells)
+    if len(events) == 0:
+        return signals
+
+    if not (buys[events] & sells[events]).any():
+        # Every event day has a single side, so the signal state is always the side of the previous event
+        # and a signal only fires when the side differs from the previous event's side
+        sides = np.where(buys[events], BUY, SELL).astype(np.int8)
+        changed = np.ones(len(events), dtype=bool)
+        changed[1:] = sides[1:] != sides[:-1]
+        signals[events[changed]] = sides[changed]
+        return signals
+
+    # Overlapping thresholds make the side of a day depend on the current state, so walk the event days only
+    previous_signal = HOLD
+    for event, is_buy, is_sell in zip(events.tolist(), buys[events].tolist(), sells[events].tolist()):
+        if previous_signal != BUY and is_buy:
+            previous_signal = signals[event] = BUY
+        elif previous_signal != SELL and is_sell:
+            previous_signal = signals[event] = SELL
+    return signals
@@ -0,0 +1,156 @@
+# Times every stage of Backtest1 and Backtest2 and the parameter grids on synthetic data of increasing length, with
+# the peak memory of each stage, and saves the results as JSON so two commits can be compared. Run from the repository
+# root, e.g.
+#   python benchmarks/suite.py                                   # 1e3 to 1e5 bars, saved to benchmarks/results/<commit>.json
+#   python benchmarks/suite.py --sizes 1000 10000000 --only Backtest2.backtest
+#   python benchmarks/suite.py --compare benchmarks/results/<base>.json benchmarks/results/<head>.json
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from common import ROOT, synthetic_market_data
+from backtester import Backtest1, Backtest2, compiled, strategy1_grid, strategy2_grid
+from backtester.engine import ENGINES
+
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5]
+RESULTS = ROOT / 'benchmarks' / 'results'
+STRATEGY1_PARAMS = (20, 80)
+STRATEGY2_PARAMS = (20, 80, 3, 2, 1)
+STRATEGY1_GRID = ([10, 20, 30], [70, 80, 90])
+STRATEGY2_GRID = ([20, 30], [70, 80], [2, 3], [2, 3], [1, 2])
+
+
+def _fresh_report(backtest):
+    # Reports are memoised per run, clearing it times the computation instead of the cache lookup
+    backtest.report = {}
+    return backtest.generate_report()
+
+
+def cases(data, engine):
+    # Benchmark name and the call it times, the backtests are set up once and their frame caches are warm
+    strategy1 = Backtest1(data, 100000, *STRATEGY1_PARAMS, engine=engine).backtest()
+    strategy2 = Backtest2(data, 100000, *STRATEGY2_PARAMS, engine=engine).backtest()
+    return [
+        ('Backtest1.generate_signal', lambda: strategy1.generate_signal(*STRATEGY1_PARAMS)),
+        ('Backtest1.backtest', strategy1.backtest),
+        ('Backtest1.generate_report', lambda: _fresh_report(strategy1)),
+        ('strategy1_grid', lambda: strategy1_grid(data, 100000, *STRATEGY1_GRID)),
+        ('Backtest2.generate_signal', lambda: strategy2.generate_signal(*STRATEGY2_PARAMS[:2])),
+        ('Backtest2.backtest', strategy2.backtest),
+        ('Backtest2.calculate_daily_equity', strategy2.calculate_daily_equity),
+        ('Backtest2.generate_report', lambda: _fresh_report(strategy2)),
+        ('Backtest2.transaction_records', strategy2.transaction_records),
+        ('strategy2_grid', lambda: strategy2_grid(data, 100000, *STRATEGY2_GRID)),
+    ]
+
+
+def measure(function, min_time, max_repeats):
+    # Repeats the call until min_time has passed, slow calls at large sizes run once
+    timings = []
+    while len(timings) < max_repeats and sum(timings) < min_time:
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def peak_memory(function):
+    # Bytes allocated at the peak of one call on top of what was allocated before it, NumPy buffers included
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, engine, seed, only, min_time, max_repeats, memory):
+    # Synthetic runs can lose the whole balance or span less than a year, which only shows up as NaN or inf metrics
+    warnings.simplefilter('ignore', RuntimeWarning)
+    results = []
+    for bars in sizes:
+        data = synthetic_market_data(bars, seed)
+        for name, function in cases(data, engine):
+            if only and not any(pattern in name for pattern in only):
+                continue
+            timings = measure(function, min_time, max_repeats)
+            result = {'name': name, 'bars': bars, 'repeats': len(timings), 'best_seconds': min(timings),
+                      'median_seconds': statistics.median(timings),
+                      'peak_memory_bytes': peak_memory(function) if memory else None}
+            results.append(result)
+            memory_text = f"{result['peak_memory_bytes'] / 2 ** 20:9.2f} MiB" if memory else ''
+            print(f"{name:<34} {bars:>10} bars {result['best_seconds'] * 1000:12.3f} ms {memory_text}", flush=True)
+    return results
+
+
+def compare(base_path, head_path, threshold):
+    # Ratio head/base of the best time and the peak memory of every benchmark run in both files
+    with open(base_path) as file:
+        base = {(result['name'], result['bars']): result for result in json.load(file)['results']}
+    with open(head_path) as file:
+        head = json.load(file)['results']
+    regressions = 0
+    for result in head:
+        previous = base.get((result['name'], result['bars']))
+        if previous is None:
+            continue
+        ratio = result['best_seconds'] / previous['best_seconds']
+        memory_ratio = (result['peak_memory_bytes'] / previous['peak_memory_bytes']
+                        if result['peak_memory_bytes'] and previous['peak_memory_bytes'] else float('nan'))
+        flag = 'slower' if ratio > threshold else 'faster' if ratio < 1 / threshold else ''
+        regressions += flag == 'slower'
+        print(f"{result['name']:<34} {result['bars']:>10} bars {previous['best_seconds'] * 1000:12.3f} ms -> "
+              f"{result['best_seconds'] * 1000:12.3f} ms {ratio:6.2f}x time {memory_ratio:6.2f}x memory {flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backtester benchmark suite')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help=f'bar counts, up to {SIZES[-1]}')
+    parser.add_argument('--engine', default='numpy', choices=ENGINES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help='run the benchmarks whose name contains any of these')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds spent repeating each benchmark')
+    parser.add_argument('--max-repeats', type=int, default=50)
+    parser.add_argument('--no-memory', action='store_true', help='skip the extra traced call for peak memory')
+    parser.add_argument('--output', help='JSON file for the results, benchmarks/results/<commit>.json by default')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='compare two result files instead')
+    parser.add_argument('--threshold', type=float, default=1.1, help='time ratio reported as a regression')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    revision = commit()
+    results = run(args.sizes, args.engine, args.seed, args.only, args.min_time, args.max_repeats, not args.no_memory)
+    output = args.output or RESULTS / f'{revision}.json'
+    if not args.output:
+        RESULTS.mkdir(exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump({'commit': revision, 'engine': args.engine, 'numba': compiled.NUMBA_AVAILABLE, 'seed': args.seed,
+                   'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                   'machine': platform.machine(), 'results': results}, file, indent=1)
+    print(f"Saved {len(results)} results to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from common import synthetic_market_data
+
+
+@pytest.fixture(scope='session')
+def market():
+    return synthetic_market_data(2000, seed=7)
+
+
+def assert_reports_equal(actual, expected):
+    assert list(actual) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, float) and np.isnan(value):
+            assert np.isnan(actual[key]), key
+        else:
+            assert actual[key] == value, key
@@ -0,0 +1,37 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from backtester import Backtest2, ChunkedBacktest, DatasetStore
+from backtester.ledger import STRATEGY2_FIELDS
+from conftest import assert_reports_equal
+
+PARAMS = [(30, 70, 3, 2, 1), (20, 80, 8, 4, 5), (45, 55, 2, 1, 2)]
+
+
+@pytest.fixture(scope='module')
+def store(market, tmp_path_factory):
+    return DatasetStore(tmp_path_factory.mktemp('store')).write(market)
+
+
+@pytest.mark.parametrize('params, chunk_size', list(product(PARAMS, [1, 3, 7])))
+def test_chunks_give_backtest2(market, store, params, chunk_size):
+    backtest = Backtest2(market, 100000, *params).backtest()
+    chunked = ChunkedBacktest(store, 100000, *params, chunk_size=chunk_size).backtest()
+    # Positions carry over from one chunk to the next
+    assert (backtest.ledger['close_index'] - backtest.ledger['open_index'] > chunk_size).any()
+    for name in STRATEGY2_FIELDS:
+        np.testing.assert_array_equal(chunked.ledger[name], backtest.ledger[name], err_msg=name)
+    assert chunked.balance == backtest.balance
+    assert chunked.calculate_daily_equity().equals(backtest.calculate_daily_equity())
+    assert_reports_equal(chunked.report, backtest.report)
+
+
+def test_scores_by_date(market, store):
+    # The index passed in as scores by date gives the same trades as the store's own column
+    scores = market['Fear and Greed Index']
+    expected = ChunkedBacktest(store, 100000, *PARAMS[0], chunk_size=7).backtest()
+    chunked = ChunkedBacktest(store.directory, 100000, *PARAMS[0], scores=scores, chunk_size=7).backtest()
+    for name in STRATEGY2_FIELDS:
+        np.testing.assert_array_equal(chunked.ledger[name], expected.ledger[name], err_msg=name)
+    assert_reports_equal(chunked.report, expected.report)
@@ -0,0 +1,48 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+from backtester.cnn import SCORE_SERIES, read_payload
+from conftest import ROOT
+
+PAYLOAD = ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json'
+
+
+def expected_frame(points):
+    return pd.DataFrame({'Value': [np.nan if point['y'] is None else point['y'] for point in points]},
+                        index=pd.DatetimeIndex(np.array([point['x'] for point in points], dtype=np.int64)
+                                               .astype('datetime64[ms]'), name='Date'))
+
+
+def assert_series_matches(series, points):
+    frame, expected = series.frame(), expected_frame(points)
+    assert frame.index.equals(expected.index)
+    np.testing.assert_array_equal(frame['Value'].to_numpy(), expected['Value'].to_numpy())
+    ratings = frame['Rating'].astype(object).where(frame['Rating'].notna(), None).tolist()
+    assert ratings == [point.get('rating') for point in points]
+
+
+def test_matches_json_load_for_any_chunk_size():
+    with open(PAYLOAD) as file:
+        data = json.load(file)
+    for chunk_size in [7, 1000, 1 << 16]:
+        payload = read_payload(PAYLOAD, value_dtype=np.float64, score_dtype=np.float64, chunk_size=chunk_size)
+        for name, series in payload.series.items():
+            assert_series_matches(series, data[name]['data'])
+        assert payload.current['fear_and_greed'] == data['fear_and_greed']
+
+
+def test_points_without_rating():
+    points = [{'x': 1.6e12, 'y': 25.0, 'rating': 'fear'}, {'x': 1.6001e12, 'y': None},
+              {'x': 1.6002e12, 'y': 60.5, 'rating': None}, {'x': 1.6003e12, 'y': 80.0, 'rating': 'greed'}]
+    text = json.dumps({SCORE_SERIES: {'timestamp': 1.6003e12, 'score': 80.0, 'data': points}})
+    for chunk_size in [5, 1 << 16]:
+        series = read_payload(io.StringIO(text), score_dtype=np.float64, chunk_size=chunk_size).series[SCORE_SERIES]
+        assert series.ratings.tolist() == [0, -1, -1, 1]
+        assert_series_matches(series, points)
+
+
+def test_names_skip_other_series():
+    payload = read_payload(PAYLOAD, names=[SCORE_SERIES], chunk_size=100)
+    assert list(payload.series) == [SCORE_SERIES]
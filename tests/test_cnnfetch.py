@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from backtester.cnnfetch import CNNFetcher, missing_ranges
+from backtester.dataset import load_updated
+from conftest import ROOT
+
+web = pytest.importorskip('aiohttp.web')
+
+UPDATED_PATH = ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json'
+# Cached responses count as complete for the days before they were fetched, so the history ends today
+END = pd.Timestamp.now().normalize()
+
+
+def trading_days(start, end):
+    # Weekdays less one in 25 as holidays, each scored by its ordinal so merged scores can be checked
+    days = pd.bdate_range(start, end)
+    return days[(days.to_numpy().astype('datetime64[D]').astype(np.int64) % 25) != 0]
+
+
+def score(day):
+    return float(day.toordinal() % 100)
+
+
+class GraphdataStandIn:
+    # graphdata/<date> answers every trading day from date up to end, like CNN does up to now
+    def __init__(self, end=END):
+        self.end = end
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        threading.Thread(target=self._serve, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    async def graphdata(self, request):
+        key = request.match_info.get('date', 'latest')
+        self.requests.append(key)
+        etag = f'"{key} {self.end.date()}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        if key == 'latest':
+            body = UPDATED_PATH.read_bytes()
+        else:
+            data = [{'x': day.value / 10 ** 6, 'y': score(day), 'rating': 'neutral'}
+                    for day in trading_days(key, self.end)]
+            body = json.dumps({'fear_and_greed_historical': {'data': data}}).encode()
+        return web.Response(body=body, headers={'ETag': etag, 'Content-Type': 'application/json'})
+
+    def _serve(self, ready):
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get('/graphdata/', self.graphdata)
+        app.router.add_get('/graphdata/{date}', self.graphdata)
+        runner = web.AppRunner(app)
+        self.loop.run_until_complete(runner.setup())
+        self.loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', 0).start())
+        self.url = f'http://127.0.0.1:{runner.addresses[0][1]}/graphdata/'
+        ready.set()
+        self.loop.run_forever()
+
+
+@pytest.fixture
+def server():
+    return GraphdataStandIn()
+
+
+@pytest.fixture
+def updated():
+    return load_updated(UPDATED_PATH)
+
+
+def expected_scores(updated, end):
+    known = pd.DatetimeIndex(updated['Date'])
+    days = trading_days(known.min(), end)
+    days = days[~days.isin(known)]
+    fetched = pd.DataFrame({'Date': days, 'Score': [score(day) for day in days]})
+    known = updated.rename(columns={'Fear and Greed Index': 'Score'}).drop_duplicates('Date')
+    return pd.concat([known, fetched]).sort_values('Date', ignore_index=True)
+
+
+def assert_scores(merged, updated, end):
+    expected = expected_scores(updated, end)
+    np.testing.assert_array_equal(merged['Date'].to_numpy(), expected['Date'].to_numpy())
+    np.testing.assert_array_equal(merged['Score'].to_numpy(), expected['Score'].to_numpy(dtype=float))
+
+
+def test_backfill_is_one_request_from_the_first_missing_day(server, updated, tmp_path):
+    fetcher = CNNFetcher(tmp_path, server.url)
+    merged = fetcher.update(updated['Date'], updated['Fear and Greed Index'], END)
+    first_missing = missing_ranges(updated['Date'], END)[0][0]
+    assert server.requests == [first_missing.strftime('%Y-%m-%d')]
+    assert_scores(merged, updated, END)
+
+    warm = CNNFetcher(tmp_path, server.url).update(updated['Date'], updated['Fear and Greed Index'], END)
+    assert len(server.requests) == 1
+    pd.testing.assert_frame_equal(warm, merged)
+
+
+def test_cached_responses_answer_older_gaps(server, updated, tmp_path):
+    merged = CNNFetcher(tmp_path, server.url).update(updated['Date'], updated['Fear and Greed Index'], END)
+    merged = merged.rename(columns={'Score': 'Fear and Greed Index'})
+    # A week later, past the TTL: only the new days are requested, the holidays of the history are answered by the
+    # cached response
+    server.end = later = END + pd.Timedelta(days=7)
+    fetcher = CNNFetcher(tmp_path, server.url, ttl=0)
+    merged_later = fetcher.update(merged['Date'], merged['Fear and Greed Index'], later)
+    assert server.requests[1:] == [missing_ranges(merged['Date'], later)[-1][0].strftime('%Y-%m-%d')]
+    assert_scores(merged_later, updated, later)
+
+
+def test_blocking_calls_work_inside_a_running_event_loop(server, updated, tmp_path):
+    async def notebook_cell():
+        fetcher = CNNFetcher(tmp_path, server.url)
+        blocking = fetcher.update(updated['Date'], updated['Fear and Greed Index'], END)
+        awaited = await fetcher.fetch_update(updated['Date'], updated['Fear and Greed Index'], END)
+        return blocking, awaited, fetcher.current(), await fetcher.fetch_latest()
+
+    blocking, awaited, current, latest = asyncio.run(notebook_cell())
+    pd.testing.assert_frame_equal(blocking, awaited)
+    assert_scores(blocking, updated, END)
+    assert current == json.loads(UPDATED_PATH.read_text())['fear_and_greed']
+    assert latest == str(tmp_path / 'latest.json')
@@ -0,0 +1,68 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from backtester import Backtest1, Backtest2
+from backtester.engine import bracket_equity
+from common import load_market_data
+from conftest import assert_reports_equal
+
+THRESHOLDS = [(5, 95), (20, 80), (30, 70), (45, 55), (60, 40)]
+BRACKETS = [(3, 3, 1), (2, 1, 5), (8, 4, 5), (1, 5, 2)]
+
+
+@pytest.fixture(scope='module')
+def data():
+    return load_market_data()
+
+
+@pytest.fixture(scope='module')
+def compiled():
+    # Only these tests need Numba, the engines are compared with the notebook in test_legacy_parity.py
+    pytest.importorskip('numba')
+    from backtester import compiled
+    return compiled
+
+
+def assert_same_columns(ledger, columns):
+    for name in ledger.fields:
+        assert ledger[name].dtype == columns[name].dtype, name
+        np.testing.assert_array_equal(ledger[name], columns[name], err_msg=name)
+
+
+def test_compiled_module_is_numba(compiled):
+    assert compiled.NUMBA_AVAILABLE
+
+
+@pytest.mark.parametrize('buy_threshold, sell_threshold', THRESHOLDS)
+def test_threshold_reversals(compiled, data, buy_threshold, sell_threshold):
+    backtest = Backtest1(data, 100000, buy_threshold, sell_threshold).backtest()
+    columns, balance = compiled.simulate_threshold_reversals(data.index, data['SPY Opening Price'].to_numpy(),
+                                                             backtest.signals, 100000)
+    assert_same_columns(backtest.ledger, columns)
+    assert balance == backtest.balance
+    assert_reports_equal(Backtest1(data, 100000, buy_threshold, sell_threshold, engine='numba').backtest().report,
+                         backtest.report)
+
+
+@pytest.mark.parametrize('thresholds, brackets', list(product(THRESHOLDS, BRACKETS)))
+def test_bracket_orders(compiled, data, thresholds, brackets):
+    open_price = data['SPY Opening Price'].to_numpy()
+    high_price = data['SPY High Price'].to_numpy()
+    low_price = data['SPY Low Price'].to_numpy()
+    close_price = data['SPY Closing Price'].to_numpy()
+    risk_reward_ratio, loss_buffer, risk_per_trade = brackets
+    backtest = Backtest2(data, 100000, *thresholds, *brackets).backtest()
+
+    signals = compiled.bracket_signals(open_price, high_price, low_price, data['Fear and Greed Index'].to_numpy(),
+                                       *thresholds, risk_reward_ratio, loss_buffer)
+    np.testing.assert_array_equal(signals, backtest.signals)
+    columns, balance = compiled.simulate_bracket_orders(data.index, open_price, high_price, low_price, close_price,
+                                                        signals, 100000, risk_reward_ratio, loss_buffer, risk_per_trade)
+    assert_same_columns(backtest.ledger, columns)
+    assert balance == backtest.balance
+    np.testing.assert_array_equal(bracket_equity(close_price, 100000, columns), backtest.equity)
+
+    compiled_backtest = Backtest2(data, 100000, *thresholds, *brackets, engine='numba').backtest()
+    np.testing.assert_array_equal(compiled_backtest.equity, backtest.equity)
+    assert_reports_equal(compiled_backtest.report, backtest.report)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import DatasetStore, cached_dataset
+from common import ROOT
+
+HISTORICAL = ROOT / 'datasets' / 'fear_and_greed_data_01Mar11_18Sep20.csv'
+UPDATED = ROOT / 'datasets' / 'fear_and_greed_data_01Aug20_01Aug24.json'
+
+
+def assert_frames_equal(loaded, data):
+    # Text columns come back as categoricals
+    pd.testing.assert_frame_equal(loaded, data, check_dtype=False, check_categorical=False, check_freq=False)
+    for name, dtype in data.dtypes.items():
+        if dtype.kind in 'biuf':
+            assert loaded[name].dtype == dtype, name
+
+
+def labels(count, length):
+    return [f'Label {code}' for code in np.arange(length) % count]
+
+
+def test_write_and_load_roundtrip(tmp_path, market):
+    store = DatasetStore(tmp_path).write(market, 'source')
+    loaded = store.load()
+    assert_frames_equal(loaded, market)
+    assert isinstance(loaded['Sentiment'].dtype, pd.CategoricalDtype)
+    assert store.meta['length'] == len(market)
+
+
+def test_append_only_adds_later_days(tmp_path, market):
+    store = DatasetStore(tmp_path).write(market.iloc[:1500])
+    version = store.version
+    assert store.append(market.iloc[1000:]) == 500
+    assert store.version != version
+    assert store.append(market.iloc[1200:]) == 0
+    assert_frames_equal(store.load(), market)
+
+
+def test_append_after_an_interrupted_append(tmp_path, market):
+    store = DatasetStore(tmp_path).write(market.iloc[:1500])
+    # Bytes of a partial append past the recorded length are dropped by the next one
+    entry = store.meta['columns'][0]
+    with open(tmp_path / entry['file'], 'ab') as file:
+        file.write(b'partial')
+    store.append(market.iloc[1500:])
+    assert_frames_equal(store.load(), market)
+
+
+def test_stale_detection(tmp_path, market):
+    store = DatasetStore(tmp_path)
+    assert store.is_stale('source')
+    store.write(market, 'source')
+    assert not store.is_stale('source')
+    assert store.is_stale('other source')
+    # A rewrite replaces the files of the previous one
+    files = {entry['file'] for entry in [store.meta['index']] + store.meta['columns']}
+    store.write(market.iloc[:100], 'other source')
+    assert not store.is_stale('other source')
+    assert not any((tmp_path / name).exists() for name in files)
+    assert_frames_equal(store.load(), market.iloc[:100])
+
+
+def test_window(tmp_path, market):
+    store = DatasetStore(tmp_path).write(market)
+    times, (low, index) = store.window(1990, 2010, ['SPY Low Price', 'Fear and Greed Index'])
+    np.testing.assert_array_equal(times, market.index[1990:].to_numpy())
+    np.testing.assert_array_equal(low, market['SPY Low Price'].to_numpy()[1990:])
+    np.testing.assert_array_equal(index, market['Fear and Greed Index'].to_numpy()[1990:])
+
+
+@pytest.mark.parametrize('count, dtype', [(2, '<i1'), (128, '<i1'), (129, '<i2'), (40000, '<i4')])
+def test_category_codes_hold_every_category(tmp_path, count, dtype):
+    data = pd.DataFrame({'Label': labels(count, 50000)}, index=pd.date_range('2000-01-01', periods=50000, name='Date'))
+    store = DatasetStore(tmp_path).write(data)
+    assert store.meta['columns'][0]['dtype'] == dtype
+    assert_frames_equal(store.load(), data)
+
+
+def test_append_widens_category_codes(tmp_path):
+    data = pd.DataFrame({'Label': labels(200, 400), 'Value': np.arange(400.0)},
+                        index=pd.date_range('2000-01-01', periods=400, name='Date'))
+    store = DatasetStore(tmp_path).write(data.iloc[:100])
+    assert store.meta['columns'][0]['dtype'] == '<i1'
+    assert store.append(data.iloc[100:]) == 300
+    assert store.meta['columns'][0]['dtype'] == '<i2'
+    assert_frames_equal(store.load(), data)
+
+
+def test_cached_dataset_rebuilds_when_its_sources_change(tmp_path):
+    dates = pd.date_range('2011-01-03', '2024-08-01', freq='B')
+    spy = pd.DataFrame({'Date': dates, 'SPY Opening Price': 1.0, 'SPY High Price': 2.0, 'SPY Low Price': 0.5,
+                        'SPY Closing Price': 1.5})
+    data = cached_dataset(tmp_path, HISTORICAL, UPDATED, spy=spy, end='2024-08-01')
+    version = DatasetStore(tmp_path).version
+    # No SPY prices are needed, or fetched, while the store is up to date
+    assert_frames_equal(cached_dataset(tmp_path, HISTORICAL, UPDATED, end='2024-08-01'), data)
+    assert DatasetStore(tmp_path).version == version
+    shorter = cached_dataset(tmp_path, HISTORICAL, UPDATED, spy=spy, end='2020-01-01')
+    assert DatasetStore(tmp_path).version != version
+    assert_frames_equal(shorter, data[data.index <= '2020-01-01'])
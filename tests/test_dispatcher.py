@@ -0,0 +1,116 @@
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import pytest
+from conftest import ROOT
+
+web = pytest.importorskip('aiohttp.web')
+sys.path.insert(0, str(ROOT / 'alert'))
+from dispatcher import AlertDispatcher
+
+BOT_ID = 'test'
+
+
+class TelegramStandIn:
+    # Local sendMessage endpoint answering each chat with the statuses in replies, then 200. Records every request
+    # and the most requests it had in flight at once
+    def __init__(self, replies=None, latency=0.0):
+        self.replies = replies or {}
+        self.latency = latency
+        self.requests = Counter()
+        self.delivered = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send_message(self, request):
+        body = await request.json()
+        chat_id = body['chat_id']
+        replies = self.replies.get(chat_id, [])
+        attempt = self.requests[chat_id]
+        self.requests[chat_id] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        if attempt < len(replies):
+            status, payload = replies[attempt]
+            return web.json_response(payload, status=status)
+        self.delivered[chat_id] += 1
+        return web.json_response({'ok': True, 'result': {'chat': {'id': chat_id}, 'text': body['text']}})
+
+    def run(self, dispatcher_options, chat_ids, text='Fear and Greed Index'):
+        async def main():
+            app = web.Application()
+            app.router.add_post(f'/bot{BOT_ID}/sendMessage', self.send_message)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = runner.addresses[0][1]
+            try:
+                dispatcher = AlertDispatcher(BOT_ID, api_url=f'http://127.0.0.1:{port}', **dispatcher_options)
+                return await dispatcher.dispatch(chat_ids, text)
+            finally:
+                await runner.cleanup()
+        return asyncio.run(main())
+
+
+def too_many_requests(retry_after):
+    return 429, {'ok': False, 'error_code': 429, 'description': f'Too Many Requests: retry after {retry_after}',
+                 'parameters': {'retry_after': retry_after}}
+
+
+FAST = {'rate': 1000, 'backoff': 0.01}
+
+
+def test_waits_retry_after_on_429_then_delivers():
+    server = TelegramStandIn({chat_id: [too_many_requests(0.3)] for chat_id in range(5)})
+    start = time.perf_counter()
+    results = server.run(FAST, list(range(5)))
+    assert time.perf_counter() - start >= 0.3
+    assert [result['chat_id'] for result in results] == list(range(5))
+    assert all(result['ok'] and result['attempts'] == 2 for result in results)
+    assert server.requests == Counter({chat_id: 2 for chat_id in range(5)})
+    assert server.delivered == Counter({chat_id: 1 for chat_id in range(5)})
+
+
+def test_server_errors_are_retried_with_backoff():
+    server = TelegramStandIn({'a': [(500, {'ok': False, 'description': 'Internal Server Error'})] * 2})
+    results = server.run(FAST, ['a', 'b'])
+    assert [(result['ok'], result['attempts']) for result in results] == [(True, 3), (True, 1)]
+
+
+def test_client_errors_are_not_retried():
+    blocked = (403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'})
+    server = TelegramStandIn({'blocked': [blocked] * 5})
+    results = server.run(FAST, ['blocked', 'subscriber'])
+    assert results[0] == {'chat_id': 'blocked', 'ok': False, 'status': 403, 'attempts': 1,
+                          'error': 'Forbidden: bot was blocked by the user'}
+    assert results[1]['ok']
+    assert server.requests['blocked'] == 1
+
+
+def test_gives_up_after_the_retries():
+    server = TelegramStandIn({'a': [too_many_requests(0)] * 10})
+    result, = server.run({**FAST, 'retries': 2}, ['a'])
+    assert (result['ok'], result['status'], result['attempts']) == (False, 429, 3)
+    assert server.requests['a'] == 3
+
+
+def test_concurrency_is_bounded_and_no_chat_is_dropped():
+    chat_ids = list(range(60))
+    server = TelegramStandIn({chat_id: [too_many_requests(0)] for chat_id in chat_ids[::3]}, latency=0.02)
+    results = server.run({**FAST, 'concurrency': 4}, chat_ids)
+    assert 1 < server.max_in_flight <= 4
+    assert all(result['ok'] for result in results)
+    assert server.delivered == Counter({chat_id: 1 for chat_id in chat_ids})
+
+
+def test_token_bucket_spaces_requests():
+    start = time.perf_counter()
+    TelegramStandIn().run({'rate': 20}, list(range(11)))
+    assert time.perf_counter() - start >= 0.45
@@ -0,0 +1,21 @@
+import numpy as np
+from backtester import Backtest2
+from backtester.engine import round2
+
+
+def test_round2_matches_numpy_round():
+    values = np.array([0.125, 0.135, -2.675, 1.005, 123456.785, 1e-9, np.nan, np.inf])
+    np.testing.assert_array_equal(round2(values), np.round(values, 2))
+    for value in values:
+        np.testing.assert_array_equal(round2(value), np.round(value, 2))
+
+
+def test_missing_last_close_gives_nan_returns(market):
+    # Positions still open on the last bar close at its closing price, which may be missing
+    data = market.iloc[:380].copy()
+    data.iloc[-1, data.columns.get_loc('SPY Closing Price')] = np.nan
+    backtest = Backtest2(data, 100000, 30, 70).backtest()
+    assert np.isnan(backtest.ledger['returns'][backtest.ledger['close_index'] == len(data) - 1]).all()
+    assert (backtest.ledger['close_index'] == len(data) - 1).any()
+    assert np.isnan(backtest.report['Final Balance'])
+    assert np.isnan(backtest.report['Buy and Hold Returns'])
@@ -0,0 +1,32 @@
+from backtester import Backtest1, Backtest2
+from backtester.framecache import cached, invalidate
+from common import synthetic_market_data
+from conftest import assert_reports_equal
+
+
+def test_strategy2_sees_prices_edited_in_place(market):
+    data = market.copy()
+    Backtest2(data, 100000, 35, 65, 3, 2).backtest()
+    data.loc[data.index[:1000], 'SPY Low Price'] *= 0.9
+    data.loc[data.index[-1], 'SPY Closing Price'] *= 2
+    expected = Backtest2(data.copy(), 100000, 35, 65, 3, 2).backtest().report
+    assert_reports_equal(Backtest2(data, 100000, 35, 65, 3, 2).backtest().report, expected)
+
+
+def test_strategy1_sees_a_reassigned_index_column(market):
+    data = market.copy()
+    Backtest1(data, 100000, 30, 70).backtest()
+    data['Fear and Greed Index'] = 100 - data['Fear and Greed Index']
+    expected = Backtest1(data.copy(), 100000, 30, 70).backtest().report
+    assert_reports_equal(Backtest1(data, 100000, 30, 70).backtest().report, expected)
+
+
+def test_invalidate_picks_up_an_edit_between_the_samples():
+    # Only every 19th bar of 20000 is sampled, so an in-place edit of bar 1 keeps the cached value until invalidated
+    data = synthetic_market_data(20000, seed=3)
+    compute = lambda: data['SPY Low Price'].min()
+    lowest = cached(data, 'Lowest', compute, ['SPY Low Price'])
+    data.loc[data.index[1], 'SPY Low Price'] = lowest - 1
+    assert cached(data, 'Lowest', compute, ['SPY Low Price']) == lowest
+    invalidate(data)
+    assert cached(data, 'Lowest', compute, ['SPY Low Price']) == lowest - 1
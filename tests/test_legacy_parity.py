@@ -0,0 +1,45 @@
+from itertools import product
+
+import pytest
+from backtester import Backtest1, Backtest2
+from common import load_market_data, signal_names
+from conftest import assert_reports_equal
+from legacy.backtest_strategy1 import Backtest as LegacyBacktest1
+from legacy.backtest_strategy2 import Backtest as LegacyBacktest2
+
+# The engines against the frozen notebook implementation in tests/legacy, which needs neither Numba nor the pinned
+# strategy_results, whose SPY prices came from Yahoo Finance. The legacy loops are slow, so they run on the first
+# 600 days of the real Fear and Greed Index with seeded prices
+THRESHOLDS = [(5, 95), (20, 80), (30, 70), (45, 55), (60, 40)]
+BRACKETS = [(3, 3, 1), (2, 1, 5), (8, 4, 5), (1, 5, 2)]
+TRADE_FIELDS = ['open_date', 'open_price', 'position', 'shares', 'close_date', 'close_price', 'returns', 'pct_returns',
+                'duration']
+
+
+@pytest.fixture(scope='module')
+def data():
+    return load_market_data().iloc[:600].copy()
+
+
+@pytest.mark.parametrize('buy_threshold, sell_threshold', THRESHOLDS)
+def test_threshold_reversals(data, buy_threshold, sell_threshold):
+    legacy = LegacyBacktest1(data, 100000, buy_threshold, sell_threshold)
+    backtest = Backtest1(data, 100000, buy_threshold, sell_threshold)
+    assert signal_names(backtest.signals) == legacy.signals
+    legacy.backtest()
+    backtest.backtest()
+    assert_reports_equal(backtest.report, legacy.report)
+    assert ([[getattr(trade, name) for name in TRADE_FIELDS] for trade in backtest.trades]
+            == [[getattr(trade, name) for name in TRADE_FIELDS] for trade in legacy.trades])
+
+
+@pytest.mark.parametrize('thresholds, brackets', list(product(THRESHOLDS, BRACKETS)))
+def test_bracket_orders(data, thresholds, brackets):
+    legacy = LegacyBacktest2(data, 100000, *thresholds, *brackets)
+    backtest = Backtest2(data, 100000, *thresholds, *brackets)
+    assert signal_names(backtest.signals) == legacy.signals
+    legacy.backtest()
+    backtest.backtest()
+    assert_reports_equal({name: backtest.report[name] for name in legacy.report}, legacy.report)
+    assert backtest.transaction_records().equals(legacy.transaction_records())
+    assert backtest.calculate_daily_equity().equals(legacy.calculate_daily_equity())
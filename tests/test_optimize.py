@@ -0,0 +1,41 @@
+import warnings
+
+import pytest
+from backtester.grid import STRATEGY2_PARAMETERS, strategy2_grid
+from backtester.optimize import SuccessiveHalving, grid_candidates
+
+GRID = ([10, 20, 30], [70, 80, 90], [2, 3], [2, 3], [1, 2])
+
+
+@pytest.fixture(scope='module')
+def grid_results(market):
+    results = strategy2_grid(market, 100000, *GRID)
+    return results.sort_values('Performance vs Buy and Hold (%)', ascending=False, kind='stable', ignore_index=True)
+
+
+@pytest.mark.parametrize('top', [3, 5])
+def test_top_candidates_match_the_grid(market, grid_results, top):
+    search = SuccessiveHalving(market, 100000)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # short prefixes can give empty means
+        results = search.run(grid_candidates(*GRID), top=top)
+    assert len(results) < len(grid_results)
+    assert search.bars_evaluated < len(grid_results) * len(market)
+    # The survivors get the same full report rows as the grid
+    expected = grid_results.head(top).reset_index(drop=True)
+    assert results[STRATEGY2_PARAMETERS].head(top).equals(expected[STRATEGY2_PARAMETERS])
+    assert results[list(grid_results.columns)].head(top).equals(expected)
+
+
+@pytest.mark.parametrize('eta, min_fraction, windows', [(3, 1 / 3, [667, 2000]), (3, 1 / 9, [222, 667, 2000]),
+                                                        (2, 1 / 4, [500, 1000, 2000])])
+def test_windows(market, eta, min_fraction, windows):
+    search = SuccessiveHalving(market, 100000, eta=eta, min_fraction=min_fraction)
+    assert search.windows == windows
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        search.run(grid_candidates(*GRID), top=1)
+    table = search.rung_table()
+    assert table['Bars'].tolist() == windows
+    assert (table['Kept'] <= table['Candidates']).all()
+    assert table['Candidates'].iloc[1:].tolist() == table['Kept'].iloc[:-1].tolist()
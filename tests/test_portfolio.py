@@ -0,0 +1,81 @@
+from itertools import product
+
+import numpy as np
+import pytest
+from backtester import Backtest2, Portfolio
+from backtester.ledger import STRATEGY2_FIELDS
+from common import synthetic_market_data
+from conftest import assert_reports_equal
+
+PRICE_COLUMNS = ['SPY Opening Price', 'SPY High Price', 'SPY Low Price', 'SPY Closing Price']
+THRESHOLDS = [(20, 80), (35, 65), (50, 50)]
+BRACKETS = [(3, 3, 1), (2, 1, 5), (8, 4, 5)]
+
+
+def prices(*frames):
+    # days x instruments arrays of each price column
+    return [np.column_stack([frame[column].to_numpy() for frame in frames]) for column in PRICE_COLUMNS]
+
+
+@pytest.fixture(scope='module')
+def second(market):
+    # Another instrument over the same days, listing a year later
+    data = synthetic_market_data(len(market), seed=8)
+    data.loc[data.index[:250], PRICE_COLUMNS] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('thresholds, brackets', list(product(THRESHOLDS, BRACKETS)))
+def test_one_instrument_is_backtest2(market, thresholds, brackets):
+    backtest = Backtest2(market, 100000, *thresholds, *brackets).backtest()
+    portfolio = Portfolio(market.index, *prices(market), market['Fear and Greed Index'], 100000, *thresholds,
+                          *brackets).backtest()
+    for name in STRATEGY2_FIELDS:
+        np.testing.assert_array_equal(portfolio.ledger[name], backtest.ledger[name], err_msg=name)
+    assert not portfolio.ledger['instrument'].any()
+    assert portfolio.balance == backtest.balance
+    np.testing.assert_array_equal(portfolio.equity, backtest.equity)
+    assert_reports_equal(portfolio.report, backtest.report)
+    # Open trades have NaN results in Backtest2's records
+    closed = backtest.ledger['close_index'] >= 0
+    records = backtest.transaction_records().drop(columns='Equity Balance')[closed]
+    assert portfolio.transaction_records().drop(columns='Instrument')[closed].equals(records)
+
+
+def expected_balances(ledger, initial_balance):
+    # Balance each trade was sized on: every return realised before its bar, and the returns of positions opened
+    # earlier that closed on its bar, which are closed before new positions open
+    close_index = ledger['close_index']
+    balances = []
+    for open_index in ledger['open_index']:
+        realised = (close_index >= 0) & ((close_index < open_index) | ((close_index == open_index) &
+                                                                      (ledger['open_index'] < open_index)))
+        balances.append(initial_balance + ledger['returns'][realised].sum())
+    return np.array(balances)
+
+
+@pytest.mark.parametrize('allocation', ['per_trade', 'split'])
+def test_two_instruments_share_the_balance(market, second, allocation):
+    portfolio = Portfolio(market.index, *prices(market, second), market['Fear and Greed Index'], 100000, 35, 65, 3, 2,
+                          2, allocation=allocation).backtest()
+    ledger = portfolio.ledger
+    instrument = ledger['instrument']
+    assert set(instrument.tolist()) == {0, 1}
+    assert not (ledger['open_index'][instrument == 1] < 250).any()
+    np.testing.assert_allclose(ledger['equity_balance'], expected_balances(ledger, 100000), rtol=1e-12)
+    assert portfolio.balance == pytest.approx(100000 + ledger['returns'].sum(), rel=1e-12)
+    # Trades of one instrument are sized on balances moved by the other's
+    for this, other in [(0, 1), (1, 0)]:
+        closes = ledger['close_index'][instrument == other]
+        opens = ledger['open_index'][instrument == this]
+        assert ((closes[:, None] < opens) & (closes[:, None] >= 0)).any()
+
+    # Risk of 2% of the balance per position, shared by the positions opened on the same bar when split
+    open_index = ledger['open_index']
+    price = portfolio.open_price[open_index, instrument]
+    risk = 0.02 * ledger['equity_balance']
+    if allocation == 'split':
+        risk = risk / np.unique(open_index, return_counts=True)[1][np.searchsorted(np.unique(open_index), open_index)]
+    np.testing.assert_array_equal(ledger['shares'], np.floor_divide(risk, np.abs(price - ledger['stop_loss'])))
+    if allocation == 'split':
+        assert (np.unique(open_index, return_counts=True)[1] > 1).any()
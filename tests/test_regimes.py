@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester.regimes import SENTIMENTS, SentimentRegimes, rating, sentiment, sentiment_codes
+from common import load_market_data, notebook_durations, notebook_sentiment
+
+
+def notebook_frame(data):
+    data = data[['Fear and Greed Index', 'SPY Closing Price']].copy()
+    data['Sentiment'] = data['Fear and Greed Index'].apply(notebook_sentiment)
+    return data
+
+
+def assert_durations_equal(durations, expected):
+    durations = durations.set_index('Sentiment')
+    for label, lengths in expected.items():
+        assert durations.loc[label, 'Regimes'] == len(lengths), label
+        if lengths:
+            assert durations.loc[label, 'Average Duration'] == pytest.approx(np.mean(lengths), rel=1e-12), label
+        else:
+            assert np.isnan(durations.loc[label, 'Average Duration']), label
+
+
+def test_sentiment_codes_match_the_notebook():
+    scores = np.concatenate((np.arange(-5, 105, 0.5), [24.999, 25, 49.999, 50, 54.999, 55, 74.999, 75, np.nan, np.inf,
+                                                       -np.inf, -0.001]))
+    expected = [notebook_sentiment(score) for score in scores]
+    assert [SENTIMENTS[code] for code in sentiment_codes(scores)] == expected
+    assert sentiment(scores).tolist() == expected
+    assert [rating(score) for score in scores] == expected
+    # A missing score is Extreme Greed, like the else branch of the notebook
+    assert sentiment([np.nan])[0] == 'Extreme Greed'
+
+
+@pytest.fixture(scope='module', params=['real', 'synthetic', 'missing scores'])
+def data(request, market):
+    if request.param == 'real':
+        return load_market_data()
+    if request.param == 'synthetic':
+        return market
+    data = market.copy()
+    data['Fear and Greed Index'] = data['Fear and Greed Index'].astype(float)
+    rows = np.random.default_rng(0).choice(len(data), 200, replace=False)
+    data.iloc[rows, data.columns.get_loc('Fear and Greed Index')] = np.nan
+    return data
+
+
+def test_durations_match_the_notebook(data):
+    sentiment_duration, combined_sentiment_duration = notebook_durations(notebook_frame(data))
+    assert_durations_equal(SentimentRegimes.from_frame(data).durations(), sentiment_duration)
+    assert_durations_equal(SentimentRegimes.from_frame(data, combined=True).durations(), combined_sentiment_duration)
+
+
+@pytest.mark.parametrize('combined', [False, True])
+def test_regimes_match_the_notebook_runs(data, combined):
+    # Every run in order, with the SPY return from its first close to its last
+    frame = SentimentRegimes.from_frame(data, combined).frame()
+    labels = notebook_frame(data)['Sentiment'].to_numpy()
+    if combined:
+        labels = pd.Series(np.where(np.isin(labels, ['Extreme Greed', 'Greed']), 'Greedy',
+                                    np.where(labels == 'Neutral', None, 'Fearful'))).ffill().fillna('Fearful').to_numpy()
+    starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    ends = np.append(starts[1:], len(labels)) - 1
+    close = data['SPY Closing Price'].to_numpy()
+    assert frame['Sentiment'].tolist() == labels[starts].tolist()
+    assert frame['Start Date'].tolist() == data.index[starts].tolist()
+    assert frame['End Date'].tolist() == data.index[ends].tolist()
+    np.testing.assert_array_equal(frame['Length'], ends - starts + 1)
+    np.testing.assert_allclose(frame['SPY Return (%)'], (close[ends] / close[starts] - 1) * 100)
+
+
+@pytest.mark.parametrize('combined', [False, True])
+def test_appending_carries_the_last_run_on(data, combined):
+    regimes = SentimentRegimes(combined)
+    for start in range(0, len(data), 97):
+        part = data.iloc[start:start + 97]
+        regimes.append(part.index, part['Fear and Greed Index'], part['SPY Closing Price'])
+    pd.testing.assert_frame_equal(regimes.frame(), SentimentRegimes.from_frame(data, combined).frame())
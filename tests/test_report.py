@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from backtester import Backtest2
+from backtester.report import STRATEGY2_REPORT_COLUMNS, TRADING_DAYS, equity_metrics
+
+DATES = pd.date_range('2020-01-01', periods=6, freq='D')
+
+
+def trades(open_index, close_index):
+    return {'open_index': np.array(open_index, dtype=np.int64), 'close_index': np.array(close_index, dtype=np.int64)}
+
+
+def test_equity_metrics():
+    equity = np.array([100.0, 110.0, 99.0, 105.0, 121.0, 110.0])
+    metrics = equity_metrics(DATES, equity, trades([1, 4], [3, -1]))
+    returns = np.diff(equity) / equity[:-1]
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    assert metrics['Max Equity Drawdown'] == -11.0
+    assert metrics['Max Equity Drawdown (%)'] == -10.0
+    # From the peak of day 1 to day 4, when equity gets back above it
+    assert metrics['Max Drawdown Duration'] == 3
+    assert metrics['Volatility (%)'] == round(np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS) * 100, 2)
+    assert metrics['Sharpe Ratio'] == round(np.mean(returns) / np.std(returns, ddof=1) * np.sqrt(TRADING_DAYS), 2)
+    assert metrics['Sortino Ratio'] == round(np.mean(returns) / downside * np.sqrt(TRADING_DAYS), 2)
+    # Days 1, 2, 4 and 5 end with a position open, the first trade closes on day 3
+    assert metrics['Exposure (%)'] == round(4 / 6 * 100, 2)
+
+
+def test_drawdown_lasting_to_the_last_day():
+    metrics = equity_metrics(DATES, np.array([100.0, 120.0, 110.0, 90.0, 100.0, 119.0]), trades([], []))
+    assert metrics['Max Equity Drawdown'] == -30.0
+    assert metrics['Max Equity Drawdown (%)'] == -25.0
+    assert metrics['Max Drawdown Duration'] == 4
+    assert metrics['Exposure (%)'] == 0
+
+
+def test_flat_equity():
+    metrics = equity_metrics(DATES, np.full(6, 100.0), trades([], []))
+    assert metrics == {'Max Equity Drawdown': 0.0, 'Max Equity Drawdown (%)': 0.0, 'Max Drawdown Duration': 0,
+                       'Volatility (%)': 0.0, 'Sharpe Ratio': 0.0, 'Sortino Ratio': 0.0, 'Exposure (%)': 0.0}
+
+
+def test_equity_reaching_zero():
+    with np.errstate(all='raise'):
+        metrics = equity_metrics(DATES, np.array([100.0, 50.0, 0.0, 0.0, 10.0, 5.0]), trades([0], [-1]))
+    assert all(np.isfinite(value) for value in metrics.values())
+    assert metrics['Max Equity Drawdown (%)'] == -100.0
+
+
+def test_strategy2_report_fields(market):
+    backtest = Backtest2(market, 100000, 30, 70, 3, 2).backtest()
+    assert list(backtest.report) == STRATEGY2_REPORT_COLUMNS
+    equity = backtest.calculate_daily_equity().to_numpy()
+    metrics = equity_metrics(market.index, equity, backtest.ledger)
+    assert {name: backtest.report[name] for name in metrics} == metrics
+    assert metrics['Max Equity Drawdown'] == round((equity - np.maximum.accumulate(equity)).min(), 2)
+
+
+def test_daily_equity_before_a_backtest_is_flat(market):
+    backtest = Backtest2(market, 100000, 30, 70)
+    equity = backtest.calculate_daily_equity()
+    assert (equity == 100000).all() and equity.index.equals(market.index)
+    assert backtest.balance == 100000 and not len(backtest.ledger)
+    assert not backtest.calculate_daily_equity().equals(backtest.backtest().calculate_daily_equity())
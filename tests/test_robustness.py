@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from backtester import Backtest2, MonteCarlo
+from backtester.robustness import RESAMPLE_COLUMNS, longest_runs
+
+
+@pytest.fixture(scope='module')
+def backtest(market):
+    return Backtest2(market, 100000, 30, 70, 3, 2, 2).backtest()
+
+
+def test_actual_matches_the_run(backtest):
+    actual = MonteCarlo.from_backtest(backtest).actual()
+    assert actual['Final Balance'] == pytest.approx(backtest.balance, rel=1e-9)
+    assert actual['Max Loss Streak'] == backtest.report['Max Loss Streak']
+    daily = MonteCarlo.from_backtest(backtest).actual(daily=True)
+    assert daily['Final Balance'] == pytest.approx(backtest.equity[-1], rel=1e-9)
+    assert daily['Max Drawdown (%)'] == pytest.approx(backtest.report['Max Equity Drawdown (%)'], abs=0.01)
+
+
+@pytest.mark.parametrize('method, kwargs', [('bootstrap', {}), ('shuffle', {}), ('block_bootstrap', {'block_size': 10})])
+def test_resamples_are_reproducible(backtest, method, kwargs):
+    # Small chunks so the paths are drawn over several of them
+    samples = getattr(MonteCarlo.from_backtest(backtest, seed=3, max_bytes=2 ** 14), method)(500, **kwargs)
+    same = getattr(MonteCarlo.from_backtest(backtest, seed=3, max_bytes=2 ** 14), method)(500, **kwargs)
+    other = getattr(MonteCarlo.from_backtest(backtest, seed=4, max_bytes=2 ** 14), method)(500, **kwargs)
+    assert list(samples.columns) == RESAMPLE_COLUMNS and len(samples) == 500
+    pd.testing.assert_frame_equal(samples, same)
+    assert not samples.equals(other)
+
+
+@pytest.mark.parametrize('method, daily', [('bootstrap', False), ('block_bootstrap', True)])
+def test_intervals_bracket_the_run(backtest, method, daily):
+    monte_carlo = MonteCarlo.from_backtest(backtest, seed=0)
+    intervals = monte_carlo.intervals(getattr(monte_carlo, method)(2000), daily=daily).set_index('Metric')
+    assert (intervals['Lower'] <= intervals['Median']).all() and (intervals['Median'] <= intervals['Upper']).all()
+    assert (intervals['Lower'] <= intervals['Actual']).all() and (intervals['Actual'] <= intervals['Upper']).all()
+
+
+def test_shuffles_end_on_the_run_balance(backtest):
+    monte_carlo = MonteCarlo.from_backtest(backtest, seed=0)
+    samples = monte_carlo.shuffle(200)
+    np.testing.assert_allclose(samples['Final Balance'], backtest.balance, rtol=1e-9)
+    # The order of the run is one of the orders, so its drawdown is within the range of the shuffles
+    actual = monte_carlo.actual()
+    assert samples['Max Drawdown (%)'].min() <= actual['Max Drawdown (%)'] <= samples['Max Drawdown (%)'].max()
+
+
+def test_longest_runs():
+    mask = np.array([[True, True, False, True, True, True], [False] * 6, [True] * 6])
+    np.testing.assert_array_equal(longest_runs(mask), [3, 0, 6])
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from backtester import Backtest1
+from backtester.rangequery import CrossingIndex
+from common import legacy_generate_signal, load_fear_and_greed, signal_names, threshold_signals
+
+# Disjoint, touching and overlapping thresholds, the last ones make a day meet both
+THRESHOLDS = [(5, 95), (20, 80), (35, 65), (50, 50), (60, 40), (0, 100)]
+
+
+@pytest.fixture(scope='module')
+def fear_and_greed():
+    return load_fear_and_greed()
+
+
+@pytest.mark.parametrize('buy_threshold, sell_threshold', THRESHOLDS)
+def test_signals_match_the_notebook_loop(market, fear_and_greed, buy_threshold, sell_threshold):
+    expected = legacy_generate_signal(fear_and_greed, buy_threshold, sell_threshold)
+    assert signal_names(threshold_signals(fear_and_greed['Fear and Greed Index'], buy_threshold, sell_threshold)) == expected
+    days, sides = CrossingIndex(fear_and_greed['Fear and Greed Index'].to_numpy()).events(buy_threshold, sell_threshold)
+    signals = np.zeros(len(fear_and_greed), dtype=np.int8)
+    signals[days] = sides
+    assert signal_names(signals) == expected
+    backtest = Backtest1(market, 100000, buy_threshold, sell_threshold)
+    assert signal_names(backtest.signals) == legacy_generate_signal(market, buy_threshold, sell_threshold)
@@ -0,0 +1,25 @@
+from backtester import BracketStream
+from conftest import assert_reports_equal
+
+PARAMS = (100000, 35, 65, 3, 2, 1)
+
+
+def test_checkpoint_does_not_follow_the_stream(market):
+    stream = BracketStream(*PARAMS).replay(market.iloc[:1500])
+    state = stream.checkpoint()
+    trades = len(state['trades'])
+    stream.replay(market.iloc[1500:1600])
+    assert len(state['dates']) == 1500
+    assert len(state['trades']) == trades
+
+
+def test_restored_stream_matches_full_replay(market):
+    stream = BracketStream(*PARAMS).replay(market.iloc[:1500])
+    state = stream.checkpoint()
+    stream.replay(market.iloc[1500:1600])
+    restored = BracketStream.restore(state)
+    assert len(restored.dates) == 1500
+    restored.replay(market.iloc[1500:])
+    # The restored stream must not write into the checkpoint either
+    assert len(state['dates']) == 1500
+    assert_reports_equal(restored.report(), BracketStream(*PARAMS).replay(market).report())
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from backtester import WalkForward
+from backtester.grid import MarketArrays, strategy2_balances
+from backtester.optimize import grid_candidates
+
+GRID = ([10, 20, 30], [70, 80, 90], [2, 3], [2, 3], [1, 2])
+
+
+@pytest.mark.parametrize('anchored', [False, True])
+def test_training_matches_a_fresh_grid_per_window(market, anchored):
+    candidates = grid_candidates(*GRID)
+    walk_forward = WalkForward(market, 100000, train_months=24, test_months=12, anchored=anchored, processes=1)
+    assert len(walk_forward.windows) > 2
+    fresh = [int(np.argmax(strategy2_balances(MarketArrays.from_frame(market.iloc[train_start:test_start]), 100000,
+                                              candidates)))
+             for train_start, test_start, _ in walk_forward.windows]
+    best = walk_forward.optimize(candidates)
+    assert [index for index, _ in best] == fresh
+    # Worker processes find the same
+    parallel = WalkForward(market, 100000, train_months=24, test_months=12, anchored=anchored, processes=2)
+    assert parallel.optimize(candidates) == best
+
+
+@pytest.mark.parametrize('anchored', [False, True])
+def test_stitched_equity(market, anchored):
+    walk_forward = WalkForward(market, 100000, train_months=24, test_months=12, anchored=anchored, processes=1).run(*GRID)
+    ledger = walk_forward.ledger
+    assert len(ledger) == walk_forward.results['Out-of-Sample Trades'].sum()
+    assert walk_forward.equity.iloc[-1] == pytest.approx(100000 + ledger['returns'].sum(), abs=1e-6)
+    assert walk_forward.balance == pytest.approx(100000 + ledger['returns'].sum(), abs=1e-6)
+    assert walk_forward.equity.index[0] == market.index[walk_forward.windows[0][1]]
+    assert walk_forward.equity.index[-1] == market.index[-1]
+    # Each window starts with the balance the one before it ended with
+    growth = np.prod(1 + walk_forward.results['Out-of-Sample Returns (%)'].to_numpy() / 100)
+    assert walk_forward.balance / 100000 == pytest.approx(growth, rel=1e-3)